@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Candidato, Empresa, Vaga, Match, Candidatura, Mensagem, Curso, ProgressoCurso, Notificacao
+from .models import Candidato, Empresa, Vaga, Match, Candidatura, Mensagem, Curso, ProgressoCurso, Notificacao, EstatisticasPlataforma, ContadorNaoLidas, EventoNotificacao, Conversa, ParticipanteConversa, VersaoCache
 
 
 @admin.register(Candidato)
@@ -38,6 +38,20 @@ class MensagemAdmin(admin.ModelAdmin):
     search_fields = ['assunto', 'conteudo', 'remetente__username', 'destinatario__username']
 
 
+@admin.register(Conversa)
+class ConversaAdmin(admin.ModelAdmin):
+    list_display = ['usuario_a', 'usuario_b', 'match', 'criado_em']
+    search_fields = ['usuario_a__username', 'usuario_b__username']
+    raw_id_fields = ['usuario_a', 'usuario_b', 'match']
+
+
+@admin.register(ParticipanteConversa)
+class ParticipanteConversaAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'outro_usuario', 'nao_lidas', 'ultima_mensagem_em']
+    search_fields = ['usuario__username', 'outro_usuario__username']
+    raw_id_fields = ['conversa', 'usuario', 'outro_usuario', 'ultima_mensagem']
+
+
 @admin.register(Curso)
 class CursoAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'categoria', 'nivel', 'duracao_horas', 'criado_em']
@@ -66,3 +80,27 @@ class NotificacaoAdmin(admin.ModelAdmin):
     list_filter = ['tipo', 'lida', 'criado_em']
     search_fields = ['titulo', 'mensagem', 'usuario__username']
     ordering = ['-criado_em']
+
+
+@admin.register(EstatisticasPlataforma)
+class EstatisticasPlataformaAdmin(admin.ModelAdmin):
+    list_display = ['total_candidatos', 'total_empresas', 'total_vagas', 'vagas_abertas', 'total_matches', 'matches_ativos', 'atualizado_em']
+
+
+@admin.register(ContadorNaoLidas)
+class ContadorNaoLidasAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'notificacoes', 'mensagens', 'atualizado_em']
+    search_fields = ['usuario__username']
+
+
+@admin.register(EventoNotificacao)
+class EventoNotificacaoAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'objeto_id', 'tentativas', 'processado_em', 'criado_em']
+    list_filter = ['tipo', 'processado_em']
+    search_fields = ['erro']
+    ordering = ['-id']
+
+
+@admin.register(VersaoCache)
+class VersaoCacheAdmin(admin.ModelAdmin):
+    list_display = ['grupo', 'versao']
@@ -0,0 +1,248 @@
+"""
+Agendador das chamadas ao modelo do chat IA
+Limita as chamadas simultâneas (no total e por usuário), enfileira o excesso
+por um tempo máximo e aplica orçamentos de tokens em janela deslizante,
+usando o usage.total_tokens de cada resposta. Mantém métricas de fila e espera.
+Funciona entre event loops diferentes (o estado é protegido por threading.Lock).
+Todo o estado (vagas, fila e janelas de tokens) fica na memória do processo: os limites
+valem por worker. Com N workers um usuário pode ter até N vezes SIMULTANEAS_POR_USUARIO
+chamadas em andamento e gastar até N vezes TOKENS_POR_USUARIO na janela; para um limite
+total L, configure L / N em cada processo.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+from .middleware import BUCKETS_MS, Histograma
+
+LIMITES_PADRAO = {
+    'SIMULTANEAS': 20,
+    'SIMULTANEAS_POR_USUARIO': 2,
+    'FILA_MAXIMA': 100,
+    'ESPERA_MAXIMA': 10,
+    'JANELA_TOKENS': 3600,
+    'TOKENS_POR_USUARIO': 20000,
+    'TOKENS_GLOBAIS': None,
+}
+
+
+class LimiteChatExcedido(Exception):
+    """Chamada recusada; `motivo` é 'fila_cheia', 'espera', 'tokens_usuario' ou 'tokens_globais'"""
+
+    def __init__(self, motivo, mensagem, tentar_em=None):
+        super().__init__(mensagem)
+        self.motivo = motivo
+        self.tentar_em = tentar_em
+
+
+class _Espera:
+    __slots__ = ('usuario_id', 'loop', 'future', 'concedida')
+
+    def __init__(self, usuario_id, loop, future):
+        self.usuario_id = usuario_id
+        self.loop = loop
+        self.future = future
+        self.concedida = False
+
+
+class _JanelaTokens:
+    """Soma dos tokens registrados nos últimos `duracao` segundos"""
+
+    def __init__(self, duracao):
+        self.duracao = duracao
+        self.registros = deque()
+        self.total = 0
+
+    def podar(self, agora):
+        while self.registros and self.registros[0][0] <= agora - self.duracao:
+            self.total -= self.registros.popleft()[1]
+
+    def registrar(self, agora, tokens):
+        self.registros.append((agora, tokens))
+        self.total += tokens
+
+    def liberado_em(self, agora, limite):
+        """Segundos até o total voltar a ficar abaixo do limite"""
+        total = self.total
+        for instante, tokens in self.registros:
+            total -= tokens
+            if total < limite:
+                return max(instante + self.duracao - agora, 0)
+        return 0
+
+
+class AgendadorChat:
+    """
+    Vagas de execução (global e por usuário), fila com espera máxima e orçamentos de tokens,
+    todos por processo (ver o docstring do módulo)
+    """
+
+    def __init__(self, limites=None):
+        self.limites = {**LIMITES_PADRAO, **(limites or {})}
+        self._lock = threading.Lock()
+        self._ativas = 0
+        self._ativas_por_usuario = Counter()
+        self._fila = deque()
+        self._tokens_usuario = {}
+        self._tokens_globais = _JanelaTokens(self.limites['JANELA_TOKENS'])
+        # Métricas
+        self.espera_ms = Histograma(BUCKETS_MS)
+        self.fila_maxima = 0
+        self.admitidas = 0
+        self.recusadas = Counter()
+
+    # ---------- Orçamento de tokens ----------
+
+    def _janela_usuario(self, usuario_id):
+        janela = self._tokens_usuario.get(usuario_id)
+        if janela is None:
+            janela = self._tokens_usuario[usuario_id] = _JanelaTokens(self.limites['JANELA_TOKENS'])
+        return janela
+
+    def _verificar_orcamento(self, usuario_id, agora):
+        limite = self.limites['TOKENS_POR_USUARIO']
+        janela = self._tokens_usuario.get(usuario_id)
+        if limite is not None and janela is not None:
+            janela.podar(agora)
+            if not janela.registros:
+                del self._tokens_usuario[usuario_id]
+            elif janela.total >= limite:
+                self.recusadas['tokens_usuario'] += 1
+                raise LimiteChatExcedido('tokens_usuario', 'Limite de uso do assistente atingido',
+                                         janela.liberado_em(agora, limite))
+        limite = self.limites['TOKENS_GLOBAIS']
+        if limite is not None:
+            self._tokens_globais.podar(agora)
+            if self._tokens_globais.total >= limite:
+                self.recusadas['tokens_globais'] += 1
+                raise LimiteChatExcedido('tokens_globais', 'Assistente temporariamente indisponível',
+                                         self._tokens_globais.liberado_em(agora, limite))
+
+    def registrar_tokens(self, usuario_id, tokens):
+        if not tokens:
+            return
+        agora = time.monotonic()
+        with self._lock:
+            self._janela_usuario(usuario_id).registrar(agora, tokens)
+            self._tokens_globais.registrar(agora, tokens)
+
+    # ---------- Vagas de execução ----------
+
+    def _pode_executar(self, usuario_id):
+        return (self._ativas < self.limites['SIMULTANEAS']
+                and self._ativas_por_usuario[usuario_id] < self.limites['SIMULTANEAS_POR_USUARIO'])
+
+    def _ocupar(self, usuario_id):
+        self._ativas += 1
+        self._ativas_por_usuario[usuario_id] += 1
+
+    def _liberar(self, usuario_id):
+        """Libera a vaga e a repassa, em ordem de chegada, para quem pode executar"""
+        self._ativas -= 1
+        self._ativas_por_usuario[usuario_id] -= 1
+        if not self._ativas_por_usuario[usuario_id]:
+            del self._ativas_por_usuario[usuario_id]
+        for espera in list(self._fila):
+            if not self._pode_executar(espera.usuario_id):
+                continue
+            self._fila.remove(espera)
+            self._ocupar(espera.usuario_id)
+            espera.concedida = True
+            espera.loop.call_soon_threadsafe(_acordar, espera.future)
+
+    async def _entrar(self, usuario_id):
+        inicio = time.monotonic()
+        with self._lock:
+            self._verificar_orcamento(usuario_id, inicio)
+            if self._pode_executar(usuario_id):
+                self._ocupar(usuario_id)
+                self.admitidas += 1
+                self.espera_ms.registrar(0)
+                return
+            if len(self._fila) >= self.limites['FILA_MAXIMA']:
+                self.recusadas['fila_cheia'] += 1
+                raise LimiteChatExcedido('fila_cheia', 'Assistente ocupado, tente novamente em instantes')
+            loop = asyncio.get_running_loop()
+            espera = _Espera(usuario_id, loop, loop.create_future())
+            self._fila.append(espera)
+            self.fila_maxima = max(self.fila_maxima, len(self._fila))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(espera.future), self.limites['ESPERA_MAXIMA'])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as erro:
+            with self._lock:
+                if espera.concedida:
+                    # A vaga chegou junto com o timeout/cancelamento: devolve
+                    self._liberar(usuario_id)
+                else:
+                    self._fila.remove(espera)
+                if isinstance(erro, asyncio.TimeoutError):
+                    self.recusadas['espera'] += 1
+            if isinstance(erro, asyncio.CancelledError):
+                raise
+            raise LimiteChatExcedido('espera', 'Assistente ocupado, tente novamente em instantes') from None
+
+        with self._lock:
+            self.admitidas += 1
+            self.espera_ms.registrar((time.monotonic() - inicio) * 1000)
+
+    @asynccontextmanager
+    async def reservar(self, usuario_id):
+        """Aguarda uma vaga para `usuario_id` (ou lança LimiteChatExcedido) e a libera na saída"""
+        await self._entrar(usuario_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._liberar(usuario_id)
+
+    def estatisticas(self):
+        agora = time.monotonic()
+        with self._lock:
+            self._tokens_globais.podar(agora)
+            return {
+                'limites': self.limites,
+                'em_execucao': self._ativas,
+                'na_fila': len(self._fila),
+                'fila_maxima': self.fila_maxima,
+                'admitidas': self.admitidas,
+                'recusadas': dict(self.recusadas),
+                'espera_ms': self.espera_ms.como_dict(),
+                'tokens_na_janela': self._tokens_globais.total,
+            }
+
+
+def _acordar(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+
+def obter_agendador():
+    """Agendador do processo, com os limites de CHAT_IA['AGENDADOR']"""
+    global _agendador
+    agendador = _agendador
+    if agendador is None:
+        with _agendador_lock:
+            if _agendador is None:
+                _agendador = AgendadorChat(getattr(settings, 'CHAT_IA', {}).get('AGENDADOR'))
+            agendador = _agendador
+    return agendador
+
+
+def _descartar_agendador(setting, **kwargs):
+    global _agendador
+    if setting == 'CHAT_IA':
+        with _agendador_lock:
+            _agendador = None
+
+
+setting_changed.connect(_descartar_agendador)
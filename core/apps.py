@@ -7,3 +7,5 @@ class CoreConfig(AppConfig):
     
     def ready(self):
         import core.signals
+        # Antes da primeira conexão, para que todas recebam o contador de queries
+        import core.middleware
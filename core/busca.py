@@ -0,0 +1,157 @@
+"""
+Busca textual de vagas
+Indexa titulo, descricao, requisitos e habilidades_necessarias em uma tabela de busca
+mantida pelos signals de Vaga:
+- SQLite: tabela virtual FTS5 (rowid = id da vaga), ranking por bm25
+- PostgreSQL: tabela com tsvector e índice GIN, ranking por ts_rank_cd
+Em outros bancos a busca cai para icontains, sem ranking.
+
+Também define as normalizações das colunas de busca por prefixo (nome, email, CNPJ)
+usadas nas listagens administrativas.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABELA_BUSCA = 'core_vaga_busca'
+CONFIGURACAO_PG = 'portuguese'
+
+CAMPOS_BUSCA = ('titulo', 'descricao', 'requisitos', 'habilidades_necessarias')
+
+
+def backend_busca(conexao=None):
+    """'sqlite', 'postgresql' ou None quando o banco não tem busca textual suportada"""
+    vendor = (conexao or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+def termos_busca(texto):
+    """Palavras da busca, sem operadores nem pontuação"""
+    return re.findall(r'\w+', (texto or '').lower())
+
+
+def _consulta_fts5(termos):
+    # Cada termo entre aspas (literal) e com * (prefixo); termos separados = AND
+    return ' '.join(f'"{termo}"*' for termo in termos)
+
+
+def _consulta_tsquery(termos):
+    return ' & '.join(f'{termo}:*' for termo in termos)
+
+
+# ---------- Colunas normalizadas para busca por prefixo ----------
+
+# Maior caractere possível: [prefixo, prefixo + MAIOR_CARACTERE) cobre tudo que começa com o prefixo
+MAIOR_CARACTERE = '\U0010ffff'
+
+
+def normalizar_busca(texto):
+    """Minúsculas, sem acentos e com espaços simples ('  José  da Silva' -> 'jose da silva')"""
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def normalizar_email(email):
+    return (email or '').strip().lower()
+
+
+def somente_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def filtro_prefixo(coluna, prefixo):
+    """
+    Intervalo equivalente a coluna LIKE 'prefixo%', mas que usa o índice B-tree da
+    coluna em qualquer banco (o LIKE do SQLite não usa índice e o do PostgreSQL depende
+    da collation)
+    """
+    return Q(**{f'{coluna}__gte': prefixo, f'{coluna}__lt': prefixo + MAIOR_CARACTERE})
+
+
+# ---------- Sincronização do índice (a tabela é criada pela migração 0008) ----------
+
+def indexar_vagas(linhas, conexao=None):
+    """Grava (ou regrava) as linhas (id, titulo, descricao, requisitos, habilidades) no índice"""
+    conexao = conexao or connection
+    backend = backend_busca(conexao)
+    linhas = [(id, *(valor or '' for valor in valores)) for id, *valores in linhas]
+    if not backend or not linhas:
+        return
+
+    with conexao.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {TABELA_BUSCA} '
+                f'(rowid, titulo, descricao, requisitos, habilidades_necessarias) VALUES (%s, %s, %s, %s, %s)',
+                linhas,
+            )
+        else:
+            # Pesos: título e habilidades valem mais que descrição e requisitos
+            cursor.executemany(
+                f"INSERT INTO {TABELA_BUSCA} (vaga_id, documento) VALUES (%s, "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'A') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'C') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'C') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'B')) "
+                f"ON CONFLICT (vaga_id) DO UPDATE SET documento = EXCLUDED.documento",
+                linhas,
+            )
+
+
+def indexar_vaga(vaga):
+    indexar_vagas([(vaga.id, *(getattr(vaga, campo) for campo in CAMPOS_BUSCA))])
+
+
+def remover_vaga_do_indice(vaga_id):
+    backend = backend_busca()
+    if not backend:
+        return
+    coluna = 'rowid' if backend == 'sqlite' else 'vaga_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA_BUSCA} WHERE {coluna} = %s', [vaga_id])
+
+
+# ---------- Consulta ----------
+
+def buscar_vagas(queryset, texto):
+    """
+    Filtra o queryset de vagas pelo texto e anota `relevancia` (maior = mais relevante).
+    Retorna o queryset sem alteração quando o texto não tem termos.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return queryset
+
+    backend = backend_busca()
+    tabela = queryset.model._meta.db_table
+    if backend == 'sqlite':
+        consulta = _consulta_fts5(termos)
+        ids = RawSQL(f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s', [consulta])
+        # bm25 é negativo e menor para os mais relevantes
+        relevancia = RawSQL(
+            f'SELECT -bm25({TABELA_BUSCA}, 10.0, 1.0, 1.0, 5.0) FROM {TABELA_BUSCA} '
+            f'WHERE {TABELA_BUSCA} MATCH %s AND rowid = {tabela}.id',
+            [consulta], output_field=FloatField(),
+        )
+    elif backend == 'postgresql':
+        consulta = _consulta_tsquery(termos)
+        ids = RawSQL(
+            f"SELECT vaga_id FROM {TABELA_BUSCA} WHERE documento @@ to_tsquery('{CONFIGURACAO_PG}', %s)",
+            [consulta],
+        )
+        relevancia = RawSQL(
+            f"SELECT ts_rank_cd(documento, to_tsquery('{CONFIGURACAO_PG}', %s)) FROM {TABELA_BUSCA} "
+            f"WHERE vaga_id = {tabela}.id",
+            [consulta], output_field=FloatField(),
+        )
+    else:
+        condicao = Q()
+        for termo in termos:
+            condicao &= Q(titulo__icontains=termo) | Q(descricao__icontains=termo) | \
+                Q(requisitos__icontains=termo) | Q(habilidades_necessarias__icontains=termo)
+        return queryset.filter(condicao).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    return queryset.filter(id__in=ids).annotate(relevancia=relevancia)
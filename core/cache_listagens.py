@@ -0,0 +1,106 @@
+"""
+Cache das páginas públicas, das listagens de vagas e dos totais do painel administrativo
+Cada valor fica sob uma chave com a versão do seu grupo ('vagas' ou 'candidatos'),
+incrementada após o commit de qualquer save/delete de Vaga ou Empresa (ou de Candidato):
+a alteração invalida de uma vez todas as combinações de filtros já guardadas, sem precisar
+conhecê-las, e as entradas da versão antiga somem pelo TTL. A versão fica no banco
+(VersaoCache), não no cache: com o LocMemCache cada processo tem os seus valores, mas todos
+leem a mesma versão, e as ETags das APIs que a usam mudam em todos os processos ao mesmo
+tempo. Acertos e falhas são contados por prefixo, no processo.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import VersaoCache
+
+GRUPO_VAGAS = 'vagas'
+GRUPO_CANDIDATOS = 'candidatos'
+
+# Segundos que uma listagem fica em cache mesmo sem invalidação
+TEMPO_PADRAO = 300
+
+_AUSENTE = object()
+
+
+def versao(grupo):
+    """
+    Versão atual do grupo (uma consulta pela chave primária). Na primeira leitura começa de
+    um valor baseado no relógio, nunca de uma versão já usada por entradas antigas do cache
+    """
+    valor = VersaoCache.objects.filter(pk=grupo).values_list('versao', flat=True).first()
+    if valor is None:
+        valor = VersaoCache.objects.get_or_create(pk=grupo, defaults={'versao': time.time_ns()})[0].versao
+    return valor
+
+
+def invalidar(grupo):
+    """Passa o grupo para uma nova versão: tudo o que foi guardado antes deixa de ser lido"""
+    if VersaoCache.objects.filter(pk=grupo).update(versao=F('versao') + 1):
+        return
+    try:
+        with transaction.atomic():
+            VersaoCache.objects.create(grupo=grupo, versao=time.time_ns())
+    except IntegrityError:
+        # Criada por outro processo entre o UPDATE e o INSERT
+        VersaoCache.objects.filter(pk=grupo).update(versao=F('versao') + 1)
+
+
+class EstatisticasCache:
+    """Acertos e falhas por prefixo de chave"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_prefixo = {}
+
+    def registrar(self, prefixo, acerto):
+        with self._lock:
+            contagem = self._por_prefixo.setdefault(prefixo, [0, 0])
+            contagem[0 if acerto else 1] += 1
+
+    def resumo(self):
+        with self._lock:
+            resumo = {}
+            for prefixo, (acertos, falhas) in sorted(self._por_prefixo.items()):
+                resumo[prefixo] = {
+                    'acertos': acertos,
+                    'falhas': falhas,
+                    'taxa_acerto': round(acertos / (acertos + falhas), 3),
+                }
+            return resumo
+
+    def limpar(self):
+        with self._lock:
+            self._por_prefixo.clear()
+
+
+estatisticas = EstatisticasCache()
+
+
+def em_cache(prefixo, filtros, calcular, grupo=GRUPO_VAGAS, tempo=None):
+    """
+    Valor de calcular() guardado por prefixo e combinação de filtros
+    - grupo: versão usada na chave (None = sem invalidação, só o TTL)
+    - tempo: TTL em segundos (padrão: settings.CACHE_LISTAGENS_TTL)
+    A versão é lida antes de calcular: um valor calculado enquanto o grupo é invalidado
+    fica na versão antiga e nunca é servido.
+    """
+    if tempo is None:
+        tempo = getattr(settings, 'CACHE_LISTAGENS_TTL', TEMPO_PADRAO)
+    assinatura = hashlib.sha1(json.dumps(filtros, sort_keys=True, default=str).encode()).hexdigest()
+    chave = f'{prefixo}:{assinatura}'
+    if grupo is not None:
+        chave = f'{grupo}:{versao(grupo)}:{chave}'
+
+    valor = cache.get(chave, _AUSENTE)
+    estatisticas.registrar(prefixo, valor is not _AUSENTE)
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(chave, valor, tempo)
+    return valor
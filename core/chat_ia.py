@@ -0,0 +1,271 @@
+"""
+Chat de carreira com IA
+Um AsyncOpenAI por event loop: sob ASGI o loop é único no processo, então as
+conexões HTTP com a API ficam em pool e são reaproveitadas entre requisições.
+As respostas são sempre consumidas em streaming, com prazo total por resposta.
+Perguntas repetidas por perfis iguais são respondidas pelo cache (LRU com TTL).
+"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from openai import AsyncOpenAI
+
+from .agendador_chat import obter_agendador
+
+CONTEXTO_PADRAO = "Você é um assistente de carreira inteligente do TalentMatch."
+
+INSTRUCOES = (
+    "\nAjude o candidato com orientação de carreira, dicas para entrevistas, sugestões de "
+    "habilidades para desenvolver e análise de compatibilidade com vagas. Seja amigável, "
+    "profissional e objetivo."
+)
+
+CONFIGURACAO_PADRAO = {
+    'MODELO': 'gpt-4o-mini',
+    'BASE_URL': None,
+    'MAX_TOKENS': 500,
+    'TEMPERATURA': 0.7,
+    'TIMEOUT': 20,
+    'TIMEOUT_TOTAL': 60,
+    'MAX_RETRIES': 1,
+    'CACHE_TAMANHO': 1000,
+    'CACHE_TTL': 3600,
+}
+
+# Campos do candidato usados no prompt e, portanto, na chave do cache
+CAMPOS_PERFIL = ('habilidades', 'experiencia_anos', 'area_interesse', 'escolaridade')
+
+
+def configuracao_chat():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'CHAT_IA', {})}
+
+
+def montar_mensagens(candidato, mensagem_usuario):
+    """
+    Mensagens da conversa: contexto do candidato (quando houver) e a pergunta.
+    O prompt só usa CAMPOS_PERFIL (sem o nome), então a resposta pode ser
+    reaproveitada por qualquer candidato com o mesmo perfil.
+    """
+    if candidato is None:
+        perfil_contexto = CONTEXTO_PADRAO
+    else:
+        perfil_contexto = f"""
+{CONTEXTO_PADRAO}
+Habilidades: {candidato.habilidades}
+Experiência: {candidato.experiencia_anos} anos
+Área de interesse: {candidato.area_interesse}
+Escolaridade: {candidato.escolaridade}
+"""
+    return [
+        {"role": "system", "content": perfil_contexto + INSTRUCOES},
+        {"role": "user", "content": mensagem_usuario},
+    ]
+
+
+# ---------- Cache de respostas ----------
+
+def normalizar_pergunta(texto):
+    """Minúsculas, sem acentos, pontuação nem espaços repetidos"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texto))
+
+
+def chave_resposta(pergunta, candidato):
+    """Pergunta normalizada + hash do perfil e dos parâmetros do modelo"""
+    config = configuracao_chat()
+    perfil = [getattr(candidato, campo) for campo in CAMPOS_PERFIL] if candidato is not None else None
+    assinatura = repr((perfil, config['MODELO'], config['TEMPERATURA'], config['MAX_TOKENS']))
+    return normalizar_pergunta(pergunta), hashlib.sha1(assinatura.encode()).hexdigest()
+
+
+class CacheRespostas:
+    """LRU de respostas com validade (TTL) e contadores de acertos/falhas"""
+
+    def __init__(self, tamanho, ttl):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.descartadas = 0
+
+    def obter(self, chave):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] <= agora:
+                del self._itens[chave]
+                self.expiradas += 1
+                item = None
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, resposta):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, resposta)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+                self.descartadas += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'tamanho_maximo': self.tamanho,
+                'ttl': self.ttl,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 3) if consultas else 0,
+                'expiradas': self.expiradas,
+                'descartadas': self.descartadas,
+            }
+
+
+_cache_respostas = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_respostas():
+    global _cache_respostas
+    cache_respostas = _cache_respostas
+    if cache_respostas is None:
+        with _cache_lock:
+            if _cache_respostas is None:
+                config = configuracao_chat()
+                _cache_respostas = CacheRespostas(config['CACHE_TAMANHO'], config['CACHE_TTL'])
+            cache_respostas = _cache_respostas
+    return cache_respostas
+
+
+# ---------- Cliente compartilhado ----------
+
+# event loop -> (api_key, cliente); o cliente (e seu pool) some junto com o loop
+_clientes = weakref.WeakKeyDictionary()
+_clientes_lock = threading.Lock()
+
+
+def obter_cliente(api_key):
+    """AsyncOpenAI do event loop atual, criado na primeira chamada e reaproveitado depois"""
+    loop = asyncio.get_running_loop()
+    with _clientes_lock:
+        atual = _clientes.get(loop)
+        if atual is not None and atual[0] == api_key:
+            return atual[1]
+        config = configuracao_chat()
+        cliente = AsyncOpenAI(
+            api_key=api_key,
+            base_url=config['BASE_URL'] or None,
+            timeout=config['TIMEOUT'],
+            max_retries=config['MAX_RETRIES'],
+        )
+        _clientes[loop] = (api_key, cliente)
+        return cliente
+
+
+async def fechar_cliente():
+    """Fecha o cliente do event loop atual (antes de o loop terminar, ex. nos testes)"""
+    loop = asyncio.get_running_loop()
+    with _clientes_lock:
+        atual = _clientes.pop(loop, None)
+    if atual is not None:
+        await atual[1].close()
+
+
+def _descartar_por_configuracao(setting, **kwargs):
+    """Recria os clientes e o cache quando CHAT_IA muda (ex.: override_settings)"""
+    global _cache_respostas
+    if setting == 'CHAT_IA':
+        with _clientes_lock:
+            _clientes.clear()
+        with _cache_lock:
+            _cache_respostas = None
+
+
+setting_changed.connect(_descartar_por_configuracao)
+
+
+# ---------- Resposta em streaming ----------
+
+async def transmitir_resposta(cliente, mensagens):
+    """
+    Gera ('texto', trecho) conforme os tokens chegam e, no fim, ('uso', total de tokens).
+    Lança TimeoutError se a resposta inteira passar de TIMEOUT_TOTAL; o intervalo entre
+    dois trechos é limitado pelo TIMEOUT do cliente. Se o consumidor for cancelado
+    (cliente desconectou), a conexão com a API é fechada e a geração interrompida.
+    """
+    config = configuracao_chat()
+    loop = asyncio.get_running_loop()
+    prazo = loop.time() + config['TIMEOUT_TOTAL']
+
+    stream = await cliente.chat.completions.create(
+        model=config['MODELO'],
+        messages=mensagens,
+        max_tokens=config['MAX_TOKENS'],
+        temperature=config['TEMPERATURA'],
+        stream=True,
+        stream_options={'include_usage': True},
+    )
+    tokens_usados = None
+    async with stream:
+        async for pedaco in stream:
+            if pedaco.usage is not None:
+                tokens_usados = pedaco.usage.total_tokens
+            if pedaco.choices and pedaco.choices[0].delta.content:
+                yield 'texto', pedaco.choices[0].delta.content
+            if loop.time() > prazo:
+                raise TimeoutError(f"Resposta excedeu {config['TIMEOUT_TOTAL']}s")
+    yield 'uso', tokens_usados
+
+
+async def responder_pergunta(cliente, candidato, pergunta, usuario_id=None):
+    """
+    Como transmitir_resposta, mas consultando o cache antes do modelo. Gera
+    ('texto', trecho) e, no fim, ('fim', {'tokens_usados': ..., 'cache': bool}).
+    Só respostas completas entram no cache. A chamada ao modelo passa pelo
+    agendador (pode lançar LimiteChatExcedido antes do primeiro trecho).
+    """
+    cache_respostas = obter_cache_respostas()
+    chave = chave_resposta(pergunta, candidato)
+    resposta = cache_respostas.obter(chave)
+    if resposta is not None:
+        yield 'texto', resposta
+        yield 'fim', {'tokens_usados': 0, 'cache': True}
+        return
+
+    agendador = obter_agendador()
+    trechos = []
+    tokens_usados = None
+    async with agendador.reservar(usuario_id):
+        try:
+            async for tipo, valor in transmitir_resposta(cliente, montar_mensagens(candidato, pergunta)):
+                if tipo == 'texto':
+                    trechos.append(valor)
+                    yield tipo, valor
+                else:
+                    tokens_usados = valor
+                    cache_respostas.guardar(chave, ''.join(trechos))
+                    yield 'fim', {'tokens_usados': valor, 'cache': False}
+        finally:
+            # Resposta interrompida: cada trecho recebido conta como um token
+            agendador.registrar_tokens(usuario_id, tokens_usados if tokens_usados is not None else len(trechos))
@@ -0,0 +1,85 @@
+"""
+GET condicional (ETag / Last-Modified) das APIs JSON
+A versão dos dados de cada endpoint vem de agregações baratas (maior data de alteração e
+contagem, mais o que a data não capta, como não lidas) ou da versão do grupo no cache de
+listagens (core/cache_listagens.py), lidas antes da view: se o cliente
+envia If-None-Match com a versão atual, a resposta é 304 sem montar nem serializar o JSON.
+If-Modified-Since sozinho não gera 304: a maior data não muda com remoções nem leituras.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def agregar(queryset, *campos_data, **agregacoes):
+    """
+    Versão de uma query: (maior valor dos campos de data, valores agregados)
+    Sempre inclui a contagem de linhas; agregacoes acrescenta outras (ex.: Sum('nao_lidas'))
+    """
+    datas = {f'max_{indice}': Max(campo) for indice, campo in enumerate(campos_data)}
+    valores = queryset.order_by().aggregate(total=Count('pk'), **datas, **agregacoes)
+    return max((valores[chave] for chave in datas if valores[chave] is not None), default=None), valores
+
+
+def combinar(*versoes):
+    """Junta várias versões (data, valores) em uma só"""
+    datas = [data for data, _ in versoes if data is not None]
+    return max(datas, default=None), [valores for _, valores in versoes]
+
+
+def _etag(request, valores):
+    """ETag fraca: os mesmos dados podem ser serializados com bytes diferentes"""
+    assinatura = json.dumps([request.get_full_path(), request.user.pk, valores], sort_keys=True, default=str)
+    return f'W/"{hashlib.sha1(assinatura.encode()).hexdigest()}"'
+
+
+def _cabecalhos(response, etag, ultima_alteracao):
+    response.headers['ETag'] = etag
+    if ultima_alteracao is not None:
+        response.headers['Last-Modified'] = http_date(ultima_alteracao.timestamp())
+    # O cliente guarda a resposta, mas revalida a cada uso; proxies não a compartilham
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def get_condicional(versao, atualiza_dados=False):
+    """
+    Decorator de GET condicional para views JSON
+    - versao(request, *args, **kwargs): (última alteração, valores) de agregar()/combinar(),
+      ou None quando a view deve responder normalmente (ex.: não autenticado, não encontrado)
+    - atualiza_dados: a view grava dados que entram na versão (ex.: gera matches); a ETag
+      enviada é recalculada depois dela, para a próxima requisição já receber 304
+    A ETag também leva o caminho com a querystring e o usuário.
+    """
+    def decorator(view):
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            atual = versao(request, *args, **kwargs)
+            if atual is None:
+                return view(request, *args, **kwargs)
+
+            ultima_alteracao, valores = atual
+            etag = _etag(request, valores)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if atualiza_dados:
+                    atual = versao(request, *args, **kwargs)
+                    if atual is None:
+                        return response
+                    ultima_alteracao, valores = atual
+                    etag = _etag(request, valores)
+            elif response.status_code != 304:
+                # If-Match não atendido (412)
+                return response
+            _cabecalhos(response, etag, ultima_alteracao)
+            return response
+        return _view
+    return decorator
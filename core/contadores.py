@@ -0,0 +1,98 @@
+"""
+Contadores de não lidas por usuário
+Cada criação, leitura ou remoção de Notificacao/Mensagem ajusta a linha do usuário
+em ContadorNaoLidas com UPDATE atômico (F()), então ler o total é uma busca por chave.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ContadorNaoLidas, Mensagem, Notificacao
+
+
+def obter_contador(usuario_id):
+    """Contador do usuário; criado a partir das tabelas na primeira vez"""
+    contador = ContadorNaoLidas.objects.filter(usuario_id=usuario_id).first()
+    if contador is not None:
+        return contador
+    try:
+        with transaction.atomic():
+            return ContadorNaoLidas.objects.create(
+                usuario_id=usuario_id,
+                notificacoes=Notificacao.objects.filter(usuario_id=usuario_id, lida=False).count(),
+                mensagens=Mensagem.objects.filter(destinatario_id=usuario_id, lida=False).count(),
+            )
+    except IntegrityError:
+        # Criado por outra requisição ao mesmo tempo
+        return ContadorNaoLidas.objects.get(usuario_id=usuario_id)
+
+
+def _criar_contadores(usuario_ids):
+    """Cria de uma vez os contadores de vários usuários a partir das tabelas"""
+    notificacoes = dict(
+        Notificacao.objects.filter(usuario_id__in=usuario_ids, lida=False)
+        .values('usuario_id').annotate(total=Count('id')).values_list('usuario_id', 'total')
+    )
+    mensagens = dict(
+        Mensagem.objects.filter(destinatario_id__in=usuario_ids, lida=False)
+        .values('destinatario_id').annotate(total=Count('id')).values_list('destinatario_id', 'total')
+    )
+    ContadorNaoLidas.objects.bulk_create(
+        [
+            ContadorNaoLidas(
+                usuario_id=usuario_id,
+                notificacoes=notificacoes.get(usuario_id, 0),
+                mensagens=mensagens.get(usuario_id, 0),
+            )
+            for usuario_id in usuario_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def ajustar_nao_lidas(usuario_id, notificacoes=0, mensagens=0, criar=True):
+    """
+    Soma os deltas ao contador do usuário e avança a versão.
+    Com criar=False, um contador inexistente não é criado (usado nas remoções, que
+    podem vir da exclusão do próprio usuário em cascata).
+    """
+    if not (notificacoes or mensagens):
+        return
+    atualizados = ContadorNaoLidas.objects.filter(usuario_id=usuario_id).update(
+        notificacoes=F('notificacoes') + notificacoes,
+        mensagens=F('mensagens') + mensagens,
+        versao=F('versao') + 1,
+        atualizado_em=timezone.now(),
+    )
+    if not atualizados and criar:
+        # A contagem inicial já inclui a alteração atual
+        obter_contador(usuario_id)
+
+
+def ajustar_notificacoes_em_lote(notificacoes):
+    """
+    Equivalente de ajustar_nao_lidas para notificações gravadas com bulk_create:
+    um UPDATE por quantidade distinta, não um por usuário
+    """
+    por_usuario = Counter(notificacao.usuario_id for notificacao in notificacoes if not notificacao.lida)
+    por_quantidade = {}
+    for usuario_id, quantidade in por_usuario.items():
+        por_quantidade.setdefault(quantidade, []).append(usuario_id)
+
+    existentes = set(
+        ContadorNaoLidas.objects.filter(usuario_id__in=por_usuario).values_list('usuario_id', flat=True)
+    )
+    for quantidade, usuarios in por_quantidade.items():
+        usuarios = [usuario_id for usuario_id in usuarios if usuario_id in existentes]
+        if not usuarios:
+            continue
+        ContadorNaoLidas.objects.filter(usuario_id__in=usuarios).update(
+            notificacoes=F('notificacoes') + quantidade,
+            versao=F('versao') + 1,
+            atualizado_em=timezone.now(),
+        )
+    faltando = por_usuario.keys() - existentes
+    if faltando:
+        _criar_contadores(faltando)
@@ -1,33 +1,31 @@
+from django.core.handlers.asgi import ASGIRequest
+
+from core.perfis import obter_perfil
+
+
 def user_type(request):
     """
     Context processor que adiciona informações sobre o tipo de usuário
-    ao contexto de todos os templates, verificando apenas uma vez por request.
+    ao contexto de todos os templates.
     
-    Usa queries diretas ao banco de dados para evitar invocar descriptors
-    que lançam exceções quando o relacionamento não existe.
+    Os valores são callables avaliados pelo template apenas quando usados; o
+    PerfilUsuario da requisição guarda os papéis na sessão e carrega os perfis
+    em uma única query, compartilhada com as views e os filtros de template.
     """
-    context = {
-        'is_empresa': False,
-        'is_candidato': False,
-        'is_staff_only': False,
-        'user_empresa': None,
-        'user_candidato': None,
+    perfil = obter_perfil(request)
+    return {
+        'perfil_usuario': perfil,
+        'is_empresa': perfil.is_empresa,
+        'is_candidato': perfil.is_candidato,
+        'is_staff_only': perfil.is_staff_only,
+        'user_empresa': lambda: perfil.empresa,
+        'user_candidato': lambda: perfil.candidato,
     }
-    
-    if request.user.is_authenticated:
-        from core.models import Empresa, Candidato
-        
-        user_empresa = Empresa.objects.filter(user_id=request.user.id).first()
-        if user_empresa:
-            context['user_empresa'] = user_empresa
-            context['is_empresa'] = True
-        
-        user_candidato = Candidato.objects.filter(user_id=request.user.id).first()
-        if user_candidato:
-            context['user_candidato'] = user_candidato
-            context['is_candidato'] = True
-        
-        if not user_empresa and not user_candidato and request.user.is_staff:
-            context['is_staff_only'] = True
-    
-    return context
+
+
+def servidor(request):
+    """
+    Recursos que dependem do servidor que atende a requisição: o stream de notificações
+    só fica aberto sob ASGI (sob WSGI as páginas consultam a API de tempos em tempos)
+    """
+    return {'notificacoes_em_tempo_real': isinstance(request, ASGIRequest)}
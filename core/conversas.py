@@ -0,0 +1,98 @@
+"""
+Conversas e caixa de entrada
+Cada Mensagem pertence a uma Conversa (par de usuários + match opcional). Para cada
+participante, ParticipanteConversa guarda a última mensagem e as não lidas, mantidas
+pelos signals; a caixa de entrada e as mensagens de uma conversa são paginadas por cursor.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .contadores import ajustar_nao_lidas
+from .models import Conversa, Mensagem, ParticipanteConversa
+from .paginacao import paginar_por_cursor
+
+TAMANHO_CAIXA = 20
+TAMANHO_CONVERSA = 30
+
+
+def obter_conversa(usuario_id, outro_usuario_id, match_id=None):
+    """Conversa do par (em qualquer ordem) e match, criada com os participantes se ainda não existir"""
+    usuario_a, usuario_b = sorted((usuario_id, outro_usuario_id))
+    filtros = {'usuario_a_id': usuario_a, 'usuario_b_id': usuario_b, 'match_id': match_id}
+    conversa = Conversa.objects.filter(**filtros).first()
+    if conversa is not None:
+        return conversa
+    try:
+        with transaction.atomic():
+            conversa = Conversa.objects.create(**filtros)
+            agora = timezone.now()
+            ParticipanteConversa.objects.bulk_create([
+                ParticipanteConversa(conversa=conversa, usuario_id=usuario, outro_usuario_id=outro,
+                                     ultima_mensagem_em=agora)
+                for usuario, outro in {(usuario_a, usuario_b), (usuario_b, usuario_a)}
+            ])
+            return conversa
+    except IntegrityError:
+        # Criada por outra requisição ao mesmo tempo
+        return Conversa.objects.get(**filtros)
+
+
+def registrar_mensagem(mensagem):
+    """Nova mensagem: vira a última da conversa para os dois lados e soma 1 não lida ao destinatário"""
+    ParticipanteConversa.objects.filter(conversa_id=mensagem.conversa_id).update(
+        ultima_mensagem=mensagem,
+        ultima_mensagem_em=mensagem.criado_em,
+        nao_lidas=Case(
+            When(usuario_id=mensagem.destinatario_id, then=F('nao_lidas') + int(not mensagem.lida)),
+            default=F('nao_lidas'),
+        ),
+    )
+
+
+def ajustar_nao_lidas_conversa(conversa_id, usuario_id, delta):
+    ParticipanteConversa.objects.filter(conversa_id=conversa_id, usuario_id=usuario_id).update(
+        nao_lidas=Greatest(F('nao_lidas') + delta, Value(0))
+    )
+
+
+def descontar_mensagem_removida(mensagem, estava_nao_lida):
+    """Mensagem removida: desconta se não lida e, se era a última, a anterior assume o lugar"""
+    if estava_nao_lida:
+        ajustar_nao_lidas_conversa(mensagem.conversa_id, mensagem.destinatario_id, -1)
+    # ultima_mensagem é SET_NULL: só as conversas que perderam a última ficam sem ela
+    participantes = ParticipanteConversa.objects.filter(conversa_id=mensagem.conversa_id, ultima_mensagem__isnull=True)
+    ultima = Mensagem.objects.filter(conversa_id=mensagem.conversa_id).order_by('-criado_em', '-id').first()
+    if ultima is not None:
+        participantes.update(ultima_mensagem=ultima, ultima_mensagem_em=ultima.criado_em)
+
+
+def marcar_conversa_lida(participante):
+    """Marca como lidas, de uma vez, as mensagens recebidas pelo participante na conversa"""
+    if not participante.nao_lidas:
+        return 0
+    with transaction.atomic():
+        # update() não dispara signals: contador e resumo são ajustados aqui
+        lidas = Mensagem.objects.filter(
+            conversa_id=participante.conversa_id, destinatario_id=participante.usuario_id, lida=False
+        ).update(lida=True)
+        ParticipanteConversa.objects.filter(id=participante.id).update(nao_lidas=0)
+        if lidas:
+            ajustar_nao_lidas(participante.usuario_id, mensagens=-lidas, criar=False)
+    participante.nao_lidas = 0
+    return lidas
+
+
+def caixa_de_entrada(usuario_id, cursor=None, tamanho=TAMANHO_CAIXA):
+    """Conversas do usuário, da mais recente para a mais antiga: (participantes, proximo_cursor)"""
+    queryset = ParticipanteConversa.objects.filter(usuario_id=usuario_id).select_related(
+        'outro_usuario', 'ultima_mensagem', 'conversa__match__vaga'
+    )
+    return paginar_por_cursor(queryset, cursor, tamanho, ordenacao=('-ultima_mensagem_em', '-id'))
+
+
+def mensagens_da_conversa(conversa_id, cursor=None, tamanho=TAMANHO_CONVERSA):
+    """Mensagens da conversa, da mais recente para a mais antiga: (mensagens, proximo_cursor)"""
+    queryset = Mensagem.objects.filter(conversa_id=conversa_id).select_related('remetente')
+    return paginar_por_cursor(queryset, cursor, tamanho, ordenacao=('-criado_em', '-id'))
@@ -0,0 +1,82 @@
+"""
+Estatísticas da plataforma pré-calculadas
+Os contadores ficam em uma única linha de EstatisticasPlataforma, ajustada de forma
+incremental (UPDATE com F()) a cada criação, remoção ou mudança de status. O UPDATE só
+é feito após o commit de quem gerou a alteração: dentro da transação ele travaria a
+linha compartilhada até o fim dela e enfileiraria todos os escritores concorrentes.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Candidato, Empresa, Vaga, Match, EstatisticasPlataforma
+
+ESTATISTICAS_ID = 1
+
+
+def calcular_estatisticas():
+    """Contagem completa direto das tabelas (usada na reconciliação)"""
+    return {
+        'total_candidatos': Candidato.objects.count(),
+        'total_empresas': Empresa.objects.count(),
+        'total_vagas': Vaga.objects.count(),
+        'vagas_abertas': Vaga.objects.filter(status='aberta').count(),
+        'total_matches': Match.objects.count(),
+        'matches_ativos': Match.objects.filter(status='pendente').count(),
+    }
+
+
+def obter_estatisticas():
+    """Snapshot atual em uma query; criado a partir das tabelas se ainda não existir"""
+    estatisticas = EstatisticasPlataforma.objects.filter(pk=ESTATISTICAS_ID).first()
+    if estatisticas is None:
+        estatisticas, _ = EstatisticasPlataforma.objects.get_or_create(
+            pk=ESTATISTICAS_ID, defaults=calcular_estatisticas()
+        )
+    return estatisticas
+
+
+def ajustar_estatisticas(**deltas):
+    """
+    Soma os deltas aos contadores após o commit, ex.: ajustar_estatisticas(total_matches=3)
+    Fora de transação o ajuste é imediato; em rollback ele é descartado junto com os dados.
+    """
+    deltas = {campo: delta for campo, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _aplicar_deltas(deltas))
+
+
+def _aplicar_deltas(deltas):
+    atualizados = EstatisticasPlataforma.objects.filter(pk=ESTATISTICAS_ID).update(
+        atualizado_em=timezone.now(),
+        **{campo: F(campo) + delta for campo, delta in deltas.items()},
+    )
+    if not atualizados:
+        # Primeira vez: a contagem completa já inclui a alteração atual
+        obter_estatisticas()
+
+
+def reconciliar_estatisticas():
+    """
+    Recalcula os contadores e retorna as divergências {campo: (antes, depois)}
+    A correção é gravada como delta sobre o valor lido (F() + diferença), não por cima dele:
+    um ajuste que chegue entre a leitura e a gravação (no SQLite o select_for_update não
+    trava a linha) continua somado. Resta uma janela: uma transação que fez commit antes da
+    contagem, mas cujo on_commit ainda não rodou, já está contada e terá o delta somado de
+    novo. A divergência é de poucas unidades e a próxima reconciliação a corrige.
+    """
+    obter_estatisticas()
+    with transaction.atomic():
+        estatisticas = EstatisticasPlataforma.objects.select_for_update().get(pk=ESTATISTICAS_ID)
+        corretos = calcular_estatisticas()
+        divergencias = {
+            campo: (getattr(estatisticas, campo), valor)
+            for campo, valor in corretos.items()
+            if getattr(estatisticas, campo) != valor
+        }
+        if divergencias:
+            EstatisticasPlataforma.objects.filter(pk=ESTATISTICAS_ID).update(
+                atualizado_em=timezone.now(),
+                **{campo: F(campo) + (depois - antes) for campo, (antes, depois) in divergencias.items()},
+            )
+    return divergencias
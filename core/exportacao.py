@@ -0,0 +1,123 @@
+"""
+Exportação das candidaturas de uma empresa (CSV ou NDJSON) em streaming
+As linhas vêm do banco em blocos por keyset (id maior que o último enviado) e só com as
+colunas exportadas; cada bloco é enviado assim que lido, então a memória não cresce com o
+tamanho. No CSV a linha de cabeçalho sai antes da primeira query; o NDJSON não tem cabeçalho
+e o primeiro trecho é o primeiro bloco (sob ASGI os cabeçalhos HTTP já saíram antes dele, sob
+WSGI o servidor só os envia com o primeiro trecho não vazio). Há uma versão síncrona (WSGI) e uma
+assíncrona (ASGI, cada bloco lido em sync_to_async) de cada gerador: sob ASGI o Django
+juntaria um iterador síncrono inteiro em uma lista antes de enviar o primeiro byte.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Candidatura
+
+TAMANHO_BLOCO = 1000
+
+# (coluna exportada, campo consultado); a primeira é o id usado no keyset
+COLUNAS_CANDIDATURAS = (
+    ('candidatura_id', 'id'),
+    ('status', 'status'),
+    ('data_candidatura', 'criado_em'),
+    ('vaga_id', 'vaga_id'),
+    ('vaga', 'vaga__titulo'),
+    ('candidato_id', 'candidato_id'),
+    ('candidato', 'candidato__nome'),
+    ('email', 'candidato__email'),
+    ('telefone', 'candidato__telefone'),
+    ('cidade', 'candidato__cidade'),
+    ('estado', 'candidato__estado'),
+    ('habilidades', 'candidato__habilidades'),
+    ('experiencia_anos', 'candidato__experiencia_anos'),
+    ('pretensao_salarial', 'candidato__pretensao_salarial'),
+    ('score', 'match__score'),
+)
+
+FORMATOS_EXPORTACAO = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def consulta_candidaturas(empresa_id, vaga_id=None, status=None):
+    """Tuplas com os valores de COLUNAS_CANDIDATURAS, por id"""
+    candidaturas = Candidatura.objects.filter(vaga__empresa_id=empresa_id)
+    if vaga_id:
+        candidaturas = candidaturas.filter(vaga_id=vaga_id)
+    if status:
+        candidaturas = candidaturas.filter(status=status)
+    return candidaturas.order_by('id').values_list(*(campo for _, campo in COLUNAS_CANDIDATURAS))
+
+
+def _ler_bloco(consulta, depois_de, tamanho_bloco):
+    return list(consulta.filter(id__gt=depois_de)[:tamanho_bloco])
+
+
+def blocos_candidaturas(consulta, tamanho_bloco=None):
+    """Listas de até tamanho_bloco (padrão: TAMANHO_BLOCO) linhas, uma query por bloco"""
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+    depois_de = 0
+    while bloco := _ler_bloco(consulta, depois_de, tamanho_bloco):
+        yield bloco
+        depois_de = bloco[-1][0]
+
+
+async def ablocos_candidaturas(consulta, tamanho_bloco=None):
+    """blocos_candidaturas para ASGI: cada bloco é lido em sync_to_async"""
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+    ler = sync_to_async(_ler_bloco)
+    depois_de = 0
+    while bloco := await ler(consulta, depois_de, tamanho_bloco):
+        yield bloco
+        depois_de = bloco[-1][0]
+
+
+def _celula_csv(valor):
+    """Texto começando com =, +, - ou @ vira fórmula em planilhas: prefixa com apóstrofo"""
+    if isinstance(valor, str) and valor[:1] in ('=', '+', '-', '@'):
+        return "'" + valor
+    return valor
+
+
+def _csv(linhas):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(linhas)
+    return buffer.getvalue()
+
+
+def _ndjson(linhas):
+    colunas = [coluna for coluna, _ in COLUNAS_CANDIDATURAS]
+    return ''.join(
+        json.dumps(dict(zip(colunas, linha)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for linha in linhas
+    )
+
+
+# formato -> (cabeçalho ou None, texto de um bloco de linhas)
+_FORMATADORES = {
+    'csv': (lambda: _csv([[coluna for coluna, _ in COLUNAS_CANDIDATURAS]]),
+            lambda bloco: _csv([[_celula_csv(valor) for valor in linha] for linha in bloco])),
+    'ndjson': (None, _ndjson),
+}
+
+
+def gerar_exportacao(formato, blocos):
+    """Cabeçalho do CSV imediatamente (antes de qualquer query) e depois um trecho por bloco"""
+    cabecalho, formatar = _FORMATADORES[formato]
+    if cabecalho:
+        yield cabecalho()
+    for bloco in blocos:
+        yield formatar(bloco)
+
+
+async def agerar_exportacao(formato, blocos):
+    """gerar_exportacao sobre ablocos_candidaturas"""
+    cabecalho, formatar = _FORMATADORES[formato]
+    if cabecalho:
+        yield cabecalho()
+    async for bloco in blocos:
+        yield formatar(bloco)
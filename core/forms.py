@@ -1,4 +1,5 @@
 from django import forms
+from django.core.exceptions import FieldDoesNotExist
 from django.contrib.auth.models import User
 from .models import Candidato, Empresa, Vaga
 
@@ -295,3 +296,56 @@ class VagaForm(forms.ModelForm):
             raise forms.ValidationError('O salário mínimo não pode ser maior que o salário máximo.')
         
         return cleaned_data
+
+
+class ImportacaoFormMixin:
+    """
+    Regras dos formulários acima aplicadas a linhas de um arquivo de importação:
+    campos com valor padrão no modelo podem vir vazios, e a unicidade (email/CNPJ)
+    não é validada aqui porque a importação faz upsert por essas chaves.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.campos_com_padrao = {}
+        for nome, campo in self.fields.items():
+            try:
+                campo_modelo = self._meta.model._meta.get_field(nome)
+            except FieldDoesNotExist:
+                continue
+            if campo_modelo.has_default():
+                campo.required = False
+                self.campos_com_padrao[nome] = campo_modelo.get_default()
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        for nome, padrao in self.campos_com_padrao.items():
+            if cleaned_data.get(nome) in (None, ''):
+                cleaned_data[nome] = padrao
+        return cleaned_data
+    
+    def validate_unique(self):
+        pass
+
+
+class CandidatoImportacaoForm(ImportacaoFormMixin, CandidatoPerfilForm):
+    """Candidato importado sem usuário: nome e email vão direto para o Candidato"""
+    first_name = None
+    last_name = None
+    user_email = None
+    
+    class Meta(CandidatoPerfilForm.Meta):
+        fields = ['nome', 'email', *CandidatoPerfilForm.Meta.fields]
+
+
+class EmpresaImportacaoForm(ImportacaoFormMixin, EmpresaPerfilForm):
+    """Empresa importada sem usuário: o email vai direto para a Empresa"""
+    user_email = None
+    
+    class Meta(EmpresaPerfilForm.Meta):
+        fields = [*EmpresaPerfilForm.Meta.fields, 'email']
+
+
+class VagaImportacaoForm(ImportacaoFormMixin, VagaForm):
+    """Vaga importada; a empresa é indicada pelo CNPJ"""
+    empresa_cnpj = forms.CharField(max_length=18, label='CNPJ da Empresa')
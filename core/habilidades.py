@@ -0,0 +1,32 @@
+"""
+Normalização de habilidades
+Regras compartilhadas entre o matching, o índice invertido e os perfis
+"""
+import hashlib
+from functools import lru_cache
+
+
+def tokenizar_habilidades(texto):
+    """
+    Converte a string de habilidades separadas por vírgula no conjunto normalizado
+    usado pelo matching (sem espaços nas pontas, minúsculas, sem entradas vazias)
+    """
+    if not texto:
+        return set()
+    return set([h.strip().lower() for h in texto.split(',') if h.strip()])
+
+
+def normalizar_habilidades(texto):
+    """Representação canônica persistida: habilidades normalizadas, ordenadas e separadas por vírgula"""
+    return ','.join(sorted(tokenizar_habilidades(texto)))
+
+
+def hash_habilidades(normalizadas):
+    """Hash da representação canônica, usado para detectar mudanças nas habilidades"""
+    return hashlib.sha1(normalizadas.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=8192)
+def conjunto_habilidades(normalizadas):
+    """Conjunto imutável a partir da representação canônica (memorizado por string)"""
+    return frozenset(normalizadas.split(',')) if normalizadas else frozenset()
@@ -0,0 +1,293 @@
+"""
+Importação em lote de candidatos, empresas e vagas (CSV ou JSONL)
+O arquivo é lido em streaming e gravado em lotes de tamanho fixo, em memória constante.
+Cada linha passa pelas regras dos formulários do sistema; cada lote é gravado com um
+bulk_create em uma transação (upsert pelo email do candidato e pelo CNPJ da empresa) e
+o que os signals fariam em cada save() — habilidades normalizadas e índice invertido,
+colunas normalizadas da busca administrativa, busca textual, estatísticas, cache das
+listagens e recálculo de matches — é feito uma vez por lote.
+"""
+import csv
+import json
+import os
+import time
+
+from django.db import IntegrityError, transaction
+
+from .busca import CAMPOS_BUSCA, indexar_vagas
+from .cache_listagens import GRUPO_CANDIDATOS, GRUPO_VAGAS, invalidar
+from .estatisticas import ajustar_estatisticas
+from .forms import CandidatoImportacaoForm, EmpresaImportacaoForm, VagaImportacaoForm
+from .matching import (
+    gerar_matches_para_candidatos, gerar_matches_para_vaga, recalcular_matches_candidato, recalcular_matches_vaga,
+)
+from .models import Candidato, Empresa, Vaga, HabilidadeCandidato, HabilidadeVaga
+from .signals import CAMPOS_SCORE, CONTADORES_ESTATISTICAS
+
+TAMANHO_LOTE = 1000
+
+# tipo -> (modelo, formulário, chave do upsert, índice invertido (modelo, campo))
+TIPOS = {
+    'candidatos': (Candidato, CandidatoImportacaoForm, 'email', (HabilidadeCandidato, 'candidato_id')),
+    'empresas': (Empresa, EmpresaImportacaoForm, 'cnpj', None),
+    'vagas': (Vaga, VagaImportacaoForm, None, (HabilidadeVaga, 'vaga_id')),
+}
+
+
+def _gerar_matches_vagas(vaga_ids, score_minimo):
+    return sum(len(gerar_matches_para_vaga(vaga_id, score_minimo=score_minimo)) for vaga_id in vaga_ids)
+
+
+# modelo -> (gera os matches de um lote de ids, recalcula os matches existentes de um id)
+MATCHING = {
+    Candidato: (gerar_matches_para_candidatos, recalcular_matches_candidato),
+    Vaga: (_gerar_matches_vagas, recalcular_matches_vaga),
+}
+
+# modelo -> grupo do cache de listagens/ETags invalidado após gravar um lote
+GRUPOS_CACHE = {
+    Candidato: GRUPO_CANDIDATOS,
+    Empresa: GRUPO_VAGAS,
+    Vaga: GRUPO_VAGAS,
+}
+
+FORMATOS = {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}
+
+
+def detectar_formato(caminho):
+    """'csv' ou 'jsonl' pela extensão do arquivo (None se desconhecida)"""
+    return FORMATOS.get(os.path.splitext(caminho)[1].lower().lstrip('.'))
+
+
+def ler_registros(arquivo, formato):
+    """Gera (número da linha, registro) lendo o arquivo aos poucos; registro None = linha ilegível"""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+
+    for numero, linha in enumerate(arquivo, 1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            registro = None
+        yield numero, registro
+
+
+class Importador:
+    """
+    Importa registros de um tipo ('candidatos', 'empresas' ou 'vagas').
+    - gerar_matches: gera os matches de cada registro gravado, lote a lote
+    - ao_gravar_lote(resultado): chamado após cada lote (progresso)
+    - ao_rejeitar(numero, erros, registro): chamado para cada linha rejeitada
+    """
+
+    def __init__(self, tipo, tamanho_lote=TAMANHO_LOTE, gerar_matches=False, score_minimo=50,
+                 ao_gravar_lote=None, ao_rejeitar=None):
+        self.modelo, self.formulario, self.chave, self.indice = TIPOS[tipo]
+        self.tamanho_lote = tamanho_lote
+        self.gerar_matches = gerar_matches
+        self.score_minimo = score_minimo
+        self.ao_gravar_lote = ao_gravar_lote
+        self.ao_rejeitar = ao_rejeitar
+        self.resultado = {
+            'lidas': 0, 'criadas': 0, 'atualizadas': 0, 'duplicadas': 0, 'rejeitadas': 0,
+            'matches': 0, 'lotes': 0, 'segundos': 0.0,
+        }
+
+        # Colunas regravadas no upsert e colunas lidas antes dele para comparar
+        self.campos_upsert = [campo for campo in self.formulario._meta.fields if campo != self.chave]
+        self.campos_upsert.append('atualizado_em')
+        self.campos_anteriores = list(CAMPOS_SCORE.get(self.modelo, ()))
+        if self.indice:
+            self.campos_upsert += ['habilidades_normalizadas', 'habilidades_hash']
+            self.campos_anteriores.append('habilidades_hash')
+        campos_busca = getattr(self.modelo, 'campos_busca', {})
+        self.campos_upsert += list(campos_busca)
+        if CONTADORES_ESTATISTICAS[self.modelo][1]:
+            self.campos_anteriores.append('status')
+
+    def importar(self, registros):
+        """Consome os registros (número da linha, dict) e retorna os totais"""
+        inicio = time.monotonic()
+        lote = {}
+        for numero, registro in registros:
+            self.resultado['lidas'] += 1
+            validado = self._validar(numero, registro)
+            if validado is None:
+                continue
+            # Chave repetida no mesmo lote: vale a última linha
+            chave = getattr(validado[1], self.chave) if self.chave else numero
+            if chave in lote:
+                self.resultado['duplicadas'] += 1
+            lote[chave] = validado
+            if len(lote) >= self.tamanho_lote:
+                self._gravar(list(lote.values()))
+                lote = {}
+        self._gravar(list(lote.values()))
+        self.resultado['segundos'] = time.monotonic() - inicio
+        return self.resultado
+
+    # ---------- Validação ----------
+
+    def _rejeitar(self, numero, erros, registro=None):
+        self.resultado['rejeitadas'] += 1
+        if self.ao_rejeitar:
+            self.ao_rejeitar(numero, erros, registro)
+
+    def _validar(self, numero, registro):
+        """(numero, instância não salva, campos extras do formulário) ou None se rejeitada"""
+        if not isinstance(registro, dict):
+            self._rejeitar(numero, {'__all__': ['Linha ilegível']}, registro)
+            return None
+        form = self.formulario(data={campo: '' if valor is None else valor for campo, valor in registro.items()})
+        if not form.is_valid():
+            self._rejeitar(numero, {campo: list(erros) for campo, erros in form.errors.items()}, registro)
+            return None
+        extras = {campo: valor for campo, valor in form.cleaned_data.items() if campo not in form._meta.fields}
+        return numero, form.save(commit=False), extras
+
+    def _vincular_empresas(self, lote):
+        """Liga cada vaga à empresa do CNPJ informado, com uma query por lote"""
+        cnpjs = {extras['empresa_cnpj'] for _, _, extras in lote}
+        empresas = dict(Empresa.objects.filter(cnpj__in=cnpjs).values_list('cnpj', 'id'))
+        vinculadas = []
+        for numero, instancia, extras in lote:
+            empresa_id = empresas.get(extras['empresa_cnpj'])
+            if empresa_id is None:
+                self._rejeitar(numero, {'empresa_cnpj': ['Empresa não encontrada']}, extras)
+                continue
+            instancia.empresa_id = empresa_id
+            vinculadas.append((numero, instancia, extras))
+        return vinculadas
+
+    # ---------- Gravação ----------
+
+    def _gravar(self, lote):
+        if self.modelo is Vaga:
+            lote = self._vincular_empresas(lote)
+        if not lote:
+            return
+
+        try:
+            with transaction.atomic():
+                gravados, alterados = self._gravar_lote(lote)
+        except IntegrityError:
+            # Conflito em outra coluna única (ex.: email já usado por outro CNPJ): linha a linha
+            gravados, alterados = [], []
+            for numero, instancia, extras in lote:
+                instancia.pk = None
+                try:
+                    with transaction.atomic():
+                        ids, ids_alterados = self._gravar_lote([(numero, instancia, extras)])
+                except IntegrityError as erro:
+                    self._rejeitar(numero, {'__all__': [str(erro)]}, extras)
+                    continue
+                gravados += ids
+                alterados += ids_alterados
+
+        if gravados:
+            invalidar(GRUPOS_CACHE[self.modelo])
+        self._atualizar_matches(gravados, alterados)
+        self.resultado['lotes'] += 1
+        if self.ao_gravar_lote:
+            self.ao_gravar_lote(self.resultado)
+
+    def _gravar_lote(self, lote):
+        """
+        Grava o lote e o que depende dele (índice, busca, estatísticas)
+        Retorna (ids gravados, ids já existentes cujos campos de score mudaram)
+        """
+        instancias = [instancia for _, instancia, _ in lote]
+        anteriores = {}
+        if self.chave:
+            anteriores = {
+                valores.pop(self.chave): valores
+                for valores in self.modelo.objects.filter(
+                    **{f'{self.chave}__in': [getattr(instancia, self.chave) for instancia in instancias]}
+                ).values(self.chave, *self.campos_anteriores)
+            }
+
+        for instancia in instancias:
+            if self.indice:
+                instancia.atualizar_habilidades_normalizadas()
+            if hasattr(instancia, 'campos_busca'):
+                instancia.atualizar_campos_busca()
+        if self.chave:
+            self.modelo.objects.bulk_create(
+                instancias, update_conflicts=True, unique_fields=[self.chave], update_fields=self.campos_upsert
+            )
+        else:
+            self.modelo.objects.bulk_create(instancias)
+
+        novas = []
+        atualizadas = []
+        for instancia in instancias:
+            anterior = anteriores.get(getattr(instancia, self.chave)) if self.chave else None
+            if anterior is None:
+                novas.append(instancia)
+            else:
+                atualizadas.append((instancia, anterior))
+
+        self._atualizar_indice(novas, atualizadas)
+        self._atualizar_estatisticas(novas, atualizadas)
+        if self.modelo is Vaga:
+            indexar_vagas([(vaga.id, *(getattr(vaga, campo) for campo in CAMPOS_BUSCA)) for vaga in instancias])
+
+        self.resultado['criadas'] += len(novas)
+        self.resultado['atualizadas'] += len(atualizadas)
+        campos_score = CAMPOS_SCORE.get(self.modelo, ())
+        alterados = [
+            instancia.id for instancia, anterior in atualizadas
+            if any(getattr(instancia, campo) != anterior[campo] for campo in campos_score)
+        ]
+        return [instancia.id for instancia in instancias], alterados
+
+    def _atualizar_indice(self, novas, atualizadas):
+        """Índice invertido: linhas das novas e, nas atualizadas, só onde as habilidades mudaram"""
+        if not self.indice:
+            return
+        modelo_indice, campo = self.indice
+        alteradas = [
+            instancia for instancia, anterior in atualizadas
+            if anterior['habilidades_hash'] != instancia.habilidades_hash
+        ]
+        if alteradas:
+            modelo_indice.objects.filter(**{f'{campo}__in': [instancia.id for instancia in alteradas]}).delete()
+        modelo_indice.objects.bulk_create(
+            [
+                modelo_indice(habilidade=habilidade, **{campo: instancia.id})
+                for instancia in (*novas, *alteradas)
+                for habilidade in instancia.conjunto_habilidades
+            ],
+            batch_size=self.tamanho_lote,
+        )
+
+    def _atualizar_estatisticas(self, novas, atualizadas):
+        campo_total, por_status = CONTADORES_ESTATISTICAS[self.modelo]
+        deltas = {campo_total: len(novas)}
+        if por_status:
+            status_contado, campo_status = por_status
+            deltas[campo_status] = (
+                sum(instancia.status == status_contado for instancia in novas)
+                + sum(
+                    int(instancia.status == status_contado) - int(anterior['status'] == status_contado)
+                    for instancia, anterior in atualizadas
+                )
+            )
+        ajustar_estatisticas(**deltas)
+
+    def _atualizar_matches(self, gravados, alterados):
+        """Gera os matches do lote ou, sem --matches, recalcula os já existentes que mudaram"""
+        if self.modelo not in MATCHING:
+            return
+        gerar, recalcular = MATCHING[self.modelo]
+        if self.gerar_matches:
+            if gravados:
+                self.resultado['matches'] += gerar(gravados, self.score_minimo)
+        else:
+            for objeto_id in alterados:
+                recalcular(objeto_id)
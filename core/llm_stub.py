@@ -0,0 +1,135 @@
+"""
+Servidor local que imita POST /v1/chat/completions da OpenAI (com e sem stream)
+Usado para medir latência e concorrência do chat sem rede nem chave de API:
+    python manage.py servidor_llm_stub --porta 8001
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python manage.py runserver
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorLLMStub(ThreadingHTTPServer):
+    """
+    Responde com `tokens` palavras: a primeira após `latencia_inicial` segundos e as
+    demais a cada `intervalo` segundos. Conta as respostas interrompidas pelo cliente.
+    """
+    daemon_threads = True
+    # Fila de conexões maior que a padrão (5) para os testes de concorrência
+    request_queue_size = 128
+
+    def __init__(self, endereco, latencia_inicial=0.2, intervalo=0.02, tokens=50):
+        super().__init__(endereco, _ManipuladorLLM)
+        self.latencia_inicial = latencia_inicial
+        self.intervalo = intervalo
+        self.tokens = tokens
+        self.requisicoes = 0
+        self.interrompidas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, porta = self.server_address[:2]
+        return f'http://{host}:{porta}/v1'
+
+    def contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+
+class _ManipuladorLLM(BaseHTTPRequestHandler):
+    # HTTP/1.1 para o cliente reaproveitar a conexão (keep-alive)
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.contar('requisicoes')
+        pergunta = next(
+            (m['content'] for m in reversed(corpo.get('messages', [])) if m.get('role') == 'user'), ''
+        )
+        palavras = [f'resposta{indice} ' for indice in range(self.server.tokens)]
+        palavras[0] = f'Sobre "{pergunta}": '
+        modelo = corpo.get('model', 'stub')
+        uso = {
+            'prompt_tokens': sum(len(m.get('content', '').split()) for m in corpo.get('messages', [])),
+            'completion_tokens': len(palavras),
+        }
+        uso['total_tokens'] = uso['prompt_tokens'] + uso['completion_tokens']
+
+        time.sleep(self.server.latencia_inicial)
+        if corpo.get('stream'):
+            self._responder_stream(modelo, palavras, uso, corpo.get('stream_options') or {})
+        else:
+            self._responder_json(modelo, palavras, uso)
+
+    def _responder_json(self, modelo, palavras, uso):
+        time.sleep(self.server.intervalo * (len(palavras) - 1))
+        dados = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': modelo,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(palavras)},
+                'finish_reason': 'stop',
+            }],
+            'usage': uso,
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _pedaco(self, modelo, delta=None, finish_reason=None, uso=None):
+        pedaco = {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': modelo,
+            'choices': [] if uso else [{'index': 0, 'delta': delta or {}, 'finish_reason': finish_reason}],
+        }
+        if uso:
+            pedaco['usage'] = uso
+        return f'data: {json.dumps(pedaco)}\n\n'
+
+    def _enviar(self, texto):
+        # Transfer-Encoding: chunked, um chunk por evento
+        dados = texto.encode()
+        self.wfile.write(f'{len(dados):x}\r\n'.encode() + dados + b'\r\n')
+        self.wfile.flush()
+
+    def _responder_stream(self, modelo, palavras, uso, opcoes):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for indice, palavra in enumerate(palavras):
+                if indice:
+                    time.sleep(self.server.intervalo)
+                delta = {'role': 'assistant', 'content': palavra} if indice == 0 else {'content': palavra}
+                self._enviar(self._pedaco(modelo, delta))
+            self._enviar(self._pedaco(modelo, finish_reason='stop'))
+            if opcoes.get('include_usage'):
+                self._enviar(self._pedaco(modelo, uso=uso))
+            self._enviar('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.contar('interrompidas')
+            self.close_connection = True
+
+
+def criar_servidor_stub(host='127.0.0.1', porta=0, **opcoes):
+    """Servidor stub pronto para serve_forever(); porta=0 escolhe uma porta livre"""
+    return ServidorLLMStub((host, porta), **opcoes)
@@ -0,0 +1,269 @@
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.habilidades import hash_habilidades, normalizar_habilidades
+from core.matching import (
+    calcular_compatibilidade, gerar_matches_para_candidato, gerar_matches_para_vaga,
+    get_matching_weights, recalcular_todos_matches,
+)
+from core.models import Candidato, Empresa, HabilidadeCandidato, HabilidadeVaga, Vaga
+
+
+# Tamanhos fixos de população: (candidatos, vagas)
+TIERS = {
+    'pequeno': (1_000, 100),
+    'medio': (10_000, 1_000),
+    'grande': (100_000, 10_000),
+}
+
+HABILIDADES = [
+    'Python', 'Django', 'JavaScript', 'React', 'Vue', 'Angular', 'TypeScript', 'Node.js', 'Java', 'Spring',
+    'Kotlin', 'Go', 'Rust', 'C#', '.NET', 'PHP', 'Laravel', 'Ruby', 'Rails', 'SQL', 'PostgreSQL', 'MySQL',
+    'MongoDB', 'Redis', 'Docker', 'Kubernetes', 'AWS', 'Azure', 'GCP', 'Terraform', 'Linux', 'Git',
+    'HTML', 'CSS', 'Figma', 'Scrum', 'Power BI', 'Excel', 'Pandas', 'Machine Learning',
+]
+# Frequência decrescente: poucas habilidades muito comuns e uma cauda longa de raras
+PESOS_HABILIDADES = [1 / (posicao + 1) for posicao in range(len(HABILIDADES))]
+CIDADES = [('São Paulo', 'SP'), ('Campinas', 'SP'), ('Rio de Janeiro', 'RJ'), ('Curitiba', 'PR'),
+           ('Belo Horizonte', 'MG'), ('Recife', 'PE'), ('Porto Alegre', 'RS'), ('', '')]
+SALARIOS = [None, Decimal('2500.00'), Decimal('4000.00'), Decimal('6000.00'), Decimal('9000.00'), Decimal('15000.00')]
+
+
+def _habilidades(rng, minimo, maximo):
+    quantidade = rng.randint(minimo, maximo)
+    return ', '.join(set(rng.choices(HABILIDADES, weights=PESOS_HABILIDADES, k=quantidade)))
+
+
+def _com_habilidades_normalizadas(instancia):
+    """bulk_create não chama save(): preenche os campos derivados manualmente"""
+    normalizadas = normalizar_habilidades(getattr(instancia, instancia.campo_habilidades))
+    instancia.habilidades_normalizadas = normalizadas
+    instancia.habilidades_hash = hash_habilidades(normalizadas)
+    return instancia
+
+
+def gerar_populacao(total_candidatos, total_vagas, semente, tamanho_lote=2000):
+    """Cria uma população sintética determinística (mesma semente, mesmos dados)"""
+    rng = random.Random(semente)
+    empresa = Empresa.objects.create(nome='Empresa Benchmark', cnpj='00.000.000/0000-00', email='benchmark@teste.com')
+
+    candidatos = []
+    for i in range(total_candidatos):
+        cidade, estado = rng.choice(CIDADES)
+        candidatos.append(_com_habilidades_normalizadas(Candidato(
+            nome=f'Candidato {i}',
+            email=f'candidato{i}@benchmark.com',
+            cidade=cidade,
+            estado=estado,
+            habilidades=_habilidades(rng, 0, 10),
+            experiencia_anos=rng.randint(0, 15),
+            pretensao_salarial=rng.choice(SALARIOS),
+        )))
+    candidatos = Candidato.objects.bulk_create(candidatos, batch_size=tamanho_lote)
+
+    vagas = []
+    for i in range(total_vagas):
+        cidade, estado = rng.choice(CIDADES)
+        salario_min = rng.choice(SALARIOS)
+        vagas.append(_com_habilidades_normalizadas(Vaga(
+            empresa=empresa,
+            titulo=f'Vaga {i}',
+            descricao='Descrição',
+            requisitos='Requisitos',
+            habilidades_necessarias=_habilidades(rng, 1, 8),
+            nivel=rng.choice(['estagio', 'junior', 'pleno', 'senior']),
+            tipo=rng.choice(['remoto', 'presencial', 'hibrido']),
+            cidade=cidade,
+            estado=estado,
+            salario_min=salario_min,
+            salario_max=salario_min * Decimal('1.5') if salario_min else None,
+            experiencia_minima=rng.randint(0, 10),
+        )))
+    vagas = Vaga.objects.bulk_create(vagas, batch_size=tamanho_lote)
+
+    HabilidadeCandidato.objects.bulk_create(
+        (HabilidadeCandidato(habilidade=h, candidato_id=c.id) for c in candidatos for h in c.conjunto_habilidades),
+        batch_size=tamanho_lote,
+    )
+    HabilidadeVaga.objects.bulk_create(
+        (HabilidadeVaga(habilidade=h, vaga_id=v.id) for v in vagas for h in v.conjunto_habilidades),
+        batch_size=tamanho_lote,
+    )
+    return candidatos, vagas
+
+
+@contextmanager
+def _revertendo():
+    """Executa o bloco em um savepoint desfeito ao final, deixando o banco como estava"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def medir(chamadas):
+    """
+    Mede uma lista de chamadas (funções sem argumentos) duas vezes, sempre revertendo
+    as escritas: a primeira para tempo e queries, a segunda para o pico de memória
+    (o tracemalloc distorce o tempo, por isso não é ligado na primeira).
+    """
+    with _revertendo(), CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        for chamada in chamadas:
+            chamada()
+        tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    try:
+        with _revertendo():
+            for chamada in chamadas:
+                chamada()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'chamadas': len(chamadas),
+        'tempo_total_s': round(tempo, 4),
+        'tempo_medio_ms': round(tempo * 1000 / len(chamadas), 4) if chamadas else 0,
+        'queries': len(queries),
+        'pico_memoria_kb': round(pico / 1024, 1),
+    }
+
+
+def executar_tier(total_candidatos, total_vagas, semente, amostras, pares):
+    """Gera a população e mede cada operação de matching; tudo é desfeito ao final"""
+    with _revertendo():
+        candidatos, vagas = gerar_populacao(total_candidatos, total_vagas, semente)
+        rng = random.Random(semente)
+        amostra_candidatos = rng.sample(candidatos, min(amostras, len(candidatos)))
+        amostra_vagas = rng.sample(vagas, min(amostras, len(vagas)))
+        pesos = get_matching_weights()
+        amostra_pares = [(rng.choice(candidatos), rng.choice(vagas)) for _ in range(pares)]
+
+        operacoes = {
+            'calcular_compatibilidade': medir([
+                lambda c=c, v=v: calcular_compatibilidade(c, v, pesos) for c, v in amostra_pares
+            ]),
+            'gerar_matches_para_candidato': medir([
+                lambda c=c: gerar_matches_para_candidato(c.id) for c in amostra_candidatos
+            ]),
+            'gerar_matches_para_vaga': medir([
+                lambda v=v: gerar_matches_para_vaga(v.id) for v in amostra_vagas
+            ]),
+        }
+
+        # recalcular_todos_matches precisa de matches existentes para percorrer
+        for vaga in amostra_vagas:
+            gerar_matches_para_vaga(vaga.id)
+        operacoes['recalcular_todos_matches'] = medir([recalcular_todos_matches])
+
+        transaction.set_rollback(True)
+
+    return {'candidatos': total_candidatos, 'vagas': total_vagas, 'operacoes': operacoes}
+
+
+def comparar_com_baseline(relatorio, baseline, tolerancia):
+    """
+    Lista as regressões do relatório em relação ao baseline.
+    Tempo e memória podem piorar até `tolerancia` (fração); queries não podem aumentar.
+    """
+    regressoes = []
+    for tier, resultado in relatorio['tiers'].items():
+        operacoes_base = baseline.get('tiers', {}).get(tier, {}).get('operacoes', {})
+        for operacao, atual in resultado['operacoes'].items():
+            base = operacoes_base.get(operacao)
+            if not base:
+                continue
+            prefixo = f'{tier}/{operacao}'
+            if atual['tempo_medio_ms'] > base['tempo_medio_ms'] * (1 + tolerancia):
+                regressoes.append(f'{prefixo}: tempo médio {base["tempo_medio_ms"]}ms -> {atual["tempo_medio_ms"]}ms')
+            if atual['queries'] > base['queries']:
+                regressoes.append(f'{prefixo}: queries {base["queries"]} -> {atual["queries"]}')
+            if atual['pico_memoria_kb'] > base['pico_memoria_kb'] * (1 + tolerancia):
+                regressoes.append(f'{prefixo}: pico de memória {base["pico_memoria_kb"]}KB -> {atual["pico_memoria_kb"]}KB')
+    return regressoes
+
+
+class Command(BaseCommand):
+    help = 'Mede o desempenho do matching em populações sintéticas e compara com um baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=['pequeno'],
+                            help='Tamanhos de população a medir (padrão: pequeno)')
+        parser.add_argument('--semente', type=int, default=42,
+                            help='Semente da população sintética (padrão: 42)')
+        parser.add_argument('--amostras', type=int, default=20,
+                            help='Candidatos e vagas medidos em cada operação por entidade (padrão: 20)')
+        parser.add_argument('--pares', type=int, default=10000,
+                            help='Pares medidos em calcular_compatibilidade (padrão: 10000)')
+        parser.add_argument('--saida', default=os.path.join(settings.BASE_DIR, 'benchmark_matching.json'),
+                            help='Arquivo JSON onde o relatório é gravado')
+        parser.add_argument('--baseline',
+                            help='Relatório de referência; o comando falha se houver regressão')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Piora aceita de tempo e memória em relação ao baseline (padrão: 0.2 = 20%%)')
+        parser.add_argument('--salvar-baseline', action='store_true',
+                            help='Grava o relatório também no caminho de --baseline')
+
+    def handle(self, *args, **options):
+        relatorio = {
+            'gerado_em': timezone.now().isoformat(),
+            'semente': options['semente'],
+            'python': platform.python_version(),
+            'banco': connection.vendor,
+            'tiers': {},
+        }
+
+        # Banco descartável: nunca mede (nem suja) o banco de desenvolvimento
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            for tier in options['tiers']:
+                total_candidatos, total_vagas = TIERS[tier]
+                self.stdout.write(f'Tier {tier}: {total_candidatos} candidatos, {total_vagas} vagas...')
+                resultado = executar_tier(
+                    total_candidatos, total_vagas, options['semente'], options['amostras'], options['pares']
+                )
+                relatorio['tiers'][tier] = resultado
+                for operacao, metricas in resultado['operacoes'].items():
+                    self.stdout.write(
+                        f'  {operacao}: {metricas["tempo_medio_ms"]}ms/chamada, '
+                        f'{metricas["queries"]} queries, pico {metricas["pico_memoria_kb"]}KB'
+                    )
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        self._gravar(options['saida'], relatorio)
+        self.stdout.write(f'Relatório gravado em {options["saida"]}')
+
+        baseline = options['baseline']
+        if not baseline:
+            return
+        if options['salvar_baseline']:
+            self._gravar(baseline, relatorio)
+            self.stdout.write(self.style.SUCCESS(f'✓ Baseline gravado em {baseline}'))
+            return
+        if not os.path.exists(baseline):
+            raise CommandError(f'Baseline {baseline} não encontrado (use --salvar-baseline para criá-lo)')
+
+        with open(baseline) as arquivo:
+            regressoes = comparar_com_baseline(relatorio, json.load(arquivo), options['tolerancia'])
+        if regressoes:
+            raise CommandError('Regressões de desempenho encontradas:\n  ' + '\n  '.join(regressoes))
+        self.stdout.write(self.style.SUCCESS('✓ Nenhuma regressão em relação ao baseline'))
+
+    def _gravar(self, caminho, relatorio):
+        with open(caminho, 'w') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
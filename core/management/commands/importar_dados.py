@@ -0,0 +1,86 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao import TAMANHO_LOTE, TIPOS, Importador, detectar_formato, ler_registros
+
+# Quantos erros de validação mostrar na saída (todos vão para --rejeitados)
+ERROS_EXIBIDOS = 10
+
+
+class Command(BaseCommand):
+    help = 'Importa candidatos, empresas ou vagas de um arquivo CSV ou JSONL, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(TIPOS))
+        parser.add_argument('arquivo', help='Caminho do arquivo (ou - para a entrada padrão)')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE,
+                            help=f'Linhas gravadas por transação (padrão: {TAMANHO_LOTE})')
+        parser.add_argument('--matches', action='store_true',
+                            help='Gera os matches de candidatos/vagas importados na mesma passada')
+        parser.add_argument('--score-minimo', type=int, default=50,
+                            help='Score mínimo dos matches gerados com --matches (padrão: 50)')
+        parser.add_argument('--rejeitados',
+                            help='Arquivo JSONL onde gravar as linhas rejeitadas e seus erros')
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        formato = options['formato'] or (caminho != '-' and detectar_formato(caminho))
+        if not formato:
+            raise CommandError('Informe --formato csv ou jsonl')
+
+        arquivo = sys.stdin if caminho == '-' else open(caminho, encoding='utf-8-sig', newline='')
+        rejeitados = open(options['rejeitados'], 'w', encoding='utf-8') if options['rejeitados'] else None
+        erros_exibidos = 0
+
+        def ao_rejeitar(numero, erros, registro):
+            nonlocal erros_exibidos
+            if rejeitados:
+                rejeitados.write(json.dumps({'linha': numero, 'erros': erros, 'registro': registro},
+                                            ensure_ascii=False, default=str) + '\n')
+            if erros_exibidos < ERROS_EXIBIDOS:
+                erros_exibidos += 1
+                detalhes = '; '.join(f'{campo}: {" ".join(mensagens)}' for campo, mensagens in erros.items())
+                self.stdout.write(self.style.WARNING(f'  linha {numero} rejeitada: {detalhes}'))
+
+        inicio = None
+
+        def ao_gravar_lote(resultado):
+            decorrido = time.monotonic() - inicio
+            self.stdout.write(
+                f'  lote {resultado["lotes"]}: {resultado["lidas"]} linhas, {resultado["criadas"]} criadas, '
+                f'{resultado["atualizadas"]} atualizadas, {resultado["rejeitadas"]} rejeitadas, '
+                f'{resultado["lidas"] / decorrido if decorrido else 0:.0f} linhas/s'
+            )
+
+        importador = Importador(
+            options['tipo'],
+            tamanho_lote=options['tamanho_lote'],
+            gerar_matches=options['matches'],
+            score_minimo=options['score_minimo'],
+            ao_gravar_lote=ao_gravar_lote,
+            ao_rejeitar=ao_rejeitar,
+        )
+        self.stdout.write(f'Importando {options["tipo"]} de {caminho} ({formato})...')
+        inicio = time.monotonic()
+        try:
+            resultado = importador.importar(ler_registros(arquivo, formato))
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+            if rejeitados:
+                rejeitados.close()
+
+        segundos = resultado['segundos']
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {resultado["lidas"]} linhas em {segundos:.1f}s '
+            f'({resultado["lidas"] / segundos if segundos else 0:.0f} linhas/s): '
+            f'{resultado["criadas"]} criadas, {resultado["atualizadas"]} atualizadas, '
+            f'{resultado["duplicadas"]} duplicadas, {resultado["rejeitadas"]} rejeitadas'
+        ))
+        if options['matches']:
+            self.stdout.write(f'  {resultado["matches"]} matches gerados')
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import processar_todos_eventos
+
+
+class Command(BaseCommand):
+    help = 'Gera as notificações e executa os recálculos de score pendentes no outbox (EventoNotificacao) em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true',
+                            help='Continua rodando e verifica a fila a cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre verificações no modo contínuo (padrão: 2)')
+        parser.add_argument('--tamanho-lote', type=int, default=500,
+                            help='Eventos processados por transação (padrão: 500)')
+
+    def handle(self, *args, **options):
+        while True:
+            totais = processar_todos_eventos(options['tamanho_lote'])
+            if totais['processados'] or totais['falhas']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ {totais['processados']} evento(s) processado(s), "
+                    f"{totais['notificacoes']} notificação(ões) criada(s)"
+                ))
+                if totais['falhas']:
+                    self.stdout.write(self.style.WARNING(f"  {totais['falhas']} evento(s) com falha"))
+            elif not options['continuo']:
+                self.stdout.write('Nenhum evento pendente')
+
+            if not options['continuo']:
+                return
+            time.sleep(options['intervalo'])
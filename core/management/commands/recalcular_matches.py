@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+from core.models import Match
+from core.matching import calcular_scores_intervalo, gravar_scores, get_matching_weights
+
+
+def _inicializar_processo():
+    """Prepara o Django em cada processo do pool sem herdar conexões do processo pai"""
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'talentmatch_project.settings')
+    django.setup()
+    connections.close_all()
+
+
+def _calcular_chunk(inicio, fim, pesos):
+    """Executado nos processos do pool: calcula os scores de um chunk sem gravar"""
+    total, alterados = calcular_scores_intervalo(inicio, fim, pesos)
+    return inicio, total, alterados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os scores de todos os matches em paralelo, com checkpoint para retomar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanho-chunk', type=int, default=5000,
+                            help='Quantidade de ids de match por chunk (padrão: 5000)')
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                            help='Processos de cálculo (padrão: núcleos disponíveis)')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.recalcular_matches.json'),
+                            help='Arquivo de checkpoint usado para retomar uma execução interrompida')
+        parser.add_argument('--reiniciar', action='store_true',
+                            help='Ignora o checkpoint existente e recalcula tudo')
+
+    def handle(self, *args, **options):
+        tamanho_chunk = options['tamanho_chunk']
+        caminho_checkpoint = options['checkpoint']
+
+        limites = Match.objects.aggregate(menor=Min('id'), maior=Max('id'))
+        if limites['menor'] is None:
+            self.stdout.write('Nenhum match para recalcular.')
+            return
+
+        pesos = get_matching_weights()
+        checkpoint = self._carregar_checkpoint(
+            caminho_checkpoint, tamanho_chunk, pesos, limites['menor'], options['reiniciar']
+        )
+        concluidos = set(checkpoint['concluidos'])
+
+        # Os limites dependem só do início e do tamanho do chunk: matches criados depois da
+        # interrupção entram em chunks novos (ou no último, ainda pendente) até o maior id atual
+        chunks = [
+            (inicio, inicio + tamanho_chunk)
+            for inicio in range(checkpoint['menor'], limites['maior'] + 1, tamanho_chunk)
+        ]
+        pendentes = [chunk for chunk in chunks if chunk[0] not in concluidos]
+
+        if concluidos:
+            self.stdout.write(f'Retomando: {len(chunks) - len(pendentes)} de {len(chunks)} chunks já concluídos.')
+        self.stdout.write(f'Recalculando {len(pendentes)} chunks com {options["processos"]} processo(s)...')
+
+        inicio_execucao = time.monotonic()
+        processados = 0
+        atualizados = 0
+
+        for inicio, total, alterados in self._executar(pendentes, pesos, options['processos']):
+            gravar_scores(alterados)
+
+            concluidos.add(inicio)
+            checkpoint['concluidos'] = sorted(concluidos)
+            self._salvar_checkpoint(caminho_checkpoint, checkpoint)
+
+            processados += total
+            atualizados += len(alterados)
+            decorrido = time.monotonic() - inicio_execucao
+            self.stdout.write(
+                f'  chunk {len(concluidos)}/{len(chunks)} (ids {inicio}+): '
+                f'{processados} matches, {atualizados} atualizados, '
+                f'{processados / decorrido if decorrido else 0:.0f} matches/s'
+            )
+
+        if os.path.exists(caminho_checkpoint):
+            os.remove(caminho_checkpoint)
+
+        decorrido = time.monotonic() - inicio_execucao
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {processados} matches recalculados em {decorrido:.1f}s, {atualizados} scores atualizados'
+        ))
+
+    def _executar(self, pendentes, pesos, processos):
+        """Gera (inicio, total, alterados) de cada chunk à medida que terminam"""
+        if processos <= 1:
+            for inicio, fim in pendentes:
+                yield _calcular_chunk(inicio, fim, pesos)
+            return
+
+        # Os processos filhos abrem suas próprias conexões
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo) as executor:
+            futuros = [executor.submit(_calcular_chunk, inicio, fim, pesos) for inicio, fim in pendentes]
+            for futuro in as_completed(futuros):
+                yield futuro.result()
+
+    def _carregar_checkpoint(self, caminho, tamanho_chunk, pesos, menor, reiniciar):
+        """
+        Checkpoint da execução interrompida. Chunks concluídos com outros pesos ficariam com
+        scores antigos e ids abaixo do início gravado não caberiam em nenhum chunk: nesses
+        casos a retomada é recusada. Matches novos (ids maiores) não impedem a retomada
+        """
+        novo = {'tamanho_chunk': tamanho_chunk, 'pesos': pesos, 'menor': menor, 'concluidos': []}
+        if reiniciar or not os.path.exists(caminho):
+            return novo
+
+        with open(caminho) as arquivo:
+            checkpoint = json.load(arquivo)
+
+        if checkpoint.get('tamanho_chunk') != tamanho_chunk:
+            self.stdout.write(self.style.WARNING(
+                'Checkpoint criado com outro tamanho de chunk; recomeçando do início.'
+            ))
+            return novo
+        if checkpoint.get('pesos') != pesos:
+            raise CommandError(
+                'Checkpoint criado com outros pesos de matching: os chunks já concluídos ficariam com '
+                'scores antigos. Use --reiniciar para recalcular tudo.'
+            )
+        if checkpoint.get('menor') is None or menor < checkpoint['menor']:
+            raise CommandError(
+                f'Checkpoint criado com chunks a partir do match {checkpoint.get("menor")}, mas agora o menor '
+                f'id é {menor}. Use --reiniciar para recalcular tudo.'
+            )
+        return checkpoint
+
+    def _salvar_checkpoint(self, caminho, checkpoint):
+        # Escreve em um arquivo temporário e substitui, para nunca deixar um checkpoint corrompido
+        temporario = f'{caminho}.tmp'
+        with open(temporario, 'w') as arquivo:
+            json.dump(checkpoint, arquivo)
+        os.replace(temporario, caminho)
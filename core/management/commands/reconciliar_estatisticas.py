@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.estatisticas import reconciliar_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas da plataforma a partir das tabelas e corrige divergências'
+
+    def handle(self, *args, **options):
+        divergencias = reconciliar_estatisticas()
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS('✓ Estatísticas já estavam corretas'))
+            return
+
+        for campo, (antes, depois) in divergencias.items():
+            self.stdout.write(self.style.WARNING(f'  {campo}: {antes} -> {depois}'))
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(divergencias)} contador(es) corrigido(s)'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.llm_stub import criar_servidor_stub
+
+
+class Command(BaseCommand):
+    help = 'Sobe um servidor local compatível com a API de chat da OpenAI, para testes offline do chat IA'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--porta', type=int, default=8001)
+        parser.add_argument('--latencia-inicial', type=float, default=0.2,
+                            help='Segundos até o primeiro token (padrão: 0.2)')
+        parser.add_argument('--intervalo', type=float, default=0.02,
+                            help='Segundos entre tokens (padrão: 0.02)')
+        parser.add_argument('--tokens', type=int, default=50,
+                            help='Tokens por resposta (padrão: 50)')
+
+    def handle(self, *args, **options):
+        servidor = criar_servidor_stub(
+            options['host'], options['porta'],
+            latencia_inicial=options['latencia_inicial'],
+            intervalo=options['intervalo'],
+            tokens=options['tokens'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Stub do LLM em {servidor.base_url}'))
+        self.stdout.write(f'  OPENAI_BASE_URL={servidor.base_url} OPENAI_API_KEY=stub')
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
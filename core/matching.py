@@ -2,8 +2,28 @@
 Sistema de Matching entre Candidatos e Vagas
 Calcula compatibilidade baseado em múltiplos fatores com pesos configuráveis
 """
+import heapq
+import threading
+from collections import OrderedDict
+
+import numpy as np
 from django.conf import settings
-from .models import Candidato, Vaga, Match
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, prefetch_related_objects
+from django.utils import timezone
+from .models import Candidato, Vaga, Match, HabilidadeCandidato, HabilidadeVaga
+from .habilidades import tokenizar_habilidades
+from .signals import notificar_novos_matches
+from .estatisticas import ajustar_estatisticas
+from .matching_lote import carregar_matriz_candidatos, calcular_compatibilidade_lote
+
+# Quantidade de matches gravados por query nas operações em lote
+TAMANHO_LOTE = 500
+
+# Quantidade máxima de pares candidato/vaga guardados no cache de scores
+TAMANHO_CACHE_SCORES = 10000
+
 
 def get_matching_weights():
     """Obtém os pesos de matching das configurações do Django com validação"""
@@ -36,20 +56,52 @@ def calcular_score_habilidades(candidato_habilidades, vaga_habilidades, peso_max
         return 0
     
     # Filtra strings vazias antes de criar os sets
-    candidato_set = set([h.strip().lower() for h in candidato_habilidades.split(',') if h.strip()])
-    vaga_set = set([h.strip().lower() for h in vaga_habilidades.split(',') if h.strip()])
+    candidato_set = tokenizar_habilidades(candidato_habilidades)
+    vaga_set = tokenizar_habilidades(vaga_habilidades)
     
+    return calcular_score_conjuntos_habilidades(candidato_set, vaga_set, peso_maximo)
+
+
+def calcular_score_conjuntos_habilidades(candidato_set, vaga_set, peso_maximo=40):
+    """
+    Calcula o score de habilidades a partir dos conjuntos já normalizados
+    (como os persistidos em habilidades_normalizadas)
+    Retorna: 0-40 pontos
+    """
     if not vaga_set or not candidato_set:
         return 0
     
-    # Calcula porcentagem de habilidades que o candidato possui
     habilidades_match = candidato_set.intersection(vaga_set)
-    porcentagem = (len(habilidades_match) / len(vaga_set)) * 100
+    return _score_habilidades_em_comum(len(habilidades_match), len(vaga_set), peso_maximo)
+
+
+def _score_habilidades_em_comum(em_comum, total_vaga, peso_maximo):
+    """Score de habilidades a partir da quantidade em comum e do total exigido pela vaga"""
+    # Calcula porcentagem de habilidades que o candidato possui
+    porcentagem = (em_comum / total_vaga) * 100
     
     # Retorna score proporcional ao peso máximo
     return min(int(porcentagem * peso_maximo / 100), peso_maximo)
 
 
+def habilidades_em_comum_minimas(total_vaga, score_minimo, pesos):
+    """
+    Menor quantidade de habilidades em comum com a vaga para que um par ainda
+    possa alcançar o score mínimo, supondo pontuação máxima nos demais fatores.
+    Retorna 0 quando qualquer par pode alcançá-lo e None quando nenhum pode.
+    Com os pesos padrão os demais fatores somam 60: até score_minimo=60 (o padrão é 50)
+    o retorno é 0 e o índice invertido não descarta nenhum par; o corte só atua acima disso.
+    """
+    restante = score_minimo - (pesos['experiencia'] + pesos['localizacao'] + pesos['salario'])
+    if restante <= 0:
+        return 0
+    
+    for em_comum in range(1, total_vaga + 1):
+        if _score_habilidades_em_comum(em_comum, total_vaga, pesos['habilidades']) >= restante:
+            return em_comum
+    return None
+
+
 def calcular_score_experiencia(candidato_anos, vaga_anos_min, peso_maximo=25):
     """
     Calcula score baseado na experiência
@@ -123,13 +175,13 @@ def calcular_compatibilidade(candidato, vaga, pesos=None):
     Retorna: 0-100
     """
     if pesos is None:
-        pesos = get_matching_weights()
+        pesos = obter_pontuador().pesos
     
     score_total = 0
     
-    score_total += calcular_score_habilidades(
-        candidato.habilidades,
-        vaga.habilidades_necessarias,
+    score_total += calcular_score_conjuntos_habilidades(
+        candidato.conjunto_habilidades,
+        vaga.conjunto_habilidades,
         peso_maximo=pesos['habilidades']
     )
     
@@ -158,6 +210,211 @@ def calcular_compatibilidade(candidato, vaga, pesos=None):
     return min(score_total, 100)
 
 
+class Pontuador:
+    """
+    Scorer compilado para uma versão dos pesos de matching.
+
+    Os pesos são lidos e validados uma única vez, e os scores calculados ficam em
+    um cache LRU limitado. A chave inclui `atualizado_em` do candidato e da vaga,
+    então editar qualquer um dos dois faz a entrada antiga deixar de ser usada.
+    """
+
+    def __init__(self, pesos, tamanho_cache=TAMANHO_CACHE_SCORES):
+        self.pesos = dict(pesos)
+        self.versao = tuple(sorted(self.pesos.items()))
+        self.tamanho_cache = tamanho_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _chave(self, candidato, vaga):
+        return (candidato.id, candidato.atualizado_em, vaga.id, vaga.atualizado_em, self.versao)
+
+    def pontuar(self, candidato, vaga):
+        """Score de compatibilidade do par, reaproveitando o cache quando possível"""
+        if candidato.id is None or vaga.id is None:
+            # Instâncias ainda não salvas não têm uma chave estável
+            return calcular_compatibilidade(candidato, vaga, self.pesos)
+
+        chave = self._chave(candidato, vaga)
+        with self._lock:
+            score = self._cache.get(chave)
+            if score is not None:
+                self._cache.move_to_end(chave)
+                return score
+
+        score = calcular_compatibilidade(candidato, vaga, self.pesos)
+
+        with self._lock:
+            self._cache[chave] = score
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.tamanho_cache:
+                self._cache.popitem(last=False)
+        return score
+
+    def limpar_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_pontuador = None
+_pontuador_lock = threading.Lock()
+
+
+def obter_pontuador():
+    """Retorna o Pontuador dos pesos atuais, compilando-o na primeira chamada"""
+    global _pontuador
+    pontuador = _pontuador
+    if pontuador is None:
+        with _pontuador_lock:
+            if _pontuador is None:
+                _pontuador = Pontuador(get_matching_weights())
+            pontuador = _pontuador
+    return pontuador
+
+
+def pontuar(candidato, vaga):
+    """Score de compatibilidade usando o Pontuador compartilhado (com cache)"""
+    return obter_pontuador().pontuar(candidato, vaga)
+
+
+def _descartar_pontuador(setting, **kwargs):
+    """Recompila o Pontuador quando MATCHING_WEIGHTS muda (ex.: override_settings)"""
+    global _pontuador
+    if setting == 'MATCHING_WEIGHTS':
+        with _pontuador_lock:
+            _pontuador = None
+
+
+setting_changed.connect(_descartar_pontuador)
+
+
+def _vagas_elegiveis(candidato, score_minimo, pesos, tamanho_lote=500):
+    """
+    Vagas abertas que ainda podem alcançar o score mínimo com o candidato, além
+    das que já têm match com ele. Usa o índice invertido de habilidades para
+    descartar as vagas sem habilidades suficientes em comum (só quando o score mínimo
+    passa do que os demais fatores alcançam; ver habilidades_em_comum_minimas).
+    As vagas são geradas em lotes, sem materializar todas em memória.
+    """
+    vagas_abertas = Vaga.objects.filter(status='aberta')
+    
+    # Sem corte possível: os demais fatores sozinhos já alcançam o score mínimo
+    if habilidades_em_comum_minimas(1, score_minimo, pesos) == 0:
+        yield from vagas_abertas.iterator(chunk_size=tamanho_lote)
+        return
+    
+    habilidades = candidato.conjunto_habilidades
+    vagas_com_habilidade = HabilidadeVaga.objects.filter(
+        habilidade__in=habilidades,
+        vaga__status='aberta'
+    ).values('vaga_id')
+    
+    # Total de habilidades exigidas e quantas o candidato possui, por vaga
+    contagens = HabilidadeVaga.objects.filter(
+        vaga_id__in=vagas_com_habilidade
+    ).values('vaga_id').annotate(
+        total=Count('id'),
+        em_comum=Count('id', filter=Q(habilidade__in=habilidades))
+    ).values_list('vaga_id', 'total', 'em_comum')
+    
+    vaga_ids = set()
+    for vaga_id, total, em_comum in contagens:
+        minimo = habilidades_em_comum_minimas(total, score_minimo, pesos)
+        if minimo is not None and em_comum >= minimo:
+            vaga_ids.add(vaga_id)
+    
+    vaga_ids.update(
+        Match.objects.filter(candidato=candidato, vaga__status='aberta').values_list('vaga_id', flat=True)
+    )
+    
+    vaga_ids = sorted(vaga_ids)
+    for inicio in range(0, len(vaga_ids), tamanho_lote):
+        yield from vagas_abertas.filter(id__in=vaga_ids[inicio:inicio + tamanho_lote])
+
+
+def _candidatos_elegiveis(vaga, score_minimo, pesos):
+    """
+    Candidatos que ainda podem alcançar o score mínimo com a vaga, além dos que
+    já têm match com ela. Usa o índice invertido de habilidades para descartar
+    os candidatos sem habilidades suficientes em comum (só quando o score mínimo
+    passa do que os demais fatores alcançam; ver habilidades_em_comum_minimas).
+    """
+    habilidades = vaga.conjunto_habilidades
+    minimo = habilidades_em_comum_minimas(len(habilidades), score_minimo, pesos)
+    if minimo == 0:
+        return Candidato.objects.all()
+    
+    filtro = Q(id__in=Match.objects.filter(vaga=vaga).values('candidato_id'))
+    if minimo is not None:
+        candidatos_com_habilidades = HabilidadeCandidato.objects.filter(
+            habilidade__in=habilidades
+        ).values('candidato_id').annotate(
+            em_comum=Count('id')
+        ).filter(em_comum__gte=minimo).values('candidato_id')
+        filtro |= Q(id__in=candidatos_com_habilidades)
+    
+    return Candidato.objects.filter(filtro)
+
+
+def _atualizar_scores(matches, scores, tamanho_lote=TAMANHO_LOTE):
+    """
+    Grava em lote os novos scores de matches existentes, apenas onde o score mudou
+    Retorna quantidade de matches atualizados
+    """
+    agora = timezone.now()
+    alterados = []
+    
+    for match, score in zip(matches, scores):
+        if match.score != score:
+            match.score = score
+            match.atualizado_em = agora
+            alterados.append(match)
+    
+    Match.objects.bulk_update(alterados, ['score', 'atualizado_em'], batch_size=tamanho_lote)
+    return len(alterados)
+
+
+def _salvar_matches(scores, matches_existentes, score_minimo, tamanho_lote=TAMANHO_LOTE):
+    """
+    Grava em lote o resultado de uma geração de matches
+    - scores: pares (candidato_id, vaga_id, score) calculados
+    - matches_existentes: dicionário (candidato_id, vaga_id) -> Match já gravado
+    Matches existentes só são regravados quando o score muda; novos matches acima
+    do mínimo são criados em lotes, com as notificações emitidas por lote.
+    Retorna lista de matches (existentes e novos)
+    """
+    matches = []
+    existentes = []
+    novos_scores = []
+    novos = []
+    
+    for candidato_id, vaga_id, score in scores:
+        match_existente = matches_existentes.get((candidato_id, vaga_id))
+        
+        if match_existente:
+            existentes.append(match_existente)
+            novos_scores.append(score)
+            matches.append(match_existente)
+        elif score >= score_minimo:
+            # Só cria match se score for maior que o mínimo
+            match = Match(candidato_id=candidato_id, vaga_id=vaga_id, score=score)
+            novos.append(match)
+            matches.append(match)
+    
+    # Atualiza o score dos existentes apenas se ele mudou
+    _atualizar_scores(existentes, novos_scores, tamanho_lote)
+    
+    for inicio in range(0, len(novos), tamanho_lote):
+        lote = novos[inicio:inicio + tamanho_lote]
+        with transaction.atomic():
+            Match.objects.bulk_create(lote)
+            notificar_novos_matches(lote)
+            # bulk_create não dispara post_save: os contadores são ajustados aqui
+            ajustar_estatisticas(total_matches=len(lote), matches_ativos=len(lote))
+    
+    return matches
+
+
 def gerar_matches_para_candidato(candidato_id, score_minimo=50):
     """
     Gera matches para um candidato específico
@@ -168,35 +425,22 @@ def gerar_matches_para_candidato(candidato_id, score_minimo=50):
     except Candidato.DoesNotExist:
         return []
     
-    # Busca vagas abertas
-    vagas_abertas = Vaga.objects.filter(status='aberta')
+    pesos = obter_pontuador().pesos
     
-    matches = []
-    for vaga in vagas_abertas:
-        # Verifica se já existe match
-        match_existente = Match.objects.filter(
-            candidato=candidato,
-            vaga=vaga
-        ).first()
-        
-        if match_existente:
-            # Atualiza o score do match existente
-            score = calcular_compatibilidade(candidato, vaga)
-            match_existente.score = score
-            match_existente.save()
-            matches.append(match_existente)
-        else:
-            # Calcula compatibilidade
-            score = calcular_compatibilidade(candidato, vaga)
-            
-            # Só cria match se score for maior que o mínimo
-            if score >= score_minimo:
-                match = Match.objects.create(
-                    candidato=candidato,
-                    vaga=vaga,
-                    score=score
-                )
-                matches.append(match)
+    # Busca apenas as vagas abertas que ainda podem alcançar o score mínimo
+    vagas_abertas = _vagas_elegiveis(candidato, score_minimo, pesos)
+    
+    # Matches já existentes do candidato, em uma única query
+    matches_existentes = {
+        (match.candidato_id, match.vaga_id): match
+        for match in Match.objects.filter(candidato=candidato, vaga__status='aberta')
+    }
+    
+    scores = (
+        (candidato.id, vaga.id, calcular_compatibilidade(candidato, vaga, pesos))
+        for vaga in vagas_abertas
+    )
+    matches = _salvar_matches(scores, matches_existentes, score_minimo)
     
     # Ordena por score (maior primeiro)
     matches.sort(key=lambda x: x.score, reverse=True)
@@ -206,6 +450,7 @@ def gerar_matches_para_candidato(candidato_id, score_minimo=50):
 def gerar_matches_para_vaga(vaga_id, score_minimo=50):
     """
     Gera matches para uma vaga específica
+    Os scores de todos os candidatos são calculados de uma vez pelo matching em lote
     Retorna lista de matches ordenados por score
     """
     try:
@@ -213,53 +458,272 @@ def gerar_matches_para_vaga(vaga_id, score_minimo=50):
     except Vaga.DoesNotExist:
         return []
     
-    # Busca todos os candidatos
-    candidatos = Candidato.objects.all()
+    pesos = obter_pontuador().pesos
     
-    matches = []
-    for candidato in candidatos:
-        # Verifica se já existe match
-        match_existente = Match.objects.filter(
-            candidato=candidato,
-            vaga=vaga
-        ).first()
-        
-        if match_existente:
-            # Atualiza o score
-            score = calcular_compatibilidade(candidato, vaga)
-            match_existente.score = score
-            match_existente.save()
-            matches.append(match_existente)
-        else:
-            # Calcula compatibilidade
-            score = calcular_compatibilidade(candidato, vaga)
-            
-            # Só cria match se score for maior que o mínimo
-            if score >= score_minimo:
-                match = Match.objects.create(
-                    candidato=candidato,
-                    vaga=vaga,
-                    score=score
-                )
-                matches.append(match)
+    # Carrega os candidatos elegíveis em arrays e calcula os scores em uma única passada
+    candidatos = carregar_matriz_candidatos(_candidatos_elegiveis(vaga, score_minimo, pesos))
+    scores = calcular_compatibilidade_lote(candidatos, vaga, pesos)
+    
+    # Matches já existentes da vaga, em uma única query
+    matches_existentes = {
+        (match.candidato_id, match.vaga_id): match
+        for match in Match.objects.filter(vaga=vaga)
+    }
+    
+    matches = _salvar_matches(
+        ((candidato_id, vaga.id, score) for candidato_id, score in zip(candidatos.ids.tolist(), scores.tolist())),
+        matches_existentes,
+        score_minimo
+    )
     
     # Ordena por score (maior primeiro)
     matches.sort(key=lambda x: x.score, reverse=True)
     return matches
 
 
-def recalcular_todos_matches():
+def gerar_matches_para_candidatos(candidato_ids, score_minimo=50):
     """
-    Recalcula scores de todos os matches existentes
+    Gera os matches de um grupo de candidatos (ex.: um lote importado) com todas as
+    vagas abertas: os candidatos são carregados em arrays uma vez e pontuados vaga a
+    vaga pelo matching em lote
+    Retorna a quantidade de matches (existentes e novos) do grupo
     """
-    matches = Match.objects.all()
-    atualizado = 0
+    pesos = obter_pontuador().pesos
+    candidatos = carregar_matriz_candidatos(Candidato.objects.filter(id__in=candidato_ids))
+    if not len(candidatos):
+        return 0
+    
+    matches_existentes = {
+        (match.candidato_id, match.vaga_id): match
+        for match in Match.objects.filter(candidato_id__in=candidato_ids, vaga__status='aberta')
+    }
+    ids = candidatos.ids.tolist()
+    total = 0
+    for vaga in Vaga.objects.filter(status='aberta').iterator(chunk_size=TAMANHO_LOTE):
+        scores = calcular_compatibilidade_lote(candidatos, vaga, pesos)
+        total += len(_salvar_matches(
+            ((candidato_id, vaga.id, score) for candidato_id, score in zip(ids, scores.tolist())),
+            matches_existentes,
+            score_minimo
+        ))
+    return total
+
+
+def _indices_top_k(scores, k):
+    """
+    Posições dos k maiores scores em ordem decrescente, com empates resolvidos pela
+    posição (mesma ordem do sort estável). Seleção em O(n) com np.partition.
+    """
+    if len(scores) > k:
+        limite = np.partition(scores, len(scores) - k)[len(scores) - k]
+        acima = np.flatnonzero(scores > limite)
+        empatados = np.flatnonzero(scores == limite)[:k - len(acima)]
+        selecionados = np.concatenate([acima, empatados])
+    else:
+        selecionados = np.arange(len(scores))
+    return selecionados[np.argsort(-scores[selecionados], kind='stable')]
+
+
+def gerar_top_matches_para_candidato(candidato_id, k=10, score_minimo=50, persistir_todos=False):
+    """
+    Modo top-K de gerar_matches_para_candidato: percorre as vagas elegíveis mantendo
+    apenas os K melhores pares em um heap limitado.
+    Com persistir_todos=False só os K melhores pares são criados; os matches já existentes
+    que ficam fora do top K têm o score atualizado, para as APIs não servirem scores antigos.
+    Retorna (top K matches ordenados por score, total de pares que entrariam no resultado completo)
+    """
+    if persistir_todos:
+        matches = gerar_matches_para_candidato(candidato_id, score_minimo)
+        return matches[:k], len(matches)
+    
+    try:
+        candidato = Candidato.objects.get(id=candidato_id)
+    except Candidato.DoesNotExist:
+        return [], 0
+    
+    pesos = obter_pontuador().pesos
+    matches_existentes = {
+        (match.candidato_id, match.vaga_id): match
+        for match in Match.objects.filter(candidato=candidato, vaga__status='aberta')
+    }
+    
+    # Heap mínimo com os K melhores: (score, -ordem, vaga_id); em empates a vaga vista
+    # primeiro fica à frente, como no sort estável do modo completo
+    heap = []
+    total = 0
+    scores_existentes = {}
+    for ordem, vaga in enumerate(_vagas_elegiveis(candidato, score_minimo, pesos)):
+        score = calcular_compatibilidade(candidato, vaga, pesos)
+        if (candidato.id, vaga.id) in matches_existentes:
+            scores_existentes[vaga.id] = score
+        elif score < score_minimo:
+            continue
+        
+        total += 1
+        item = (score, -ordem, vaga.id)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    
+    melhores = sorted(heap, reverse=True)
+    matches = _salvar_matches(
+        ((candidato.id, vaga_id, score) for score, _, vaga_id in melhores),
+        matches_existentes,
+        score_minimo
+    )
+    
+    # Matches existentes que saíram do top K: só o score é atualizado
+    no_top = {vaga_id for _, _, vaga_id in melhores}
+    fora_do_top = [(vaga_id, score) for vaga_id, score in scores_existentes.items() if vaga_id not in no_top]
+    _atualizar_scores(
+        [matches_existentes[(candidato.id, vaga_id)] for vaga_id, _ in fora_do_top],
+        [score for _, score in fora_do_top]
+    )
+    
+    matches.sort(key=lambda x: x.score, reverse=True)
+    prefetch_related_objects(matches, 'vaga__empresa')
+    return matches, total
+
+
+def gerar_top_matches_para_vaga(vaga_id, k=10, score_minimo=50, persistir_todos=False):
+    """
+    Modo top-K de gerar_matches_para_vaga: seleciona os K melhores candidatos direto
+    do array de scores, sem montar a lista completa de matches.
+    Com persistir_todos=False só os K melhores pares são criados; os matches já existentes
+    que ficam fora do top K têm o score atualizado, para as APIs não servirem scores antigos.
+    Retorna (top K matches ordenados por score, total de pares que entrariam no resultado completo)
+    """
+    if persistir_todos:
+        matches = gerar_matches_para_vaga(vaga_id, score_minimo)
+        return matches[:k], len(matches)
+    
+    try:
+        vaga = Vaga.objects.get(id=vaga_id)
+    except Vaga.DoesNotExist:
+        return [], 0
+    
+    pesos = obter_pontuador().pesos
+    candidatos = carregar_matriz_candidatos(_candidatos_elegiveis(vaga, score_minimo, pesos))
+    scores = calcular_compatibilidade_lote(candidatos, vaga, pesos)
     
+    matches_existentes = {
+        (match.candidato_id, match.vaga_id): match
+        for match in Match.objects.filter(vaga=vaga)
+    }
+    com_match = np.isin(candidatos.ids, [candidato_id for candidato_id, _ in matches_existentes])
+    elegiveis = np.flatnonzero((scores >= score_minimo) | com_match)
+    
+    melhores = elegiveis[_indices_top_k(scores[elegiveis], k)]
+    matches = _salvar_matches(
+        ((candidato_id, vaga.id, score) for candidato_id, score in zip(candidatos.ids[melhores].tolist(), scores[melhores].tolist())),
+        matches_existentes,
+        score_minimo
+    )
+    
+    # Matches existentes que saíram do top K: só o score é atualizado
+    no_top = np.zeros(len(scores), dtype=bool)
+    no_top[melhores] = True
+    fora_do_top = np.flatnonzero(com_match & ~no_top)
+    _atualizar_scores(
+        [matches_existentes[(candidato_id, vaga.id)] for candidato_id in candidatos.ids[fora_do_top].tolist()],
+        scores[fora_do_top].tolist()
+    )
+    
+    matches.sort(key=lambda x: x.score, reverse=True)
+    prefetch_related_objects(matches, 'candidato')
+    return matches, len(elegiveis)
+
+
+def recalcular_matches_candidato(candidato_id):
+    """
+    Recalcula apenas os matches já existentes de um candidato
+    Retorna quantidade de matches atualizados
+    """
+    try:
+        candidato = Candidato.objects.get(id=candidato_id)
+    except Candidato.DoesNotExist:
+        return 0
+    
+    pesos = obter_pontuador().pesos
+    matches = list(Match.objects.filter(candidato=candidato).select_related('vaga'))
+    scores = [calcular_compatibilidade(candidato, match.vaga, pesos) for match in matches]
+    return _atualizar_scores(matches, scores)
+
+
+def recalcular_matches_vaga(vaga_id):
+    """
+    Recalcula apenas os matches já existentes de uma vaga, usando o matching em lote
+    Retorna quantidade de matches atualizados
+    """
+    try:
+        vaga = Vaga.objects.get(id=vaga_id)
+    except Vaga.DoesNotExist:
+        return 0
+    
+    matches_existentes = {match.candidato_id: match for match in Match.objects.filter(vaga=vaga)}
+    candidatos = carregar_matriz_candidatos(
+        Candidato.objects.filter(id__in=Match.objects.filter(vaga=vaga).values('candidato_id'))
+    )
+    scores = calcular_compatibilidade_lote(candidatos, vaga, obter_pontuador().pesos)
+    
+    pares = [
+        (matches_existentes[candidato_id], score)
+        for candidato_id, score in zip(candidatos.ids.tolist(), scores.tolist())
+        if candidato_id in matches_existentes
+    ]
+    return _atualizar_scores([match for match, _ in pares], [score for _, score in pares])
+
+
+def calcular_scores_intervalo(id_inicio, id_fim, pesos=None):
+    """
+    Recalcula os scores dos matches com id no intervalo [id_inicio, id_fim)
+    Candidato e vaga vêm na mesma query (sem N+1) e nada é gravado
+    Retorna (total de matches no intervalo, lista de (match_id, novo_score) que mudaram)
+    """
+    if pesos is None:
+        pesos = obter_pontuador().pesos
+    
+    matches = Match.objects.filter(
+        id__gte=id_inicio,
+        id__lt=id_fim
+    ).select_related('candidato', 'vaga').order_by('id')
+    
+    total = 0
+    alterados = []
     for match in matches:
-        novo_score = calcular_compatibilidade(match.candidato, match.vaga)
+        total += 1
+        novo_score = calcular_compatibilidade(match.candidato, match.vaga, pesos)
         if match.score != novo_score:
-            match.score = novo_score
-            match.save()
-            atualizado += 1
+            alterados.append((match.id, novo_score))
+    
+    return total, alterados
+
+
+def gravar_scores(alterados, tamanho_lote=TAMANHO_LOTE):
+    """Grava em lote uma lista de (match_id, novo_score)"""
+    agora = timezone.now()
+    Match.objects.bulk_update(
+        [Match(id=match_id, score=score, atualizado_em=agora) for match_id, score in alterados],
+        ['score', 'atualizado_em'],
+        batch_size=tamanho_lote
+    )
+
+
+def recalcular_todos_matches(tamanho_intervalo=5000):
+    """
+    Recalcula scores de todos os matches existentes, em intervalos de id
+    Para bases grandes use o comando `recalcular_matches`, que paraleliza e retoma
+    """
+    pesos = obter_pontuador().pesos
+    limites = Match.objects.aggregate(menor=Min('id'), maior=Max('id'))
+    if limites['menor'] is None:
+        return 0
+    
+    atualizado = 0
+    for inicio in range(limites['menor'], limites['maior'] + 1, tamanho_intervalo):
+        _, alterados = calcular_scores_intervalo(inicio, inicio + tamanho_intervalo, pesos)
+        gravar_scores(alterados)
+        atualizado += len(alterados)
     
     return atualizado
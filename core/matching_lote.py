@@ -0,0 +1,171 @@
+"""
+Matching em lote (vetorizado)
+Calcula o score de uma vaga contra todos os candidatos de uma só vez usando NumPy.
+As funções escalares de matching.py continuam sendo a implementação de referência:
+cada regra aqui reproduz exatamente os mesmos inteiros que elas produzem.
+"""
+import numpy as np
+
+from .models import Candidato
+from .habilidades import conjunto_habilidades
+
+
+def _normalizar_texto(valor):
+    """Mesma normalização usada na comparação de cidade/estado do matching escalar"""
+    return (valor or '').strip().lower()
+
+
+class MatrizCandidatos:
+    """
+    Features dos candidatos carregadas em arrays NumPy, alinhadas por posição com `ids`.
+
+    - experiencia: anos de experiência (int64)
+    - pretensao: pretensão salarial (float64, NaN quando vazia)
+    - cidade / estado: códigos inteiros dos textos normalizados (0 = vazio)
+    - habilidades: pares (dono, habilidade) em formato esparso, onde `dono` é a
+      posição do candidato e `habilidade` o índice no vocabulário
+    """
+
+    def __init__(self, linhas):
+        self.codigos_cidade = {}
+        self.codigos_estado = {}
+        self.vocabulario = {}
+
+        ids = []
+        experiencia = []
+        pretensao = []
+        cidades = []
+        estados = []
+        donos = []
+        habilidades = []
+
+        for posicao, (candidato_id, anos, salario, cidade, estado, habilidades_normalizadas) in enumerate(linhas):
+            ids.append(candidato_id)
+            experiencia.append(anos)
+            pretensao.append(float(salario) if salario is not None else np.nan)
+            cidades.append(self._codigo(self.codigos_cidade, cidade))
+            estados.append(self._codigo(self.codigos_estado, estado))
+
+            for habilidade in conjunto_habilidades(habilidades_normalizadas):
+                indice = self.vocabulario.setdefault(habilidade, len(self.vocabulario))
+                donos.append(posicao)
+                habilidades.append(indice)
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.experiencia = np.array(experiencia, dtype=np.int64)
+        self.pretensao = np.array(pretensao, dtype=np.float64)
+        self.cidade = np.array(cidades, dtype=np.int64)
+        self.estado = np.array(estados, dtype=np.int64)
+        self.habilidade_dono = np.array(donos, dtype=np.int64)
+        self.habilidade_indice = np.array(habilidades, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _codigo(codigos, valor):
+        normalizado = _normalizar_texto(valor)
+        if not normalizado:
+            return 0
+        return codigos.setdefault(normalizado, len(codigos) + 1)
+
+    def codigo_cidade(self, valor):
+        """Código da cidade da vaga; -1 quando vazia ou inexistente entre os candidatos"""
+        normalizado = _normalizar_texto(valor)
+        return self.codigos_cidade.get(normalizado, -1) if normalizado else -1
+
+    def codigo_estado(self, valor):
+        """Código do estado da vaga; -1 quando vazio ou inexistente entre os candidatos"""
+        normalizado = _normalizar_texto(valor)
+        return self.codigos_estado.get(normalizado, -1) if normalizado else -1
+
+
+def carregar_matriz_candidatos(candidatos=None, chunk_size=2000):
+    """
+    Carrega os candidatos em uma MatrizCandidatos com uma única query.
+    Aceita um queryset opcional para restringir os candidatos carregados.
+    """
+    if candidatos is None:
+        candidatos = Candidato.objects.all()
+
+    linhas = candidatos.order_by('id').values_list(
+        'id', 'experiencia_anos', 'pretensao_salarial', 'cidade', 'estado', 'habilidades_normalizadas'
+    ).iterator(chunk_size=chunk_size)
+    return MatrizCandidatos(linhas)
+
+
+def _scores_habilidades(matriz, vaga_set, peso_maximo):
+    if not vaga_set:
+        return np.zeros(len(matriz), dtype=np.float64)
+
+    indices_vaga = [matriz.vocabulario[h] for h in vaga_set if h in matriz.vocabulario]
+    em_comum = np.isin(matriz.habilidade_indice, indices_vaga)
+    quantidade = np.bincount(matriz.habilidade_dono[em_comum], minlength=len(matriz))
+
+    # Mesma ordem de operações do escalar para obter o mesmo arredondamento
+    porcentagem = (quantidade / len(vaga_set)) * 100
+    scores = np.trunc(porcentagem * peso_maximo / 100)
+    return np.minimum(scores, peso_maximo)
+
+
+def _scores_experiencia(matriz, vaga_anos_min, peso_maximo):
+    anos = matriz.experiencia
+    return np.select(
+        [anos >= vaga_anos_min, anos >= vaga_anos_min * 0.7, anos >= vaga_anos_min * 0.5],
+        [peso_maximo, int(peso_maximo * 0.75), int(peso_maximo * 0.5)],
+        default=int(peso_maximo * 0.2),
+    ).astype(np.float64)
+
+
+def _scores_localizacao(matriz, vaga, peso_maximo):
+    if vaga.tipo == 'remoto':
+        return np.full(len(matriz), peso_maximo, dtype=np.float64)
+
+    mesma_cidade = matriz.cidade == matriz.codigo_cidade(vaga.cidade)
+    mesmo_estado = matriz.estado == matriz.codigo_estado(vaga.estado)
+    outros = int(peso_maximo * 0.25) if vaga.tipo == 'hibrido' else 0
+
+    return np.select(
+        [mesma_cidade, mesmo_estado],
+        [peso_maximo, int(peso_maximo * 0.75)],
+        default=outros,
+    ).astype(np.float64)
+
+
+def _scores_salario(matriz, vaga_salario_min, vaga_salario_max, peso_maximo):
+    metade = int(peso_maximo * 0.5)
+    if not vaga_salario_min:
+        return np.full(len(matriz), metade, dtype=np.float64)
+
+    salario_min = float(vaga_salario_min)
+    salario_max = float(vaga_salario_max) if vaga_salario_max else None
+    pretensao = matriz.pretensao
+
+    sem_pretensao = np.isnan(pretensao) | (pretensao == 0)
+    condicoes = [sem_pretensao]
+    valores = [metade]
+    if salario_max:
+        condicoes += [(salario_min <= pretensao) & (pretensao <= salario_max), pretensao <= salario_max * 1.2]
+        valores += [peso_maximo, int(peso_maximo * 0.75)]
+    condicoes.append(pretensao <= salario_min * 1.5)
+    valores.append(metade)
+
+    return np.select(condicoes, valores, default=int(peso_maximo * 0.2)).astype(np.float64)
+
+
+def calcular_compatibilidade_lote(matriz, vaga, pesos):
+    """
+    Calcula o score de compatibilidade de todos os candidatos da matriz com a vaga.
+    Retorna um array alinhado com `matriz.ids`, com os mesmos valores de
+    calcular_compatibilidade para cada par.
+    """
+    scores = _scores_habilidades(matriz, vaga.conjunto_habilidades, pesos['habilidades'])
+    scores += _scores_experiencia(matriz, vaga.experiencia_minima, pesos['experiencia'])
+    scores += _scores_localizacao(matriz, vaga, pesos['localizacao'])
+    scores += _scores_salario(matriz, vaga.salario_min, vaga.salario_max, pesos['salario'])
+    scores = np.minimum(scores, 100)
+
+    # Com pesos inteiros todos os componentes são inteiros exatos
+    if all(float(peso).is_integer() for peso in pesos.values()):
+        return scores.astype(np.int64)
+    return scores
@@ -0,0 +1,195 @@
+"""
+Instrumentação por requisição
+Conta as queries, o tempo de banco e o tempo total de cada requisição, agrupando
+por nome de URL em histogramas mantidos em memória no processo.
+O contador da requisição fica em uma ContextVar e o execute_wrapper que o alimenta é
+instalado em toda conexão criada: sob ASGI as views síncronas rodam em threads do
+sync_to_async, cada uma com a sua conexão, e herdam o contexto da requisição.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('core.instrumentacao')
+
+# Limites superiores dos buckets dos histogramas (o último bucket é "acima do maior")
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BUCKETS_QUERIES = (1, 2, 5, 10, 20, 50, 100, 200)
+
+ORCAMENTOS_PADRAO = {
+    'queries': 50,
+    'db_ms': 250,
+    'total_ms': 1000,
+}
+
+
+class Histograma:
+    """Histograma de buckets fixos com contagem, soma e máximo"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma = 0
+        self.maximo = 0
+
+    def registrar(self, valor):
+        indice = len(self.limites)
+        for posicao, limite in enumerate(self.limites):
+            if valor <= limite:
+                indice = posicao
+                break
+        self.contagens[indice] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def como_dict(self):
+        rotulos = [f'<={limite}' for limite in self.limites] + [f'>{self.limites[-1]}']
+        return {
+            'total': self.total,
+            'media': round(self.soma / self.total, 2) if self.total else 0,
+            'maximo': round(self.maximo, 2),
+            'buckets': dict(zip(rotulos, self.contagens)),
+        }
+
+
+class MetricasRequisicoes:
+    """Histogramas de queries, tempo de banco e tempo total por nome de URL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_url = {}
+
+    def registrar(self, url_name, queries, db_ms, total_ms):
+        with self._lock:
+            metricas = self._por_url.get(url_name)
+            if metricas is None:
+                metricas = self._por_url[url_name] = {
+                    'queries': Histograma(BUCKETS_QUERIES),
+                    'db_ms': Histograma(BUCKETS_MS),
+                    'total_ms': Histograma(BUCKETS_MS),
+                }
+            metricas['queries'].registrar(queries)
+            metricas['db_ms'].registrar(db_ms)
+            metricas['total_ms'].registrar(total_ms)
+
+    def resumo(self):
+        with self._lock:
+            return {
+                url_name: {nome: histograma.como_dict() for nome, histograma in metricas.items()}
+                for url_name, metricas in sorted(self._por_url.items())
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._por_url.clear()
+
+
+metricas = MetricasRequisicoes()
+
+
+def orcamentos_para(url_name):
+    """Orçamentos da URL: padrão, sobrescrito pelas configurações globais e por URL"""
+    orcamentos = {**ORCAMENTOS_PADRAO, **getattr(settings, 'INSTRUMENTACAO_ORCAMENTOS', {})}
+    orcamentos.update(getattr(settings, 'INSTRUMENTACAO_ORCAMENTOS_POR_URL', {}).get(url_name, {}))
+    return orcamentos
+
+
+class _ContadorQueries:
+    """Quantidade e tempo acumulados das queries da requisição"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duracao = 0.0
+
+
+_contador_atual = ContextVar('contador_queries', default=None)
+
+
+def _contar_query(execute, sql, params, many, context):
+    """execute_wrapper de todas as conexões: conta só dentro de uma requisição medida"""
+    contador = _contador_atual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        contador.duracao += time.perf_counter() - inicio
+        contador.queries += 1
+
+
+@receiver(connection_created)
+def instalar_contador_queries(sender, connection, **kwargs):
+    """Instala o wrapper em cada conexão (uma vez, mesmo após reconectar)"""
+    if _contar_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_query)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição, adiciona o cabeçalho Server-Timing, alimenta os
+    histogramas por URL e registra em log as que estouram os orçamentos.
+    Funciona nos dois modos, para não forçar as views async a rodar em thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        contador = _ContadorQueries()
+        inicio = time.perf_counter()
+        token = _contador_atual.set(contador)
+        try:
+            response = self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+        return self._registrar(request, response, contador, inicio)
+
+    async def __acall__(self, request):
+        contador = _ContadorQueries()
+        inicio = time.perf_counter()
+        token = _contador_atual.set(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+        return self._registrar(request, response, contador, inicio)
+
+    def _registrar(self, request, response, contador, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = contador.duracao * 1000
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        url_name = (resolver_match.view_name if resolver_match else None) or '<sem rota>'
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{contador.queries} queries", total;dur={total_ms:.1f}'
+        )
+        metricas.registrar(url_name, contador.queries, db_ms, total_ms)
+        self._verificar_orcamentos(request, url_name, contador.queries, db_ms, total_ms)
+        return response
+
+    def _verificar_orcamentos(self, request, url_name, queries, db_ms, total_ms):
+        orcamentos = orcamentos_para(url_name)
+        excedidos = [
+            f'{nome}={valor:.0f} (orçamento {orcamentos[nome]})'
+            for nome, valor in (('queries', queries), ('db_ms', db_ms), ('total_ms', total_ms))
+            if valor > orcamentos[nome]
+        ]
+        if excedidos:
+            logger.warning('%s %s [%s] acima do orçamento: %s',
+                           request.method, request.path, url_name, ', '.join(excedidos))
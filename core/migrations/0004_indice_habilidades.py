@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Cópia de core.habilidades.tokenizar_habilidades na época desta migração: mudanças
+# futuras no tokenizador não alteram o que ela grava
+def tokenizar_habilidades(texto):
+    if not texto:
+        return set()
+    return set([h.strip().lower() for h in texto.split(',') if h.strip()])
+
+
+def _gravar_em_lotes(Modelo, registros, tamanho_lote=1000):
+    """bulk_create em blocos explícitos: só um lote do índice fica em memória"""
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tamanho_lote:
+            Modelo.objects.bulk_create(lote)
+            lote = []
+    Modelo.objects.bulk_create(lote)
+
+
+def popular_indice_habilidades(apps, schema_editor):
+    Candidato = apps.get_model('core', 'Candidato')
+    Vaga = apps.get_model('core', 'Vaga')
+    HabilidadeCandidato = apps.get_model('core', 'HabilidadeCandidato')
+    HabilidadeVaga = apps.get_model('core', 'HabilidadeVaga')
+
+    _gravar_em_lotes(HabilidadeCandidato, (
+        HabilidadeCandidato(habilidade=habilidade, candidato_id=candidato_id)
+        for candidato_id, texto in Candidato.objects.values_list('id', 'habilidades').iterator(chunk_size=1000)
+        for habilidade in tokenizar_habilidades(texto)
+    ))
+    _gravar_em_lotes(HabilidadeVaga, (
+        HabilidadeVaga(habilidade=habilidade, vaga_id=vaga_id)
+        for vaga_id, texto in Vaga.objects.values_list('id', 'habilidades_necessarias').iterator(chunk_size=1000)
+        for habilidade in tokenizar_habilidades(texto)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_mensagem_match_candidatura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabilidadeCandidato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('habilidade', models.TextField()),
+                ('candidato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indice_habilidades', to='core.candidato')),
+            ],
+            options={
+                'verbose_name_plural': 'Índice de Habilidades dos Candidatos',
+                'unique_together': {('habilidade', 'candidato')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HabilidadeVaga',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('habilidade', models.TextField()),
+                ('vaga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indice_habilidades', to='core.vaga')),
+            ],
+            options={
+                'verbose_name_plural': 'Índice de Habilidades das Vagas',
+                'unique_together': {('habilidade', 'vaga')},
+            },
+        ),
+        migrations.RunPython(popular_indice_habilidades, migrations.RunPython.noop),
+    ]
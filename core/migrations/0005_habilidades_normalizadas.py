@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:06
+
+import hashlib
+
+from django.db import migrations, models
+
+
+# Cópias de core.habilidades na época desta migração: mudanças futuras na normalização
+# não alteram o que ela grava
+def normalizar_habilidades(texto):
+    if not texto:
+        return ''
+    return ','.join(sorted(set([h.strip().lower() for h in texto.split(',') if h.strip()])))
+
+
+def hash_habilidades(normalizadas):
+    return hashlib.sha1(normalizadas.encode('utf-8')).hexdigest()
+
+
+def preencher_habilidades_normalizadas(apps, schema_editor):
+    for modelo, campo in (('Candidato', 'habilidades'), ('Vaga', 'habilidades_necessarias')):
+        Modelo = apps.get_model('core', modelo)
+        pendentes = []
+        for objeto in Modelo.objects.only('id', campo).iterator(chunk_size=1000):
+            objeto.habilidades_normalizadas = normalizar_habilidades(getattr(objeto, campo))
+            objeto.habilidades_hash = hash_habilidades(objeto.habilidades_normalizadas)
+            pendentes.append(objeto)
+            if len(pendentes) >= 1000:
+                Modelo.objects.bulk_update(pendentes, ['habilidades_normalizadas', 'habilidades_hash'], batch_size=1000)
+                pendentes = []
+        Modelo.objects.bulk_update(pendentes, ['habilidades_normalizadas', 'habilidades_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indice_habilidades'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidato',
+            name='habilidades_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='candidato',
+            name='habilidades_normalizadas',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vaga',
+            name='habilidades_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='vaga',
+            name='habilidades_normalizadas',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(preencher_habilidades_normalizadas, migrations.RunPython.noop),
+    ]
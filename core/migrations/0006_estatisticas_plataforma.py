@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+def criar_estatisticas(apps, schema_editor):
+    Candidato = apps.get_model('core', 'Candidato')
+    Empresa = apps.get_model('core', 'Empresa')
+    Vaga = apps.get_model('core', 'Vaga')
+    Match = apps.get_model('core', 'Match')
+    EstatisticasPlataforma = apps.get_model('core', 'EstatisticasPlataforma')
+    EstatisticasPlataforma.objects.create(
+        pk=1,
+        total_candidatos=Candidato.objects.count(),
+        total_empresas=Empresa.objects.count(),
+        total_vagas=Vaga.objects.count(),
+        vagas_abertas=Vaga.objects.filter(status='aberta').count(),
+        total_matches=Match.objects.count(),
+        matches_ativos=Match.objects.filter(status='pendente').count(),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_habilidades_normalizadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticasPlataforma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_candidatos', models.IntegerField(default=0)),
+                ('total_empresas', models.IntegerField(default=0)),
+                ('total_vagas', models.IntegerField(default=0)),
+                ('vagas_abertas', models.IntegerField(default=0)),
+                ('total_matches', models.IntegerField(default=0)),
+                ('matches_ativos', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Estatísticas da Plataforma',
+            },
+        ),
+        migrations.RunPython(criar_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_estatisticas_plataforma'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaga',
+            index=models.Index(fields=['status', 'criado_em', 'id'], name='vaga_status_criado_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+# Cópias de core.busca na época desta migração: mudanças futuras na tabela de busca, no
+# tokenizador ou nos pesos não alteram o que ela cria e indexa
+TABELA_BUSCA = 'core_vaga_busca'
+CONFIGURACAO_PG = 'portuguese'
+CAMPOS_BUSCA = ('titulo', 'descricao', 'requisitos', 'habilidades_necessarias')
+TAMANHO_LOTE = 1000
+
+
+def _backend(conexao):
+    return conexao.vendor if conexao.vendor in ('sqlite', 'postgresql') else None
+
+
+def _indexar_vagas(linhas, conexao):
+    backend = _backend(conexao)
+    linhas = [(id, *(valor or '' for valor in valores)) for id, *valores in linhas]
+    if not backend or not linhas:
+        return
+
+    with conexao.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {TABELA_BUSCA} '
+                f'(rowid, titulo, descricao, requisitos, habilidades_necessarias) VALUES (%s, %s, %s, %s, %s)',
+                linhas,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABELA_BUSCA} (vaga_id, documento) VALUES (%s, "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'A') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'C') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'C') || "
+                f"setweight(to_tsvector('{CONFIGURACAO_PG}', %s), 'B')) "
+                f"ON CONFLICT (vaga_id) DO UPDATE SET documento = EXCLUDED.documento",
+                linhas,
+            )
+
+
+def criar_busca(apps, schema_editor):
+    backend = _backend(schema_editor.connection)
+    if backend == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5("
+            f"titulo, descricao, requisitos, habilidades_necessarias, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif backend == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABELA_BUSCA} ("
+            f"vaga_id bigint PRIMARY KEY REFERENCES core_vaga(id) ON DELETE CASCADE, "
+            f"documento tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABELA_BUSCA}_documento_idx ON {TABELA_BUSCA} USING GIN (documento)"
+        )
+    else:
+        return
+
+    Vaga = apps.get_model('core', 'Vaga')
+    lote = []
+    for linha in Vaga.objects.values_list('id', *CAMPOS_BUSCA).iterator(chunk_size=TAMANHO_LOTE):
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE:
+            _indexar_vagas(lote, schema_editor.connection)
+            lote = []
+    _indexar_vagas(lote, schema_editor.connection)
+
+
+def remover_busca(apps, schema_editor):
+    if _backend(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA_BUSCA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indice_vaga_status_criado'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_busca, remover_busca),
+    ]
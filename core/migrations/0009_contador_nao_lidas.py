@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def preencher_contadores(apps, schema_editor):
+    Notificacao = apps.get_model('core', 'Notificacao')
+    Mensagem = apps.get_model('core', 'Mensagem')
+    ContadorNaoLidas = apps.get_model('core', 'ContadorNaoLidas')
+    
+    contadores = {}
+    for linha in Notificacao.objects.filter(lida=False).values('usuario_id').annotate(total=Count('id')):
+        contadores.setdefault(linha['usuario_id'], ContadorNaoLidas(usuario_id=linha['usuario_id'])).notificacoes = linha['total']
+    for linha in Mensagem.objects.filter(lida=False).values('destinatario_id').annotate(total=Count('id')):
+        contadores.setdefault(linha['destinatario_id'], ContadorNaoLidas(usuario_id=linha['destinatario_id'])).mensagens = linha['total']
+    ContadorNaoLidas.objects.bulk_create(contadores.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_busca_vagas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNaoLidas',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_nao_lidas', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notificacoes', models.IntegerField(default=0)),
+                ('mensagens', models.IntegerField(default=0)),
+                ('versao', models.BigIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Contadores de Não Lidas',
+            },
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
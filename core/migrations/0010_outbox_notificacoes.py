@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_contador_nao_lidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('match_criado', 'Match criado'), ('candidatura_criada', 'Candidatura criada'), ('candidatura_atualizada', 'Candidatura atualizada'), ('mensagem_criada', 'Mensagem criada')], max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('tentativas', models.IntegerField(default=0)),
+                ('erro', models.TextField(blank=True)),
+                ('processado_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Eventos de Notificação',
+                'indexes': [models.Index(fields=['processado_em', 'id'], name='evento_pendente_idx')],
+            },
+        ),
+    ]
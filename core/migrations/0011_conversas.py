@@ -0,0 +1,168 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Least
+
+
+TAMANHO_LOTE = 1000
+
+
+def _lotes(iteravel, tamanho=TAMANHO_LOTE):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _intervalos_de_id(queryset, tamanho=TAMANHO_LOTE):
+    """Intervalos [início, fim) que cobrem os ids do queryset"""
+    limites = queryset.aggregate(menor=Min('id'), maior=Max('id'))
+    if limites['menor'] is None:
+        return
+    for inicio in range(limites['menor'], limites['maior'] + 1, tamanho):
+        yield inicio, inicio + tamanho
+
+
+def preencher_conversas(apps, schema_editor):
+    """
+    Tudo em memória constante: as conversas são criadas a partir dos pares distintos,
+    as mensagens ligadas por um UPDATE com subquery a cada faixa de ids e os resumos dos
+    participantes lidos por subquery, uma faixa de conversas por vez
+    """
+    Mensagem = apps.get_model('core', 'Mensagem')
+    Conversa = apps.get_model('core', 'Conversa')
+    ParticipanteConversa = apps.get_model('core', 'ParticipanteConversa')
+    
+    # usuario_a é sempre o de menor id
+    pares = Mensagem.objects.order_by().annotate(
+        a=Least('remetente_id', 'destinatario_id'),
+        b=Greatest('remetente_id', 'destinatario_id'),
+    ).values_list('a', 'b', 'match_id').distinct()
+    for lote in _lotes(pares.iterator(chunk_size=TAMANHO_LOTE)):
+        Conversa.objects.bulk_create([Conversa(usuario_a_id=a, usuario_b_id=b, match_id=match_id) for a, b, match_id in lote])
+    
+    conversa_da_mensagem = Conversa.objects.filter(
+        usuario_a_id=Least(OuterRef('remetente_id'), OuterRef('destinatario_id')),
+        usuario_b_id=Greatest(OuterRef('remetente_id'), OuterRef('destinatario_id')),
+    ).annotate(
+        match_ou_zero=Coalesce('match_id', 0),
+    ).filter(match_ou_zero=Coalesce(OuterRef('match_id'), 0)).values('id')[:1]
+    for inicio, fim in _intervalos_de_id(Mensagem.objects.all()):
+        Mensagem.objects.filter(id__gte=inicio, id__lt=fim).update(conversa_id=Subquery(conversa_da_mensagem))
+    
+    mensagens = Mensagem.objects.filter(conversa_id=OuterRef('pk')).order_by('-criado_em', '-id')
+    
+    def nao_lidas(usuario):
+        return Coalesce(Subquery(
+            Mensagem.objects.filter(conversa_id=OuterRef('pk'), destinatario_id=OuterRef(usuario), lida=False)
+            .order_by().values('conversa_id').annotate(total=Count('id')).values('total')
+        ), 0)
+    
+    for inicio, fim in _intervalos_de_id(Conversa.objects.all()):
+        resumos = Conversa.objects.filter(id__gte=inicio, id__lt=fim).annotate(
+            ultima_id=Subquery(mensagens.values('id')[:1]),
+            ultima_em=Subquery(mensagens.values('criado_em')[:1]),
+            nao_lidas_a=nao_lidas('usuario_a_id'),
+            nao_lidas_b=nao_lidas('usuario_b_id'),
+        ).values_list('id', 'usuario_a_id', 'usuario_b_id', 'ultima_id', 'ultima_em', 'nao_lidas_a', 'nao_lidas_b')
+        participantes = []
+        for conversa_id, usuario_a, usuario_b, ultima_id, ultima_em, nao_lidas_a, nao_lidas_b in resumos:
+            lados = {(usuario_a, usuario_b, nao_lidas_a), (usuario_b, usuario_a, nao_lidas_b)}
+            for usuario_id, outro_id, total in lados:
+                participantes.append(ParticipanteConversa(
+                    conversa_id=conversa_id,
+                    usuario_id=usuario_id,
+                    outro_usuario_id=outro_id,
+                    ultima_mensagem_id=ultima_id,
+                    ultima_mensagem_em=ultima_em,
+                    nao_lidas=total,
+                ))
+        ParticipanteConversa.objects.bulk_create(participantes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_outbox_notificacoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipanteConversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_mensagem_em', models.DateTimeField()),
+                ('nao_lidas', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Participantes de Conversas',
+            },
+        ),
+        migrations.CreateModel(
+            name='Conversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversas', to='core.match')),
+                ('usuario_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('usuario_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Conversas',
+            },
+        ),
+        migrations.AddField(
+            model_name='mensagem',
+            name='conversa',
+            field=models.ForeignKey(blank=True, help_text='Preenchida automaticamente a partir do remetente, destinatário e match', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mensagens', to='core.conversa'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagem',
+            index=models.Index(fields=['conversa', 'criado_em', 'id'], name='mensagem_conversa_idx'),
+        ),
+        migrations.AddField(
+            model_name='participanteconversa',
+            name='conversa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participantes', to='core.conversa'),
+        ),
+        migrations.AddField(
+            model_name='participanteconversa',
+            name='outro_usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='participanteconversa',
+            name='ultima_mensagem',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.mensagem'),
+        ),
+        migrations.AddField(
+            model_name='participanteconversa',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversas', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='conversa',
+            constraint=models.UniqueConstraint(fields=('usuario_a', 'usuario_b', 'match'), name='conversa_unica_por_match'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversa',
+            constraint=models.UniqueConstraint(condition=models.Q(('match__isnull', True)), fields=('usuario_a', 'usuario_b'), name='conversa_unica_sem_match'),
+        ),
+        migrations.AddIndex(
+            model_name='participanteconversa',
+            index=models.Index(fields=['usuario', 'ultima_mensagem_em', 'id'], name='participante_caixa_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='participanteconversa',
+            unique_together={('conversa', 'usuario')},
+        ),
+        migrations.RunPython(preencher_conversas, migrations.RunPython.noop),
+    ]
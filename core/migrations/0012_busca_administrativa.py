@@ -0,0 +1,99 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:46
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Cópias de core.busca na época desta migração: mudanças futuras na normalização não
+# alteram o que ela grava
+def normalizar_busca(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    return ' '.join(''.join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def normalizar_email(email):
+    return (email or '').strip().lower()
+
+
+def somente_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+COLUNAS_BUSCA = {
+    'Candidato': {'nome_busca': ('nome', normalizar_busca), 'email_busca': ('email', normalizar_email)},
+    'Empresa': {'nome_busca': ('nome', normalizar_busca), 'cnpj_busca': ('cnpj', somente_digitos)},
+}
+
+
+def preencher_colunas_busca(apps, schema_editor):
+    for modelo, colunas in COLUNAS_BUSCA.items():
+        Modelo = apps.get_model('core', modelo)
+        origens = [origem for origem, _ in colunas.values()]
+        pendentes = []
+        for objeto in Modelo.objects.only('id', *origens).iterator(chunk_size=1000):
+            for coluna, (origem, normalizar) in colunas.items():
+                setattr(objeto, coluna, normalizar(getattr(objeto, origem)))
+            pendentes.append(objeto)
+            if len(pendentes) >= 1000:
+                Modelo.objects.bulk_update(pendentes, list(colunas), batch_size=1000)
+                pendentes = []
+        Modelo.objects.bulk_update(pendentes, list(colunas), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_conversas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidato',
+            name='email_busca',
+            field=models.CharField(blank=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='candidato',
+            name='nome_busca',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='cnpj_busca',
+            field=models.CharField(blank=True, editable=False, max_length=14),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='nome_busca',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(preencher_colunas_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='candidato',
+            index=models.Index(fields=['nome_busca', 'id'], name='candidato_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidato',
+            index=models.Index(fields=['email_busca', 'id'], name='candidato_email_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='candidato',
+            index=models.Index(fields=['criado_em', 'id'], name='candidato_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['nome_busca', 'id'], name='empresa_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['cnpj_busca', 'id'], name='empresa_cnpj_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['criado_em', 'id'], name='empresa_criado_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_busca_administrativa'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventonotificacao',
+            name='tipo',
+            field=models.CharField(choices=[('match_criado', 'Match criado'), ('candidatura_criada', 'Candidatura criada'), ('candidatura_atualizada', 'Candidatura atualizada'), ('mensagem_criada', 'Mensagem criada'), ('recalculo_candidato', 'Recálculo dos matches do candidato'), ('recalculo_vaga', 'Recálculo dos matches da vaga')], max_length=30),
+        ),
+    ]
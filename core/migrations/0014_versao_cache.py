@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_eventos_recalculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoCache',
+            fields=[
+                ('grupo', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('versao', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Versões do Cache',
+            },
+        ),
+    ]
@@ -1,9 +1,86 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from .habilidades import normalizar_habilidades, hash_habilidades, conjunto_habilidades
+from .busca import normalizar_busca, normalizar_email, somente_digitos
 
 
-class Candidato(models.Model):
+class HabilidadesNormalizadasMixin(models.Model):
+    """
+    Guarda a forma canônica das habilidades (lista ordenada e hash), recalculada a cada
+    save que grava o campo indicado em `campo_habilidades`
+    """
+    campo_habilidades = 'habilidades'
+    
+    habilidades_normalizadas = models.TextField(blank=True, editable=False)
+    habilidades_hash = models.CharField(max_length=40, blank=True, editable=False)
+    
+    class Meta:
+        abstract = True
+    
+    def atualizar_habilidades_normalizadas(self):
+        """Recalcula a forma canônica (também usado por quem grava sem save(), ex. bulk_create)"""
+        normalizadas = normalizar_habilidades(getattr(self, self.campo_habilidades))
+        novo_hash = hash_habilidades(normalizadas)
+        self._habilidades_alteradas = novo_hash != self.habilidades_hash
+        self.habilidades_normalizadas = normalizadas
+        self.habilidades_hash = novo_hash
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.campo_habilidades in update_fields:
+            self.atualizar_habilidades_normalizadas()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'habilidades_normalizadas', 'habilidades_hash'}
+        else:
+            # As habilidades não são gravadas: o índice invertido não pode mudar
+            self._habilidades_alteradas = False
+        
+        super().save(*args, **kwargs)
+    
+    @property
+    def conjunto_habilidades(self):
+        """Conjunto de habilidades normalizadas usado pelo matching"""
+        if not self.habilidades_hash:
+            # Instância ainda não salva: normaliza a partir do texto original
+            return conjunto_habilidades(normalizar_habilidades(getattr(self, self.campo_habilidades)))
+        return conjunto_habilidades(self.habilidades_normalizadas)
+
+
+class CamposBuscaMixin(models.Model):
+    """
+    Colunas normalizadas (minúsculas, sem acentos, só dígitos...) usadas nas buscas
+    por prefixo das listagens administrativas, recalculadas a cada save
+    """
+    # coluna de busca -> (campo de origem, normalização)
+    campos_busca = {}
+    
+    class Meta:
+        abstract = True
+    
+    def atualizar_campos_busca(self):
+        """Recalcula as colunas (também usado por quem grava sem save(), ex. bulk_create)"""
+        for coluna, (origem, normalizar) in self.campos_busca.items():
+            setattr(self, coluna, normalizar(getattr(self, origem)))
+    
+    def save(self, *args, **kwargs):
+        self.atualizar_campos_busca()
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            colunas = {coluna for coluna, (origem, _) in self.campos_busca.items() if origem in update_fields}
+            if colunas:
+                kwargs['update_fields'] = {*update_fields, *colunas}
+        
+        super().save(*args, **kwargs)
+
+
+class Candidato(CamposBuscaMixin, HabilidadesNormalizadasMixin):
+    campos_busca = {
+        'nome_busca': ('nome', normalizar_busca),
+        'email_busca': ('email', normalizar_email),
+    }
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     nome = models.CharField(max_length=200)
     email = models.EmailField(unique=True)
@@ -22,17 +99,31 @@ class Candidato(models.Model):
     pretensao_salarial = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     curriculo = models.TextField(blank=True)
     
+    nome_busca = models.CharField(max_length=200, blank=True, editable=False)
+    email_busca = models.CharField(max_length=254, blank=True, editable=False)
+    
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Candidatos"
+        indexes = [
+            # Busca administrativa por prefixo, paginada por cursor na mesma ordem
+            models.Index(fields=['nome_busca', 'id'], name='candidato_nome_busca_idx'),
+            models.Index(fields=['email_busca', 'id'], name='candidato_email_busca_idx'),
+            models.Index(fields=['criado_em', 'id'], name='candidato_criado_idx'),
+        ]
     
     def __str__(self):
         return self.nome
 
 
-class Empresa(models.Model):
+class Empresa(CamposBuscaMixin):
+    campos_busca = {
+        'nome_busca': ('nome', normalizar_busca),
+        'cnpj_busca': ('cnpj', somente_digitos),
+    }
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     nome = models.CharField(max_length=200)
     cnpj = models.CharField(max_length=18, unique=True)
@@ -45,17 +136,27 @@ class Empresa(models.Model):
     descricao = models.TextField(blank=True)
     site = models.URLField(blank=True)
     
+    nome_busca = models.CharField(max_length=200, blank=True, editable=False)
+    cnpj_busca = models.CharField(max_length=14, blank=True, editable=False)
+    
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Empresas"
+        indexes = [
+            models.Index(fields=['nome_busca', 'id'], name='empresa_nome_busca_idx'),
+            models.Index(fields=['cnpj_busca', 'id'], name='empresa_cnpj_busca_idx'),
+            models.Index(fields=['criado_em', 'id'], name='empresa_criado_idx'),
+        ]
     
     def __str__(self):
         return self.nome
 
 
-class Vaga(models.Model):
+class Vaga(HabilidadesNormalizadasMixin):
+    campo_habilidades = 'habilidades_necessarias'
+    
     NIVEL_CHOICES = [
         ('estagio', 'Estágio'),
         ('junior', 'Júnior'),
@@ -95,11 +196,41 @@ class Vaga(models.Model):
     class Meta:
         verbose_name_plural = "Vagas"
         ordering = ['-criado_em']
+        indexes = [
+            # Listagem de vagas abertas paginada por cursor em (criado_em, id)
+            models.Index(fields=['status', 'criado_em', 'id'], name='vaga_status_criado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.empresa.nome}"
 
 
+class HabilidadeCandidato(models.Model):
+    """Índice invertido: habilidade normalizada -> candidatos que a possuem"""
+    habilidade = models.TextField()
+    candidato = models.ForeignKey(Candidato, on_delete=models.CASCADE, related_name='indice_habilidades')
+
+    class Meta:
+        verbose_name_plural = "Índice de Habilidades dos Candidatos"
+        unique_together = ['habilidade', 'candidato']
+
+    def __str__(self):
+        return f"{self.habilidade} -> {self.candidato_id}"
+
+
+class HabilidadeVaga(models.Model):
+    """Índice invertido: habilidade normalizada -> vagas que a exigem"""
+    habilidade = models.TextField()
+    vaga = models.ForeignKey(Vaga, on_delete=models.CASCADE, related_name='indice_habilidades')
+
+    class Meta:
+        verbose_name_plural = "Índice de Habilidades das Vagas"
+        unique_together = ['habilidade', 'vaga']
+
+    def __str__(self):
+        return f"{self.habilidade} -> {self.vaga_id}"
+
+
 class Match(models.Model):
     STATUS_CHOICES = [
         ('pendente', 'Pendente'),
@@ -161,10 +292,34 @@ class Candidatura(models.Model):
         return f"{self.candidato.nome} - {self.vaga.titulo} ({self.status})"
 
 
+class Conversa(models.Model):
+    """
+    Conversa entre dois usuários, opcionalmente ligada a um match.
+    usuario_a é sempre o de menor id, então o par identifica a conversa.
+    """
+    usuario_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    usuario_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, null=True, blank=True, related_name='conversas')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = "Conversas"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario_a', 'usuario_b', 'match'], name='conversa_unica_por_match'),
+            models.UniqueConstraint(fields=['usuario_a', 'usuario_b'], condition=models.Q(match__isnull=True),
+                                    name='conversa_unica_sem_match'),
+        ]
+    
+    def __str__(self):
+        return f"Conversa {self.usuario_a_id} <-> {self.usuario_b_id}"
+
+
 class Mensagem(models.Model):
     remetente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mensagens_enviadas')
     destinatario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mensagens_recebidas')
     match = models.ForeignKey(Match, on_delete=models.CASCADE, null=True, blank=True, related_name='mensagens', help_text="Match relacionado à conversa")
+    conversa = models.ForeignKey(Conversa, on_delete=models.CASCADE, null=True, blank=True, related_name='mensagens',
+                                 help_text="Preenchida automaticamente a partir do remetente, destinatário e match")
     assunto = models.CharField(max_length=200)
     conteudo = models.TextField()
     lida = models.BooleanField(default=False)
@@ -173,11 +328,39 @@ class Mensagem(models.Model):
     class Meta:
         verbose_name_plural = "Mensagens"
         ordering = ['-criado_em']
+        indexes = [
+            # Páginas da conversa por cursor em (-criado_em, -id)
+            models.Index(fields=['conversa', 'criado_em', 'id'], name='mensagem_conversa_idx'),
+        ]
     
     def __str__(self):
         return f"{self.remetente.username} -> {self.destinatario.username}: {self.assunto}"
 
 
+class ParticipanteConversa(models.Model):
+    """
+    Resumo materializado da conversa para cada participante (última mensagem e
+    não lidas), mantido pelos signals de Mensagem: a caixa de entrada é uma única
+    consulta indexada nesta tabela.
+    """
+    conversa = models.ForeignKey(Conversa, on_delete=models.CASCADE, related_name='participantes')
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversas')
+    outro_usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    ultima_mensagem = models.ForeignKey(Mensagem, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    ultima_mensagem_em = models.DateTimeField()
+    nao_lidas = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Participantes de Conversas"
+        unique_together = ['conversa', 'usuario']
+        indexes = [
+            models.Index(fields=['usuario', 'ultima_mensagem_em', 'id'], name='participante_caixa_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario_id} em {self.conversa_id} ({self.nao_lidas} não lidas)"
+
+
 class Curso(models.Model):
     titulo = models.CharField(max_length=200)
     descricao = models.TextField()
@@ -233,3 +416,88 @@ class Notificacao(models.Model):
     
     def __str__(self):
         return f"{self.usuario.username} - {self.titulo}"
+
+
+class EstatisticasPlataforma(models.Model):
+    """
+    Contadores da plataforma mantidos pelos signals (linha única, pk=1).
+    O comando reconciliar_estatisticas corrige eventuais divergências.
+    """
+    total_candidatos = models.IntegerField(default=0)
+    total_empresas = models.IntegerField(default=0)
+    total_vagas = models.IntegerField(default=0)
+    vagas_abertas = models.IntegerField(default=0)
+    total_matches = models.IntegerField(default=0)
+    matches_ativos = models.IntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Estatísticas da Plataforma"
+    
+    def __str__(self):
+        return f"Estatísticas ({self.atualizado_em:%d/%m/%Y %H:%M})"
+
+
+class ContadorNaoLidas(models.Model):
+    """
+    Notificações e mensagens não lidas de cada usuário, mantidas pelos signals.
+    `versao` muda a cada alteração e é o que o stream de notificações observa.
+    """
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='contador_nao_lidas')
+    notificacoes = models.IntegerField(default=0)
+    mensagens = models.IntegerField(default=0)
+    versao = models.BigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Contadores de Não Lidas"
+    
+    def __str__(self):
+        return f"{self.usuario_id}: {self.notificacoes} notificações, {self.mensagens} mensagens"
+
+
+class EventoNotificacao(models.Model):
+    """
+    Outbox de notificações: os signals só registram o tipo do evento e o id do
+    objeto; o comando processar_notificacoes gera as Notificacao em lote e executa
+    os recálculos de score enfileirados.
+    """
+    TIPO_CHOICES = [
+        ('match_criado', 'Match criado'),
+        ('candidatura_criada', 'Candidatura criada'),
+        ('candidatura_atualizada', 'Candidatura atualizada'),
+        ('mensagem_criada', 'Mensagem criada'),
+        ('recalculo_candidato', 'Recálculo dos matches do candidato'),
+        ('recalculo_vaga', 'Recálculo dos matches da vaga'),
+    ]
+    
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    tentativas = models.IntegerField(default=0)
+    erro = models.TextField(blank=True)
+    processado_em = models.DateTimeField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = "Eventos de Notificação"
+        indexes = [
+            models.Index(fields=['processado_em', 'id'], name='evento_pendente_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo} #{self.objeto_id}"
+
+
+class VersaoCache(models.Model):
+    """
+    Versão de cada grupo do cache de listagens (core/cache_listagens.py), incrementada a
+    cada alteração. Fica no banco para ser a mesma em todos os processos.
+    """
+    grupo = models.CharField(max_length=30, primary_key=True)
+    versao = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = "Versões do Cache"
+    
+    def __str__(self):
+        return f"{self.grupo}: {self.versao}"
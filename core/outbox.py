@@ -0,0 +1,210 @@
+"""
+Outbox de notificações
+Os signals gravam apenas (tipo, objeto_id) em EventoNotificacao, na mesma transação
+da alteração. processar_eventos consome a fila em lotes: carrega os objetos de cada
+tipo com select_related em uma query e grava todas as notificações com bulk_create.
+O recálculo dos matches de um candidato ou vaga com campos de score alterados também
+passa pela fila, para não rodar dentro da requisição que salvou o perfil.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .contadores import ajustar_notificacoes_em_lote
+from .models import Candidato, Candidatura, EventoNotificacao, Match, Mensagem, Notificacao, Vaga
+
+logger = logging.getLogger('core.outbox')
+
+# Depois de tantas falhas o evento é encerrado com o erro registrado
+MAXIMO_TENTATIVAS = 5
+
+
+def enfileirar_evento(tipo, objeto_id):
+    EventoNotificacao.objects.create(tipo=tipo, objeto_id=objeto_id)
+
+
+def enfileirar_eventos(tipo, objeto_ids):
+    EventoNotificacao.objects.bulk_create([
+        EventoNotificacao(tipo=tipo, objeto_id=objeto_id) for objeto_id in objeto_ids
+    ])
+
+
+# ---------- Montagem das notificações (sem salvar) ----------
+
+def notificacoes_match(match):
+    """Notificações de um novo match para o candidato e a empresa"""
+    notificacoes = []
+
+    if match.candidato.user_id:
+        notificacoes.append(Notificacao(
+            usuario_id=match.candidato.user_id,
+            tipo='match',
+            titulo='Novo Match Encontrado!',
+            mensagem=f'Você tem {match.score}% de compatibilidade com a vaga "{match.vaga.titulo}" da empresa {match.vaga.empresa.nome}',
+            url=f'/detalhe_vaga/{match.vaga.id}/'
+        ))
+
+    if match.vaga.empresa.user_id:
+        notificacoes.append(Notificacao(
+            usuario_id=match.vaga.empresa.user_id,
+            tipo='match',
+            titulo='Novo Candidato Compatível!',
+            mensagem=f'O candidato {match.candidato.nome} tem {match.score}% de compatibilidade com sua vaga "{match.vaga.titulo}"',
+            url=f'/dashboard_empresa/'
+        ))
+
+    return notificacoes
+
+
+def notificacoes_candidatura_criada(candidatura):
+    if not candidatura.vaga.empresa.user_id:
+        return []
+    return [Notificacao(
+        usuario_id=candidatura.vaga.empresa.user_id,
+        tipo='candidatura',
+        titulo='Nova Candidatura Recebida!',
+        mensagem=f'{candidatura.candidato.nome} se candidatou para a vaga "{candidatura.vaga.titulo}"',
+        url=f'/dashboard_empresa/'
+    )]
+
+
+def notificacoes_candidatura_atualizada(candidatura):
+    if not candidatura.candidato.user_id or candidatura.status == 'pendente':
+        return []
+    status_texto = dict(candidatura.STATUS_CHOICES).get(candidatura.status, candidatura.status)
+    return [Notificacao(
+        usuario_id=candidatura.candidato.user_id,
+        tipo='candidatura',
+        titulo='Atualização de Candidatura',
+        mensagem=f'Sua candidatura para "{candidatura.vaga.titulo}" está: {status_texto}',
+        url=f'/candidaturas/'
+    )]
+
+
+def notificacoes_mensagem(mensagem):
+    if not mensagem.destinatario_id:
+        return []
+    return [Notificacao(
+        usuario_id=mensagem.destinatario_id,
+        tipo='mensagem',
+        titulo='Nova Mensagem Recebida',
+        mensagem=f'{mensagem.remetente.username} enviou: "{mensagem.assunto}"',
+        url='/mensagens/'
+    )]
+
+
+# ---------- Recálculo de scores (sem notificações) ----------
+
+def _recalcular(funcao, objeto_id):
+    # Savepoint: uma falha do recálculo não invalida a transação do lote
+    with transaction.atomic():
+        funcao(objeto_id)
+    return []
+
+
+def recalcular_candidato(candidato):
+    """Atualiza os matches existentes do candidato; não cria pares novos"""
+    # Import adiado: matching importa os signals, que importam este módulo
+    from .matching import recalcular_matches_candidato
+    return _recalcular(recalcular_matches_candidato, candidato.id)
+
+
+def recalcular_vaga(vaga):
+    """Atualiza os matches existentes da vaga; não cria pares novos"""
+    from .matching import recalcular_matches_vaga
+    return _recalcular(recalcular_matches_vaga, vaga.id)
+
+
+# tipo -> (queryset com os relacionamentos usados, função que monta as notificações)
+MONTADORES = {
+    'match_criado': (Match.objects.select_related('candidato', 'vaga__empresa'), notificacoes_match),
+    'candidatura_criada': (Candidatura.objects.select_related('candidato', 'vaga__empresa'), notificacoes_candidatura_criada),
+    'candidatura_atualizada': (Candidatura.objects.select_related('candidato', 'vaga'), notificacoes_candidatura_atualizada),
+    'mensagem_criada': (Mensagem.objects.select_related('remetente'), notificacoes_mensagem),
+    'recalculo_candidato': (Candidato.objects.only('id'), recalcular_candidato),
+    'recalculo_vaga': (Vaga.objects.only('id'), recalcular_vaga),
+}
+
+
+# ---------- Processamento ----------
+
+def processar_eventos(tamanho_lote=500, depois_de=0):
+    """
+    Processa um lote de eventos pendentes com id maior que `depois_de`.
+    Retorna dict com eventos processados, notificações criadas, falhas e o último id visto.
+    """
+    resultado = {'processados': 0, 'notificacoes': 0, 'falhas': 0, 'ultimo_id': None}
+    with transaction.atomic():
+        # skip_locked: vários workers podem rodar ao mesmo tempo sem pegar o mesmo evento
+        eventos = list(
+            EventoNotificacao.objects.select_for_update(skip_locked=True)
+            .filter(processado_em__isnull=True, id__gt=depois_de).order_by('id')[:tamanho_lote]
+        )
+        if not eventos:
+            return resultado
+
+        por_tipo = {}
+        for evento in eventos:
+            por_tipo.setdefault(evento.tipo, []).append(evento)
+
+        notificacoes = []
+        concluidos = []
+        falhas = []
+        for tipo, eventos_tipo in por_tipo.items():
+            queryset, montar = MONTADORES[tipo]
+            objetos = queryset.in_bulk({evento.objeto_id for evento in eventos_tipo})
+            vistos = set()
+            for evento in eventos_tipo:
+                objeto = objetos.get(evento.objeto_id)
+                if objeto is None or evento.objeto_id in vistos:
+                    # Objeto removido antes do processamento (nada a fazer) ou repetido no
+                    # lote, como vários saves do mesmo perfil: um recálculo basta
+                    concluidos.append(evento)
+                    continue
+                vistos.add(evento.objeto_id)
+                try:
+                    notificacoes.extend(montar(objeto))
+                except Exception as erro:
+                    logger.exception('Falha ao montar a notificação do evento %s (%s)', evento.id, evento)
+                    evento.tentativas += 1
+                    evento.erro = repr(erro)
+                    if evento.tentativas >= MAXIMO_TENTATIVAS:
+                        evento.processado_em = timezone.now()
+                    falhas.append(evento)
+                else:
+                    concluidos.append(evento)
+
+        notificacoes = Notificacao.objects.bulk_create(notificacoes)
+        ajustar_notificacoes_em_lote(notificacoes)
+
+        if concluidos:
+            EventoNotificacao.objects.filter(id__in=[evento.id for evento in concluidos]).update(
+                processado_em=timezone.now()
+            )
+        if falhas:
+            EventoNotificacao.objects.bulk_update(falhas, ['tentativas', 'erro', 'processado_em'])
+
+    resultado.update(
+        processados=len(concluidos),
+        notificacoes=len(notificacoes),
+        falhas=len(falhas),
+        ultimo_id=eventos[-1].id,
+    )
+    return resultado
+
+
+def processar_todos_eventos(tamanho_lote=500):
+    """
+    Esvazia a fila uma vez: cada evento é visto no máximo uma vez por chamada,
+    então os que falharem só são tentados de novo na próxima execução.
+    """
+    totais = {'processados': 0, 'notificacoes': 0, 'falhas': 0}
+    depois_de = 0
+    while True:
+        resultado = processar_eventos(tamanho_lote, depois_de)
+        if resultado['ultimo_id'] is None:
+            return totais
+        for chave in totais:
+            totais[chave] += resultado[chave]
+        depois_de = resultado['ultimo_id']
@@ -0,0 +1,87 @@
+"""
+Paginação por cursor (keyset)
+Em vez de OFFSET, cada página continua a partir do último item da anterior,
+então páginas profundas custam o mesmo que a primeira quando há índice na ordenação.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+TAMANHO_PAGINA = 50
+
+
+def _serializar(valor):
+    # isoformat completo: o DjangoJSONEncoder corta os microssegundos e o cursor pularia itens
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f'Valor não suportado no cursor: {valor!r}')
+
+
+def codificar_cursor(valores):
+    dados = json.dumps(list(valores), default=_serializar)
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, quantidade):
+    """Retorna a lista de valores do cursor ou lança ValueError para cursores inválidos"""
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (TypeError, ValueError, UnicodeDecodeError) as erro:
+        raise ValueError(f'Cursor inválido: {cursor!r}') from erro
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise ValueError(f'Cursor inválido: {cursor!r}')
+    return valores
+
+
+def _converter(modelo, campo, valor):
+    """Valor do cursor de volta ao tipo do campo (anotações, como rank, ficam como estão)"""
+    try:
+        field = modelo._meta.get_field(campo)
+    except FieldDoesNotExist:
+        return valor
+    try:
+        return field.to_python(valor)
+    except ValidationError as erro:
+        raise ValueError(f'Cursor inválido para {campo}') from erro
+
+
+def _depois_do_cursor(ordenacao, valores):
+    """
+    Condição "vem depois de `valores`" na ordenação, ex. para (-criado_em, -id):
+    criado_em < c OR (criado_em = c AND id < i)
+    """
+    condicao = Q(pk__in=[])
+    iguais = Q()
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicao |= iguais & Q(**{f'{nome}__{operador}': valor})
+        iguais &= Q(**{nome: valor})
+    return condicao
+
+
+def paginar_por_cursor(queryset, cursor=None, tamanho=TAMANHO_PAGINA, ordenacao=('-criado_em', '-id')):
+    """
+    Página da listagem em `ordenacao` (o último campo deve ser único, como o id).
+    Retorna (itens, proximo_cursor); proximo_cursor é None na última página.
+    """
+    queryset = queryset.order_by(*ordenacao)
+    if cursor:
+        valores = decodificar_cursor(cursor, len(ordenacao))
+        valores = [_converter(queryset.model, campo.lstrip('-'), valor) for campo, valor in zip(ordenacao, valores)]
+        queryset = queryset.filter(_depois_do_cursor(ordenacao, valores))
+
+    # Um item a mais só para saber se existe próxima página
+    itens = list(queryset[:tamanho + 1])
+    if len(itens) <= tamanho:
+        return itens, None
+    itens = itens[:tamanho]
+    ultimo = itens[-1]
+    return itens, codificar_cursor(getattr(ultimo, campo.lstrip('-')) for campo in ordenacao)
@@ -0,0 +1,162 @@
+"""
+Resolução do perfil (candidato/empresa) do usuário logado
+Um único PerfilUsuario por requisição, compartilhado pelo context processor,
+pelos filtros de template e pelas views. Os papéis do usuário ficam em cache na
+sessão; os objetos de perfil só são carregados quando usados, em uma única query.
+A versão que invalida os papéis guardados fica no cache do Django: com um cache por
+processo (LocMem) ela não chega aos outros workers, por isso os papéis da sessão também
+expiram depois de TEMPO_PAPEIS_SESSAO segundos e são relidos do banco.
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+
+CHAVE_SESSAO = '_perfil_usuario'
+
+# Segundos que os papéis guardados na sessão valem sem nova consulta ao banco
+TEMPO_PAPEIS_SESSAO = 300
+
+_RELACAO_CANDIDATO = User.candidato.related
+_RELACAO_EMPRESA = User.empresa.related
+
+
+def _chave_versao(user_id):
+    return f'perfil_usuario:versao:{user_id}'
+
+
+def versao_perfil(user_id):
+    return cache.get(_chave_versao(user_id), 0)
+
+
+def invalidar_perfil(user_id):
+    """Invalida os papéis guardados nas sessões do usuário (perfil criado, alterado ou removido)"""
+    chave = _chave_versao(user_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, 1, None)
+
+
+class PerfilUsuario:
+    """Perfil do usuário avaliado sob demanda"""
+
+    def __init__(self, user, session=None):
+        self.user = user
+        self.session = session
+        self._papeis = None
+
+    def _carregar(self):
+        """Carrega Candidato e Empresa em uma query e preenche os caches de request.user"""
+        relacoes = (_RELACAO_CANDIDATO, _RELACAO_EMPRESA)
+        if all(relacao.is_cached(self.user) for relacao in relacoes):
+            return
+
+        carregado = User.objects.select_related('candidato', 'empresa').get(pk=self.user.pk)
+        for relacao in relacoes:
+            perfil = relacao.get_cached_value(carregado, default=None)
+            if perfil is not None:
+                # perfil.user aponta para o mesmo objeto da requisição, sem nova query
+                relacao.field.set_cached_value(perfil, self.user)
+            relacao.set_cached_value(self.user, perfil)
+
+    def _papeis_da_sessao(self):
+        if self.session is None:
+            return None
+        dados = self.session.get(CHAVE_SESSAO)
+        if (
+            dados
+            and dados['user_id'] == self.user.pk
+            and time.time() - dados.get('verificado_em', 0) < TEMPO_PAPEIS_SESSAO
+            and dados['versao'] == versao_perfil(self.user.pk)
+        ):
+            return (dados['candidato'], dados['empresa'])
+        return None
+
+    def papeis(self):
+        """(is_candidato, is_empresa), da sessão quando a versão ainda é válida e não expirou"""
+        if self._papeis is not None:
+            return self._papeis
+        if not self.user.is_authenticated:
+            self._papeis = (False, False)
+            return self._papeis
+
+        papeis = self._papeis_da_sessao()
+        if papeis is None:
+            versao = versao_perfil(self.user.pk)
+            self._carregar()
+            papeis = (
+                _RELACAO_CANDIDATO.get_cached_value(self.user) is not None,
+                _RELACAO_EMPRESA.get_cached_value(self.user) is not None,
+            )
+            if self.session is not None:
+                self.session[CHAVE_SESSAO] = {
+                    'user_id': self.user.pk,
+                    'versao': versao,
+                    'verificado_em': time.time(),
+                    'candidato': papeis[0],
+                    'empresa': papeis[1],
+                }
+        self._papeis = papeis
+        return papeis
+
+    def _perfil(self, relacao, indice):
+        if not self.user.is_authenticated:
+            return None
+        if relacao.is_cached(self.user):
+            return relacao.get_cached_value(self.user)
+        if not self.papeis()[indice]:
+            # Sem perfil: request.user.<perfil> passa a falhar sem ir ao banco
+            relacao.set_cached_value(self.user, None)
+            return None
+        # Papel conhecido pela sessão: basta buscar este perfil
+        try:
+            perfil = getattr(self.user, relacao.get_accessor_name())
+        except ObjectDoesNotExist:
+            # Removido em outro processo antes de a sessão expirar: os papéis são relidos
+            self._invalidar_papeis()
+            relacao.set_cached_value(self.user, None)
+            return None
+        relacao.field.set_cached_value(perfil, self.user)
+        return perfil
+
+    def _invalidar_papeis(self):
+        self._papeis = None
+        if self.session is not None:
+            self.session.pop(CHAVE_SESSAO, None)
+
+    @property
+    def candidato(self):
+        return self._perfil(_RELACAO_CANDIDATO, 0)
+
+    @property
+    def empresa(self):
+        return self._perfil(_RELACAO_EMPRESA, 1)
+
+    def is_candidato(self):
+        return self.papeis()[0]
+
+    def is_empresa(self):
+        return self.papeis()[1]
+
+    def is_staff_only(self):
+        return self.user.is_authenticated and self.user.is_staff and not any(self.papeis())
+
+
+def perfil_do_usuario(user):
+    """PerfilUsuario ligado ao objeto do usuário (sem cache de sessão se ainda não existir)"""
+    perfil = getattr(user, '_perfil_usuario', None)
+    if perfil is None:
+        perfil = PerfilUsuario(user)
+        user._perfil_usuario = perfil
+    return perfil
+
+
+def obter_perfil(request):
+    """PerfilUsuario da requisição, criado na primeira chamada e reaproveitado depois"""
+    perfil = getattr(request.user, '_perfil_usuario', None)
+    if perfil is None or perfil.session is None:
+        perfil = PerfilUsuario(request.user, request.session)
+        request.user._perfil_usuario = perfil
+    return perfil
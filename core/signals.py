@@ -1,83 +1,312 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
-from .models import Match, Candidatura, Mensagem, Notificacao
+from .models import (
+    Match, Candidatura, Mensagem, Notificacao, Candidato, Empresa, Vaga, HabilidadeCandidato, HabilidadeVaga,
+)
+from .perfis import invalidar_perfil
+from .cache_listagens import GRUPO_CANDIDATOS, GRUPO_VAGAS, invalidar
+from .estatisticas import ajustar_estatisticas
+from .busca import CAMPOS_BUSCA, indexar_vaga, remover_vaga_do_indice
+from .contadores import ajustar_nao_lidas
+from .conversas import (
+    ajustar_nao_lidas_conversa, descontar_mensagem_removida, obter_conversa, registrar_mensagem,
+)
+from .outbox import enfileirar_evento, enfileirar_eventos
+
+
+# Score mínimo para que um novo match gere notificações
+SCORE_NOTIFICACAO_MATCH = 60
 
 
 @receiver(post_save, sender=Match)
-def criar_notificacao_match(sender, instance, created, **kwargs):
-    """Cria notificação quando um novo match é criado"""
-    if not created or instance.score < 60:
+def enfileirar_notificacao_match(sender, instance, created, raw=False, **kwargs):
+    """Registra no outbox o novo match; as notificações são geradas por processar_notificacoes"""
+    if created and not raw and instance.score >= SCORE_NOTIFICACAO_MATCH:
+        enfileirar_evento('match_criado', instance.id)
+
+
+def notificar_novos_matches(matches):
+    """
+    Equivalente em lote de enfileirar_notificacao_match para matches gravados com
+    bulk_create (que não dispara post_save): um único INSERT no outbox
+    """
+    enfileirar_eventos('match_criado', [
+        match.id for match in matches if match.score >= SCORE_NOTIFICACAO_MATCH
+    ])
+
+
+@receiver(post_save, sender=Candidatura)
+def enfileirar_notificacao_candidatura(sender, instance, created, raw=False, **kwargs):
+    """Registra no outbox a candidatura criada ou a mudança de status"""
+    if raw:
         return
+    if created:
+        enfileirar_evento('candidatura_criada', instance.id)
+    elif instance.status != 'pendente':
+        enfileirar_evento('candidatura_atualizada', instance.id)
+
+
+@receiver(post_save, sender=Mensagem)
+def enfileirar_notificacao_mensagem(sender, instance, created, raw=False, **kwargs):
+    """Registra no outbox a nova mensagem"""
+    if created and not raw and instance.destinatario_id:
+        enfileirar_evento('mensagem_criada', instance.id)
+
+
+def _sincronizar_indice_habilidades(modelo_indice, filtro, instance, created):
+    """Aplica no índice invertido apenas a diferença entre as habilidades indexadas e as atuais"""
+    if not created and not getattr(instance, '_habilidades_alteradas', True):
+        return
+    
+    habilidades = instance.conjunto_habilidades
+    indexadas = set(modelo_indice.objects.filter(**filtro).values_list('habilidade', flat=True))
     
-    try:
-        if instance.candidato.user:
-            Notificacao.objects.create(
-                usuario=instance.candidato.user,
-                tipo='match',
-                titulo='Novo Match Encontrado!',
-                mensagem=f'Você tem {instance.score}% de compatibilidade com a vaga "{instance.vaga.titulo}" da empresa {instance.vaga.empresa.nome}',
-                url=f'/detalhe_vaga/{instance.vaga.id}/'
-            )
-    except Exception:
-        pass
+    removidas = indexadas - habilidades
+    if removidas:
+        modelo_indice.objects.filter(habilidade__in=removidas, **filtro).delete()
     
-    try:
-        if instance.vaga.empresa.user:
-            Notificacao.objects.create(
-                usuario=instance.vaga.empresa.user,
-                tipo='match',
-                titulo='Novo Candidato Compatível!',
-                mensagem=f'O candidato {instance.candidato.nome} tem {instance.score}% de compatibilidade com sua vaga "{instance.vaga.titulo}"',
-                url=f'/dashboard_empresa/'
-            )
-    except Exception:
-        pass
+    novas = habilidades - indexadas
+    if novas:
+        modelo_indice.objects.bulk_create([modelo_indice(habilidade=h, **filtro) for h in novas])
 
 
-@receiver(post_save, sender=Candidatura)
-def criar_notificacao_candidatura(sender, instance, created, **kwargs):
-    """Cria notificação quando uma candidatura é criada ou atualizada"""
-    if created:
-        try:
-            if instance.vaga.empresa.user:
-                Notificacao.objects.create(
-                    usuario=instance.vaga.empresa.user,
-                    tipo='candidatura',
-                    titulo='Nova Candidatura Recebida!',
-                    mensagem=f'{instance.candidato.nome} se candidatou para a vaga "{instance.vaga.titulo}"',
-                    url=f'/dashboard_empresa/'
-                )
-        except Exception:
-            pass
-    else:
-        try:
-            if instance.candidato.user and instance.status != 'pendente':
-                status_texto = dict(instance.STATUS_CHOICES).get(instance.status, instance.status)
-                Notificacao.objects.create(
-                    usuario=instance.candidato.user,
-                    tipo='candidatura',
-                    titulo='Atualização de Candidatura',
-                    mensagem=f'Sua candidatura para "{instance.vaga.titulo}" está: {status_texto}',
-                    url=f'/candidaturas/'
-                )
-        except Exception:
-            pass
+@receiver(post_save, sender=Candidato)
+def indexar_habilidades_candidato(sender, instance, created, **kwargs):
+    """Mantém o índice invertido de habilidades do candidato atualizado"""
+    _sincronizar_indice_habilidades(HabilidadeCandidato, {'candidato_id': instance.id}, instance, created)
+
+
+@receiver(post_save, sender=Vaga)
+def indexar_habilidades_vaga(sender, instance, created, **kwargs):
+    """Mantém o índice invertido de habilidades da vaga atualizado"""
+    _sincronizar_indice_habilidades(HabilidadeVaga, {'vaga_id': instance.id}, instance, created)
+
+
+# Campos que alimentam o score de matching; mudanças em outros campos
+# (telefone, descrição...) não disparam recálculo. O recálculo é enfileirado no outbox e
+# roda no worker (processar_notificacoes), fora da requisição que salvou o perfil ou a vaga.
+# Ele só atualiza os matches já existentes: pares que passem a ser compatíveis só são
+# criados sob demanda (api_gerar_matches_*, importar_dados --matches).
+CAMPOS_SCORE = {
+    Candidato: ('habilidades', 'experiencia_anos', 'cidade', 'estado', 'pretensao_salarial'),
+    Vaga: ('habilidades_necessarias', 'experiencia_minima', 'cidade', 'estado',
+           'salario_min', 'salario_max', 'tipo', 'status'),
+}
+
+
+def _valores_score(instance):
+    """Valores atuais dos campos de score (campos adiados na query ficam de fora)"""
+    return {
+        campo: instance.__dict__[campo]
+        for campo in CAMPOS_SCORE[type(instance)]
+        if campo in instance.__dict__
+    }
+
+
+def _campos_score_alterados(instance, update_fields):
+    """Campos de score que mudaram desde que a instância foi carregada ou salva pela última vez"""
+    originais = getattr(instance, '_valores_score', {})
+    atuais = _valores_score(instance)
+    alterados = {
+        campo for campo, valor in atuais.items()
+        if campo not in originais or originais[campo] != valor
+    }
+    if update_fields is not None:
+        alterados &= set(update_fields)
+    return alterados
+
+
+@receiver(post_init, sender=Candidato)
+@receiver(post_init, sender=Vaga)
+def guardar_valores_score(sender, instance, **kwargs):
+    """Guarda os valores dos campos de score para detectar alterações no save"""
+    instance._valores_score = _valores_score(instance)
+
+
+@receiver(post_save, sender=Candidato)
+def agendar_recalculo_candidato(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Enfileira o recálculo dos matches do candidato quando um campo de score muda"""
+    alterados = _campos_score_alterados(instance, update_fields)
+    instance._valores_score = _valores_score(instance)
+    
+    if created or raw or not alterados:
+        return
+    enfileirar_evento('recalculo_candidato', instance.id)
+
+
+@receiver(post_save, sender=Vaga)
+def agendar_recalculo_vaga(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Enfileira o recálculo dos matches da vaga quando um campo de score muda"""
+    alterados = _campos_score_alterados(instance, update_fields)
+    instance._valores_score = _valores_score(instance)
+    
+    if created or raw or not alterados:
+        return
+    enfileirar_evento('recalculo_vaga', instance.id)
+
+
+@receiver(post_save, sender=Candidato)
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Candidato)
+@receiver(post_delete, sender=Empresa)
+def invalidar_papeis_usuario(sender, instance, **kwargs):
+    """Perfil criado, alterado ou removido: os papéis guardados na sessão deixam de valer"""
+    if instance.user_id:
+        invalidar_perfil(instance.user_id)
+
 
+# Contador total de cada modelo e, quando há, o status contado à parte
+CONTADORES_ESTATISTICAS = {
+    Candidato: ('total_candidatos', None),
+    Empresa: ('total_empresas', None),
+    Vaga: ('total_vagas', ('aberta', 'vagas_abertas')),
+    Match: ('total_matches', ('pendente', 'matches_ativos')),
+}
 
+
+@receiver(post_init, sender=Vaga)
+@receiver(post_init, sender=Match)
+def guardar_status_estatisticas(sender, instance, **kwargs):
+    instance._status_estatisticas = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Candidato)
+@receiver(post_save, sender=Empresa)
+@receiver(post_save, sender=Vaga)
+@receiver(post_save, sender=Match)
+def atualizar_estatisticas_save(sender, instance, created, raw=False, **kwargs):
+    """Mantém EstatisticasPlataforma em dia com criações e mudanças de status"""
+    campo_total, por_status = CONTADORES_ESTATISTICAS[sender]
+    deltas = {campo_total: 1} if created else {}
+    
+    # Status adiado na query: não foi alterado por este save
+    if por_status and 'status' in instance.__dict__:
+        status_contado, campo_status = por_status
+        contava = not created and getattr(instance, '_status_estatisticas', None) == status_contado
+        conta = instance.status == status_contado
+        deltas[campo_status] = int(conta) - int(contava)
+        instance._status_estatisticas = instance.status
+    
+    if not raw:
+        ajustar_estatisticas(**deltas)
+
+
+@receiver(post_delete, sender=Candidato)
+@receiver(post_delete, sender=Empresa)
+@receiver(post_delete, sender=Vaga)
+@receiver(post_delete, sender=Match)
+def atualizar_estatisticas_delete(sender, instance, **kwargs):
+    """Desconta a remoção (inclusive em cascata) dos contadores"""
+    campo_total, por_status = CONTADORES_ESTATISTICAS[sender]
+    deltas = {campo_total: -1}
+    if por_status:
+        status_contado, campo_status = por_status
+        # O status que está no banco é o carregado, não o que foi alterado na instância
+        status = getattr(instance, '_status_estatisticas', None)
+        deltas[campo_status] = -1 if status == status_contado else 0
+    ajustar_estatisticas(**deltas)
+
+
+@receiver(post_save, sender=Vaga)
+def indexar_busca_vaga(sender, instance, created, update_fields=None, **kwargs):
+    """Mantém a tabela de busca textual em dia com os campos pesquisáveis da vaga"""
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_BUSCA):
+        return
+    indexar_vaga(instance)
+
+
+@receiver(post_delete, sender=Vaga)
+def remover_busca_vaga(sender, instance, **kwargs):
+    remover_vaga_do_indice(instance.id)
+
+
+@receiver(post_save, sender=Vaga)
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Vaga)
+@receiver(post_delete, sender=Empresa)
+def invalidar_listagens_vagas(sender, instance, **kwargs):
+    """
+    Vaga ou empresa alterada: as listagens de vagas em cache passam para uma nova versão.
+    Só após o commit, para que nenhuma requisição guarde de novo os dados antigos
+    """
+    transaction.on_commit(lambda: invalidar(GRUPO_VAGAS))
+
+
+@receiver(post_save, sender=Candidato)
+@receiver(post_delete, sender=Candidato)
+def invalidar_versao_candidatos(sender, instance, **kwargs):
+    """Candidato alterado: nova versão do grupo usada na ETag dos matches por vaga"""
+    transaction.on_commit(lambda: invalidar(GRUPO_CANDIDATOS))
+
+
+# Campo com o usuário dono do contador de não lidas e a coluna correspondente
+CONTADORES_NAO_LIDAS = {
+    Notificacao: ('usuario_id', 'notificacoes'),
+    Mensagem: ('destinatario_id', 'mensagens'),
+}
+
+
+@receiver(post_init, sender=Notificacao)
+@receiver(post_init, sender=Mensagem)
+def guardar_lida(sender, instance, **kwargs):
+    """Valor de lida carregado do banco, usado pelo contador e pelo resumo da conversa"""
+    instance._lida_original = instance.__dict__.get('lida')
+
+
+@receiver(post_save, sender=Notificacao)
 @receiver(post_save, sender=Mensagem)
-def criar_notificacao_mensagem(sender, instance, created, **kwargs):
-    """Cria notificação quando uma nova mensagem é enviada"""
-    if not created:
+def atualizar_contador_nao_lidas(sender, instance, created, raw=False, **kwargs):
+    """Nova não lida soma 1; marcar como lida desconta 1 (e desmarcar soma de volta)"""
+    campo_usuario, coluna = CONTADORES_NAO_LIDAS[sender]
+    if 'lida' not in instance.__dict__:
         return
     
-    try:
-        if instance.destinatario:
-            Notificacao.objects.create(
-                usuario=instance.destinatario,
-                tipo='mensagem',
-                titulo='Nova Mensagem Recebida',
-                mensagem=f'{instance.remetente.username} enviou: "{instance.assunto}"',
-                url='/mensagens/'
-            )
-    except Exception:
-        pass
+    estava_nao_lida = not created and instance._lida_original is False
+    esta_nao_lida = not instance.lida
+    
+    if not raw:
+        ajustar_nao_lidas(getattr(instance, campo_usuario), **{coluna: int(esta_nao_lida) - int(estava_nao_lida)})
+
+
+@receiver(post_delete, sender=Notificacao)
+@receiver(post_delete, sender=Mensagem)
+def descontar_nao_lida_removida(sender, instance, **kwargs):
+    campo_usuario, coluna = CONTADORES_NAO_LIDAS[sender]
+    if getattr(instance, '_lida_original', None) is False:
+        ajustar_nao_lidas(getattr(instance, campo_usuario), criar=False, **{coluna: -1})
+
+
+@receiver(pre_save, sender=Mensagem)
+def atribuir_conversa(sender, instance, raw=False, **kwargs):
+    """Toda mensagem entra na conversa do par remetente/destinatário (e do match, se houver)"""
+    if instance.conversa_id is None and not raw:
+        instance.conversa = obter_conversa(instance.remetente_id, instance.destinatario_id, instance.match_id)
+
+
+@receiver(post_save, sender=Mensagem)
+def atualizar_resumo_conversa(sender, instance, created, raw=False, **kwargs):
+    """Mantém a última mensagem e as não lidas de cada participante da conversa"""
+    if raw or instance.conversa_id is None or 'lida' not in instance.__dict__:
+        return
+    if created:
+        registrar_mensagem(instance)
+    elif instance._lida_original is not None and instance._lida_original != instance.lida:
+        ajustar_nao_lidas_conversa(instance.conversa_id, instance.destinatario_id, -1 if instance.lida else 1)
+
+
+@receiver(post_delete, sender=Mensagem)
+def atualizar_resumo_conversa_remocao(sender, instance, **kwargs):
+    if instance.conversa_id is not None:
+        descontar_mensagem_removida(instance, getattr(instance, '_lida_original', None) is False)
+
+
+@receiver(post_save, sender=Notificacao)
+@receiver(post_save, sender=Mensagem)
+def confirmar_lida(sender, instance, **kwargs):
+    """
+    Conectado depois dos receivers que comparam lida com _lida_original (contador e resumo
+    da conversa): só então o valor salvo passa a ser o de referência para o próximo save
+    """
+    if 'lida' in instance.__dict__:
+        instance._lida_original = instance.lida
@@ -1,29 +1,19 @@
 from django import template
 
+from core.perfis import perfil_do_usuario
+
 register = template.Library()
 
 @register.filter
 def has_empresa(user):
-    """Verifica se o usuário tem um perfil de empresa associado de forma eficiente."""
+    """Verifica se o usuário tem um perfil de empresa associado, reaproveitando o perfil da requisição."""
     if not user or not user.is_authenticated:
         return False
-    
-    from core.models import Empresa
-    try:
-        _ = user.empresa
-        return True
-    except Empresa.DoesNotExist:
-        return False
+    return perfil_do_usuario(user).is_empresa()
 
 @register.filter
 def has_candidato(user):
-    """Verifica se o usuário tem um perfil de candidato associado de forma eficiente."""
+    """Verifica se o usuário tem um perfil de candidato associado, reaproveitando o perfil da requisição."""
     if not user or not user.is_authenticated:
         return False
-    
-    from core.models import Candidato
-    try:
-        _ = user.candidato
-        return True
-    except Candidato.DoesNotExist:
-        return False
+    return perfil_do_usuario(user).is_candidato()
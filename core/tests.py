@@ -1,3 +1,1822 @@
-from django.test import TestCase
+import asyncio
+import csv
+import functools
+import io
+import json
+import os
+import tempfile
+import random
+import re
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Candidato, Empresa, Vaga, Match, Candidatura, Notificacao, Mensagem, HabilidadeCandidato, HabilidadeVaga,
+    ContadorNaoLidas, EventoNotificacao, Conversa, ParticipanteConversa, EstatisticasPlataforma, VersaoCache,
+)
+from .habilidades import hash_habilidades
+from .matching import (
+    calcular_compatibilidade, calcular_score_conjuntos_habilidades, calcular_score_habilidades,
+    gerar_matches_para_candidato, gerar_matches_para_vaga, gerar_top_matches_para_candidato,
+    gerar_top_matches_para_vaga, get_matching_weights, habilidades_em_comum_minimas,
+    obter_pontuador, pontuar, recalcular_matches_candidato,
+)
+from .management.commands.benchmark_matching import comparar_com_baseline, executar_tier
+from .agendador_chat import AgendadorChat, LimiteChatExcedido, obter_agendador
+from .busca import buscar_vagas
+from .cache_listagens import GRUPO_VAGAS, estatisticas as estatisticas_cache, versao as versao_cache
+from .chat_ia import (
+    CacheRespostas, chave_resposta, fechar_cliente, montar_mensagens, obter_cliente, responder_pergunta,
+    transmitir_resposta,
+)
+from .contadores import obter_contador
+from .conversas import caixa_de_entrada, marcar_conversa_lida
+from .exportacao import COLUNAS_CANDIDATURAS, blocos_candidaturas, consulta_candidaturas, gerar_exportacao
+from .importacao import Importador, ler_registros
+from .estatisticas import ajustar_estatisticas, calcular_estatisticas, obter_estatisticas, reconciliar_estatisticas
+from .middleware import metricas
+from .outbox import MAXIMO_TENTATIVAS, MONTADORES, processar_eventos, processar_todos_eventos
+from .paginacao import codificar_cursor, paginar_por_cursor
+from .perfis import CHAVE_SESSAO, TEMPO_PAPEIS_SESSAO, obter_perfil
+from .templatetags.user_tags import has_candidato, has_empresa
+from .llm_stub import criar_servidor_stub
+from .views import SSE_RETRY_WSGI_MS, _stream_chat_ia, _stream_notificacoes
+from .matching_lote import carregar_matriz_candidatos, calcular_compatibilidade_lote
+from .signals import SCORE_NOTIFICACAO_MATCH
+
+
+HABILIDADES = ['Python', 'django', ' React ', 'JAVA', 'Docker', 'SQL', 'css', 'Go', 'Kotlin', 'AWS']
+CIDADES = ['São Paulo', ' são paulo ', 'Rio de Janeiro', 'CURITIBA', '', '   ', None]
+ESTADOS = ['SP', 'sp ', 'RJ', 'PR', '', None]
+SALARIOS = [None, Decimal('0'), Decimal('2500.00'), Decimal('5000.00'), Decimal('7999.99'), Decimal('9600.00'), Decimal('15000.00')]
+
+
+def _habilidades_aleatorias(rng):
+    escolhidas = rng.sample(HABILIDADES, rng.randint(0, 6))
+    # Inclui duplicatas e entradas vazias para exercitar a normalização
+    if escolhidas and rng.random() < 0.3:
+        escolhidas.append(escolhidas[0].upper())
+    if rng.random() < 0.2:
+        escolhidas.append(' ')
+    return ','.join(escolhidas)
+
+
+class MatchingTestMixin:
+    """Gera uma população sintética de candidatos e vagas com semente fixa."""
+
+    semente = 42
+
+    def criar_populacao(self, total_candidatos=60, total_vagas=25):
+        rng = random.Random(self.semente)
+        empresa = Empresa.objects.create(nome='Empresa Teste', cnpj='00.000.000/0001-00', email='empresa@teste.com')
+
+        for i in range(total_candidatos):
+            Candidato.objects.create(
+                nome=f'Candidato {i}',
+                email=f'candidato{i}@teste.com',
+                cidade=rng.choice(CIDADES) or '',
+                estado=rng.choice(ESTADOS) or '',
+                habilidades=_habilidades_aleatorias(rng),
+                experiencia_anos=rng.randint(0, 12),
+                pretensao_salarial=rng.choice(SALARIOS),
+            )
+
+        for i in range(total_vagas):
+            salario_min = rng.choice(SALARIOS)
+            salario_max = rng.choice([None, salario_min and salario_min * 2, Decimal('0')])
+            Vaga.objects.create(
+                empresa=empresa,
+                titulo=f'Vaga {i}',
+                descricao='Descrição',
+                requisitos='Requisitos',
+                habilidades_necessarias=_habilidades_aleatorias(rng),
+                nivel='pleno',
+                tipo=rng.choice(['remoto', 'presencial', 'hibrido']),
+                cidade=rng.choice(CIDADES) or '',
+                estado=rng.choice(ESTADOS) or '',
+                salario_min=salario_min,
+                salario_max=salario_max,
+                experiencia_minima=rng.randint(0, 10),
+            )
+
+
+class MatchingLoteEquivalenciaTest(MatchingTestMixin, TestCase):
+    """O matching em lote deve produzir exatamente os mesmos scores que o escalar."""
+
+    def setUp(self):
+        self.criar_populacao()
+
+    def assert_equivalente(self, pesos):
+        matriz = carregar_matriz_candidatos()
+        candidatos = {c.id: c for c in Candidato.objects.all()}
+
+        for vaga in Vaga.objects.all():
+            scores = calcular_compatibilidade_lote(matriz, vaga, pesos)
+            for candidato_id, score in zip(matriz.ids.tolist(), scores.tolist()):
+                esperado = calcular_compatibilidade(candidatos[candidato_id], vaga, pesos)
+                self.assertEqual(
+                    score, esperado,
+                    f'candidato={candidato_id} vaga={vaga.id} pesos={pesos}'
+                )
+
+    def test_pesos_padrao(self):
+        self.assert_equivalente(get_matching_weights())
+
+    def test_pesos_personalizados(self):
+        self.assert_equivalente({'habilidades': 33, 'experiencia': 17, 'localizacao': 29, 'salario': 21})
+
+    def test_pesos_fracionarios(self):
+        self.assert_equivalente({'habilidades': 37.5, 'experiencia': 22.5, 'localizacao': 25, 'salario': 15})
+
+    def test_matriz_vazia(self):
+        Candidato.objects.all().delete()
+        matriz = carregar_matriz_candidatos()
+        scores = calcular_compatibilidade_lote(matriz, Vaga.objects.first(), get_matching_weights())
+        self.assertEqual(len(scores), 0)
+
+
+class GerarMatchesVagaTest(MatchingTestMixin, TestCase):
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=40, total_vagas=3)
+
+    def test_cria_apenas_matches_acima_do_minimo(self):
+        vaga = Vaga.objects.first()
+        esperados = {
+            c.id: calcular_compatibilidade(c, vaga)
+            for c in Candidato.objects.all()
+        }
+
+        matches = gerar_matches_para_vaga(vaga.id, score_minimo=50)
+
+        self.assertEqual(
+            {m.candidato_id: m.score for m in matches},
+            {cid: score for cid, score in esperados.items() if score >= 50},
+        )
+        self.assertEqual([m.score for m in matches], sorted((m.score for m in matches), reverse=True))
+
+    def test_atualiza_matches_existentes_abaixo_do_minimo(self):
+        vaga = Vaga.objects.first()
+        candidato = Candidato.objects.first()
+        Match.objects.create(candidato=candidato, vaga=vaga, score=100)
+
+        matches = gerar_matches_para_vaga(vaga.id, score_minimo=101)
+
+        self.assertEqual([m.candidato_id for m in matches], [candidato.id])
+        self.assertEqual(matches[0].score, calcular_compatibilidade(candidato, vaga))
+        self.assertEqual(Match.objects.get(candidato=candidato, vaga=vaga).score, matches[0].score)
+
+    def test_vaga_inexistente(self):
+        self.assertEqual(gerar_matches_para_vaga(0), [])
+
+
+class IndiceHabilidadesTest(MatchingTestMixin, TestCase):
+    """O corte pelo índice invertido não pode descartar pares que alcançariam o mínimo."""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=50, total_vagas=12)
+
+    def test_indice_acompanha_edicao_e_exclusao(self):
+        candidato = Candidato.objects.first()
+        candidato.habilidades = 'Python, RUST , python,'
+        candidato.save()
+        self.assertEqual(
+            set(HabilidadeCandidato.objects.filter(candidato=candidato).values_list('habilidade', flat=True)),
+            {'python', 'rust'},
+        )
+
+        vaga = Vaga.objects.first()
+        vaga.delete()
+        self.assertFalse(HabilidadeVaga.objects.filter(vaga_id=vaga.id).exists())
+
+    def test_save_sem_o_campo_de_habilidades_nao_altera_o_indice(self):
+        candidato = Candidato.objects.first()
+        candidato.habilidades = 'python'
+        candidato.save()
+        candidato.habilidades = 'java'
+        candidato.save(update_fields=['telefone'])
+
+        candidato.refresh_from_db()
+        self.assertEqual((candidato.habilidades, candidato.habilidades_normalizadas), ('python', 'python'))
+        self.assertEqual(
+            list(HabilidadeCandidato.objects.filter(candidato=candidato).values_list('habilidade', flat=True)),
+            ['python'],
+        )
+
+    def test_gerar_matches_para_vaga_com_corte(self):
+        for score_minimo in (50, 65, 75, 90):
+            for vaga in Vaga.objects.all():
+                esperados = {
+                    c.id for c in Candidato.objects.all()
+                    if calcular_compatibilidade(c, vaga) >= score_minimo
+                }
+                Match.objects.all().delete()
+                matches = gerar_matches_para_vaga(vaga.id, score_minimo=score_minimo)
+                self.assertEqual({m.candidato_id for m in matches}, esperados)
+
+    def test_gerar_matches_para_candidato_com_corte(self):
+        for score_minimo in (50, 65, 75, 90):
+            for candidato in Candidato.objects.all()[:15]:
+                esperados = {
+                    v.id for v in Vaga.objects.filter(status='aberta')
+                    if calcular_compatibilidade(candidato, v) >= score_minimo
+                }
+                Match.objects.all().delete()
+                matches = gerar_matches_para_candidato(candidato.id, score_minimo=score_minimo)
+                self.assertEqual({m.vaga_id for m in matches}, esperados)
+
+    def test_minimo_de_habilidades_em_comum(self):
+        pesos = get_matching_weights()
+        self.assertEqual(habilidades_em_comum_minimas(4, 60, pesos), 0)
+        self.assertEqual(habilidades_em_comum_minimas(4, 70, pesos), 1)
+        self.assertEqual(habilidades_em_comum_minimas(4, 90, pesos), 3)
+        self.assertIsNone(habilidades_em_comum_minimas(0, 70, pesos))
+
+    def test_sem_corte_no_score_minimo_padrao(self):
+        # Os demais fatores somam 60 com os pesos padrão: um par sem habilidades em comum
+        # ainda alcança 50, então o índice não pode descartá-lo
+        pesos = get_matching_weights()
+        self.assertEqual(habilidades_em_comum_minimas(3, 50, pesos), 0)
+
+        vaga = Vaga.objects.create(
+            empresa=Empresa.objects.get(), titulo='Elixir', descricao='...', requisitos='...',
+            habilidades_necessarias='Elixir, Erlang, OTP', nivel='pleno', tipo='remoto',
+        )
+        candidato = Candidato.objects.create(nome='Sem', email='sem@x.com', habilidades='Cobol', experiencia_anos=5)
+        self.assertGreaterEqual(calcular_compatibilidade(candidato, vaga), 50)
+
+        self.assertIn(candidato.id, {m.candidato_id for m in gerar_matches_para_vaga(vaga.id)})
+        Match.objects.all().delete()
+        self.assertNotIn(candidato.id, {m.candidato_id for m in gerar_matches_para_vaga(vaga.id, score_minimo=65)})
+
+
+class GravacaoEmLoteTest(MatchingTestMixin, TestCase):
+    """A geração de matches grava em lote e não regrava scores inalterados."""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=30, total_vagas=2)
+        for candidato in Candidato.objects.all():
+            candidato.user = User.objects.create_user(username=f'u{candidato.id}')
+            candidato.save()
+        empresa = Empresa.objects.get()
+        empresa.user = User.objects.create_user(username='empresa')
+        empresa.save()
+
+    def test_notificacoes_dos_novos_matches(self):
+        vaga = Vaga.objects.first()
+        matches = gerar_matches_para_vaga(vaga.id, score_minimo=0)
+        notificaveis = [m for m in matches if m.score >= SCORE_NOTIFICACAO_MATCH]
+        self.assertEqual(EventoNotificacao.objects.filter(tipo='match_criado').count(), len(notificaveis))
+        processar_todos_eventos()
+
+        self.assertEqual(Notificacao.objects.filter(tipo='match').count(), 2 * len(notificaveis))
+        self.assertEqual(Match.objects.filter(vaga=vaga).count(), len(matches))
+
+    def test_queries_constantes_e_sem_regravar_inalterados(self):
+        vaga = Vaga.objects.first()
+        with CaptureQueriesContext(connection) as primeira:
+            gerar_matches_para_vaga(vaga.id, score_minimo=0)
+        with CaptureQueriesContext(connection) as segunda:
+            gerar_matches_para_vaga(vaga.id, score_minimo=0)
+
+        # Inclui o ajuste de estatísticas e o INSERT dos eventos no outbox de notificações
+        self.assertLess(len(primeira), 15)
+        self.assertFalse(any(q['sql'].startswith(('INSERT', 'UPDATE')) for q in segunda.captured_queries))
+
+
+class HabilidadesNormalizadasTest(MatchingTestMixin, TestCase):
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=30, total_vagas=10)
+
+    def test_forma_canonica_sincronizada_no_save(self):
+        candidato = Candidato.objects.first()
+        candidato.habilidades = ' Rust, python ,RUST,,'
+        candidato.save(update_fields=['habilidades'])
+        candidato.refresh_from_db()
+
+        self.assertEqual(candidato.habilidades_normalizadas, 'python,rust')
+        self.assertEqual(candidato.habilidades_hash, hash_habilidades('python,rust'))
+
+    def test_score_precomputado_igual_ao_da_string(self):
+        for vaga in Vaga.objects.all():
+            for candidato in Candidato.objects.all():
+                self.assertEqual(
+                    calcular_score_conjuntos_habilidades(candidato.conjunto_habilidades, vaga.conjunto_habilidades),
+                    calcular_score_habilidades(candidato.habilidades, vaga.habilidades_necessarias),
+                )
+
+
+class RecalculoIncrementalTest(MatchingTestMixin, TestCase):
+    """Somente mudanças em campos de score enfileiram o recálculo dos pares da entidade."""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=10, total_vagas=4)
+        self.candidato = Candidato.objects.first()
+        for vaga in Vaga.objects.all():
+            Match.objects.create(candidato=self.candidato, vaga=vaga, score=0)
+
+    def recalculos(self):
+        return list(EventoNotificacao.objects.filter(
+            tipo__in=['recalculo_candidato', 'recalculo_vaga'], processado_em__isnull=True,
+        ).values_list('tipo', 'objeto_id'))
+
+    def test_campo_irrelevante_nao_agenda_recalculo(self):
+        self.candidato.telefone = '(11) 99999-0000'
+        self.candidato.save()
+        vaga = Vaga.objects.first()
+        vaga.descricao = 'Nova descrição'
+        vaga.save()
+        self.assertEqual(self.recalculos(), [])
+
+    def test_campo_de_score_recalcula_matches_do_candidato_no_worker(self):
+        self.candidato.experiencia_anos += 5
+        self.candidato.save()
+        self.candidato.experiencia_anos += 1
+        self.candidato.save()
+
+        # Nada é recalculado na requisição que salvou o perfil
+        self.assertEqual(self.recalculos(), [('recalculo_candidato', self.candidato.id)] * 2)
+        self.assertEqual(set(Match.objects.filter(candidato=self.candidato).values_list('score', flat=True)), {0})
+
+        with mock.patch('core.matching.recalcular_matches_candidato',
+                        wraps=recalcular_matches_candidato) as recalcular:
+            processar_todos_eventos()
+        recalcular.assert_called_once_with(self.candidato.id)
+        self.assertEqual(self.recalculos(), [])
+        for match in Match.objects.filter(candidato=self.candidato).select_related('vaga'):
+            self.assertEqual(match.score, calcular_compatibilidade(self.candidato, match.vaga))
+
+    def test_campo_de_score_recalcula_matches_da_vaga_no_worker(self):
+        vaga = Vaga.objects.first()
+        vaga.tipo = 'presencial' if vaga.tipo == 'remoto' else 'remoto'
+        vaga.save(update_fields=['tipo'])
+        total_matches = Match.objects.count()
+        processar_todos_eventos()
+
+        match = Match.objects.get(candidato=self.candidato, vaga=vaga)
+        self.assertEqual(match.score, calcular_compatibilidade(self.candidato, vaga))
+        # Só os pares existentes: novos pares compatíveis são criados sob demanda
+        self.assertEqual(Match.objects.count(), total_matches)
+
+    def test_update_fields_sem_campos_de_score(self):
+        self.candidato.cidade = 'Outra Cidade'
+        self.candidato.save(update_fields=['telefone'])
+        self.assertEqual(self.recalculos(), [])
+
+
+class TopMatchesTest(MatchingTestMixin, TestCase):
+    """O modo top-K devolve os mesmos K primeiros do modo completo."""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=60, total_vagas=30)
+
+    def test_top_k_vaga(self):
+        for vaga in Vaga.objects.all()[:5]:
+            completo = gerar_matches_para_vaga(vaga.id, score_minimo=40)
+            Match.objects.all().delete()
+
+            top, total = gerar_top_matches_para_vaga(vaga.id, k=5, score_minimo=40)
+
+            self.assertEqual(total, len(completo))
+            self.assertEqual(
+                [(m.candidato_id, m.score) for m in top],
+                [(m.candidato_id, m.score) for m in completo[:5]],
+            )
+            self.assertEqual(Match.objects.filter(vaga=vaga).count(), len(top))
+            Match.objects.all().delete()
+
+    def test_top_k_candidato(self):
+        for candidato in Candidato.objects.all()[:5]:
+            completo = gerar_matches_para_candidato(candidato.id, score_minimo=40)
+            Match.objects.all().delete()
+
+            top, total = gerar_top_matches_para_candidato(candidato.id, k=5, score_minimo=40)
+
+            self.assertEqual(total, len(completo))
+            self.assertEqual(
+                [(m.vaga_id, m.score) for m in top],
+                [(m.vaga_id, m.score) for m in completo[:5]],
+            )
+            self.assertEqual(Match.objects.filter(candidato=candidato).count(), len(top))
+            Match.objects.all().delete()
+
+    def test_match_existente_fora_do_top_k_tem_o_score_atualizado(self):
+        vaga = Vaga.objects.first()
+        completo = gerar_matches_para_vaga(vaga.id, score_minimo=40)
+        ultimo = Match.objects.get(id=completo[-1].id)
+        Match.objects.filter(vaga=vaga).exclude(id=ultimo.id).delete()
+        Match.objects.filter(id=ultimo.id).update(score=100)
+
+        top, _ = gerar_top_matches_para_vaga(vaga.id, k=1, score_minimo=40)
+        self.assertNotIn(ultimo.candidato_id, [m.candidato_id for m in top])
+        ultimo.refresh_from_db()
+        self.assertEqual(ultimo.score, calcular_compatibilidade(ultimo.candidato, vaga))
+
+        Match.objects.all().delete()
+        candidato = Candidato.objects.first()
+        completo = gerar_matches_para_candidato(candidato.id, score_minimo=40)
+        ultimo = Match.objects.get(id=completo[-1].id)
+        Match.objects.filter(candidato=candidato).exclude(id=ultimo.id).delete()
+        Match.objects.filter(id=ultimo.id).update(score=100)
+
+        top, _ = gerar_top_matches_para_candidato(candidato.id, k=1, score_minimo=40)
+        self.assertNotIn(ultimo.vaga_id, [m.vaga_id for m in top])
+        ultimo.refresh_from_db()
+        self.assertEqual(ultimo.score, calcular_compatibilidade(candidato, ultimo.vaga))
+
+    def test_persistir_todos(self):
+        vaga = Vaga.objects.first()
+        top, total = gerar_top_matches_para_vaga(vaga.id, k=3, score_minimo=40, persistir_todos=True)
+        self.assertEqual(len(top), min(3, total))
+        self.assertEqual(Match.objects.filter(vaga=vaga).count(), total)
+
+
+class PontuadorTest(MatchingTestMixin, TestCase):
+    """Pesos compilados uma vez e cache de scores invalidado por edição"""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=5, total_vagas=3)
+        self.candidato = Candidato.objects.first()
+        self.vaga = Vaga.objects.first()
+
+    def test_cache_e_invalidacao(self):
+        pontuador = obter_pontuador()
+        pontuador.limpar_cache()
+        score = pontuar(self.candidato, self.vaga)
+        self.assertEqual(score, calcular_compatibilidade(self.candidato, self.vaga, get_matching_weights()))
+        self.assertEqual(len(pontuador._cache), 1)
+
+        pontuar(self.candidato, self.vaga)
+        self.assertEqual(len(pontuador._cache), 1)
+
+        self.candidato.experiencia_anos += 10
+        self.candidato.save()
+        self.assertEqual(
+            pontuar(self.candidato, self.vaga),
+            calcular_compatibilidade(self.candidato, self.vaga, get_matching_weights()),
+        )
+        self.assertEqual(len(pontuador._cache), 2)
+
+    def test_recompila_quando_pesos_mudam(self):
+        pesos = {'habilidades': 100, 'experiencia': 0, 'localizacao': 0, 'salario': 0}
+        with override_settings(MATCHING_WEIGHTS=pesos):
+            self.assertEqual(obter_pontuador().pesos, pesos)
+            self.assertEqual(
+                pontuar(self.candidato, self.vaga),
+                calcular_compatibilidade(self.candidato, self.vaga, pesos),
+            )
+        self.assertEqual(obter_pontuador().pesos, get_matching_weights())
+
+
+class BenchmarkMatchingTest(TestCase):
+    """O benchmark roda em escala reduzida e acusa regressões"""
+
+    def test_executar_tier_reverte_banco(self):
+        resultado = executar_tier(total_candidatos=30, total_vagas=5, semente=1, amostras=3, pares=10)
+
+        self.assertEqual(set(resultado['operacoes']), {
+            'calcular_compatibilidade', 'gerar_matches_para_candidato',
+            'gerar_matches_para_vaga', 'recalcular_todos_matches',
+        })
+        self.assertEqual(resultado['operacoes']['calcular_compatibilidade']['queries'], 0)
+        self.assertFalse(Candidato.objects.exists())
+        self.assertFalse(Match.objects.exists())
+
+    def test_comparar_com_baseline(self):
+        def relatorio(tempo, queries):
+            metricas = {'tempo_medio_ms': tempo, 'queries': queries, 'pico_memoria_kb': 100}
+            return {'tiers': {'pequeno': {'operacoes': {'gerar_matches_para_vaga': metricas}}}}
+
+        self.assertEqual(comparar_com_baseline(relatorio(11, 5), relatorio(10, 5), 0.2), [])
+        regressoes = comparar_com_baseline(relatorio(20, 6), relatorio(10, 5), 0.2)
+        self.assertEqual(len(regressoes), 2)
+
+
+class RecalcularMatchesComandoTest(MatchingTestMixin, TestCase):
+    """Comando recalcular_matches: chunks, checkpoint e retomada (no processo, --processos 1)"""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=10, total_vagas=3)
+        for vaga in Vaga.objects.all():
+            gerar_matches_para_vaga(vaga.id, score_minimo=0)
+        Match.objects.update(score=0)
+        self.ids = list(Match.objects.order_by('id').values_list('id', flat=True))
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.checkpoint = os.path.join(diretorio.name, 'checkpoint.json')
+
+    def recalcular(self, **opcoes):
+        saida = io.StringIO()
+        call_command('recalcular_matches', processos=1, tamanho_chunk=10, checkpoint=self.checkpoint,
+                     stdout=saida, **opcoes)
+        return saida.getvalue()
+
+    def gravar_checkpoint(self, **dados):
+        checkpoint = {'tamanho_chunk': 10, 'pesos': get_matching_weights(),
+                      'menor': self.ids[0], 'concluidos': [self.ids[0]], **dados}
+        with open(self.checkpoint, 'w') as arquivo:
+            json.dump(checkpoint, arquivo)
+
+    def assertRecalculados(self, matches):
+        for match in matches.select_related('candidato', 'vaga'):
+            self.assertEqual(match.score, calcular_compatibilidade(match.candidato, match.vaga))
+
+    def test_recalcula_todos_os_chunks_e_remove_checkpoint(self):
+        saida = self.recalcular()
+        self.assertEqual(len(self.ids), 30)
+        self.assertIn('Recalculando 3 chunks', saida)
+        self.assertRecalculados(Match.objects.all())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_retoma_pulando_chunks_concluidos(self):
+        self.gravar_checkpoint()
+        saida = self.recalcular()
+        self.assertIn('Retomando: 1 de 3 chunks', saida)
+        primeiro_chunk = Match.objects.filter(id__lt=self.ids[0] + 10)
+        self.assertEqual(set(primeiro_chunk.values_list('score', flat=True)), {0})
+        self.assertRecalculados(Match.objects.filter(id__gte=self.ids[0] + 10))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_retoma_com_matches_criados_depois_da_interrupcao(self):
+        self.gravar_checkpoint()
+        candidato = Candidato.objects.create(nome='Novo', email='novo@teste.com', habilidades='Python')
+        gerar_matches_para_candidato(candidato.id, score_minimo=0)
+        novos = Match.objects.filter(candidato=candidato)
+        novos.update(score=0)
+        self.assertGreater(novos.count(), 0)
+
+        saida = self.recalcular()
+        self.assertIn('Retomando: 1 de 4 chunks', saida)
+        self.assertRecalculados(Match.objects.filter(id__gte=self.ids[0] + 10))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_recusa_retomar_com_outros_pesos_ou_inicio(self):
+        self.gravar_checkpoint(pesos={**get_matching_weights(), 'habilidades': 10})
+        with self.assertRaisesMessage(CommandError, 'outros pesos'):
+            self.recalcular()
+
+        self.gravar_checkpoint(menor=self.ids[0] + 1)
+        with self.assertRaisesMessage(CommandError, 'menor id'):
+            self.recalcular()
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        self.recalcular(reiniciar=True)
+        self.assertRecalculados(Match.objects.all())
+
+
+class InstrumentacaoMiddlewareTest(TestCase):
+    """Server-Timing, histogramas por URL e log de orçamento estourado"""
+
+    def setUp(self):
+        metricas.limpar()
+        self.staff = User.objects.create_user('staff', password='senha', is_staff=True)
+
+    def test_server_timing_e_histogramas(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('dashboard_admin'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+        resumo = metricas.resumo()['dashboard_admin']
+        self.assertEqual(resumo['queries']['total'], 1)
+        self.assertGreater(resumo['queries']['maximo'], 0)
+
+        dados = self.client.get(reverse('api_instrumentacao')).json()
+        self.assertIn('dashboard_admin', dados['urls'])
+
+    async def test_queries_contadas_sob_asgi(self):
+        # A view síncrona roda em uma thread do sync_to_async, com outra conexão
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('dashboard_admin'))
+
+        queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+        self.assertEqual(metricas.resumo()['dashboard_admin']['queries']['maximo'], queries)
+
+    def test_endpoint_restrito_a_staff(self):
+        User.objects.create_user('comum', password='senha')
+        self.client.login(username='comum', password='senha')
+        self.assertEqual(self.client.get(reverse('api_instrumentacao')).status_code, 403)
+
+    @override_settings(INSTRUMENTACAO_ORCAMENTOS_POR_URL={'dashboard_admin': {'queries': 0}})
+    def test_loga_requisicao_acima_do_orcamento(self):
+        self.client.force_login(self.staff)
+        with self.assertLogs('core.instrumentacao', level='WARNING') as logs:
+            self.client.get(reverse('dashboard_admin'))
+        self.assertIn('dashboard_admin', logs.output[0])
+
+
+class PerfilUsuarioTest(TestCase):
+    """Papéis do usuário resolvidos sob demanda, com cache na sessão"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('candidato', password='senha')
+        self.candidato = Candidato.objects.create(user=self.user, nome='Ana', email='ana@teste.com')
+        self.client.force_login(self.user)
+
+    def test_papeis_em_cache_na_sessao(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('landing'))
+        self.assertFalse(any('core_candidato' in query['sql'] for query in queries))
+
+        self.client.get(reverse('conf'))
+        self.assertEqual(self.client.session[CHAVE_SESSAO]['candidato'], True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('conf'))
+        sqls = [query['sql'] for query in queries]
+        self.assertFalse(any('core_empresa' in sql for sql in sqls))
+        self.assertEqual(len([sql for sql in sqls if 'core_candidato' in sql]), 1)
+        self.assertTrue(response.context['is_candidato']())
+        self.assertFalse(response.context['is_empresa']())
+
+    def test_uma_query_para_os_perfis(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        request.session = {}
+
+        perfil = obter_perfil(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(perfil.candidato, self.candidato)
+            self.assertIsNone(perfil.empresa)
+            self.assertEqual(request.user.candidato.user, request.user)
+            self.assertTrue(has_candidato(request.user))
+            self.assertFalse(has_empresa(request.user))
+
+    def test_invalida_quando_perfil_criado(self):
+        self.client.get(reverse('conf'))
+        self.assertFalse(self.client.session[CHAVE_SESSAO]['empresa'])
+
+        Empresa.objects.create(user=self.user, nome='Empresa', cnpj='11.111.111/0001-11', email='e@teste.com')
+        response = self.client.get(reverse('conf'))
+        self.assertTrue(response.context['is_empresa']())
+
+    def test_papeis_da_sessao_expiram_sem_invalidacao(self):
+        # Empresa criada em outro processo: a versão no cache local não muda
+        self.client.get(reverse('conf'))
+        with mock.patch('core.signals.invalidar_perfil'):
+            Empresa.objects.create(user=self.user, nome='Empresa', cnpj='11.111.111/0001-11', email='e@teste.com')
+        self.assertFalse(self.client.get(reverse('conf')).context['is_empresa']())
+
+        depois = time.time() + TEMPO_PAPEIS_SESSAO + 1
+        with mock.patch('core.perfis.time.time', return_value=depois):
+            response = self.client.get(reverse('conf'))
+        self.assertTrue(response.context['is_empresa']())
+
+    def test_perfil_removido_em_outro_processo(self):
+        self.client.get(reverse('conf'))
+        with mock.patch('core.signals.invalidar_perfil'):
+            self.candidato.delete()
+
+        response = self.client.get(reverse('candidaturas_vagas'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertNotIn(CHAVE_SESSAO, self.client.session)
+        self.assertFalse(self.client.get(reverse('conf')).context['is_candidato']())
+
+    def test_views_usam_o_perfil_da_requisicao(self):
+        self.client.get(reverse('conf'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard_empresa'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertFalse(any('core_empresa' in query['sql'] for query in queries))
+
+
+class EstatisticasPlataformaTest(MatchingTestMixin, TestCase):
+    """Contadores mantidos pelos signals batem com as contagens reais"""
+
+    def assertEstatisticasCorretas(self):
+        estatisticas = obter_estatisticas()
+        self.assertEqual(
+            {campo: getattr(estatisticas, campo) for campo in calcular_estatisticas()},
+            calcular_estatisticas(),
+        )
+
+    def test_criacao_status_e_remocao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_populacao(total_candidatos=20, total_vagas=6)
+            for vaga in Vaga.objects.all()[:3]:
+                gerar_matches_para_vaga(vaga.id, score_minimo=40)
+        self.assertEstatisticasCorretas()
+
+        vaga = Vaga.objects.first()
+        vaga.status = 'fechada'
+        match = Match.objects.first()
+        match.status = 'aceito'
+        with self.captureOnCommitCallbacks(execute=True):
+            vaga.save()
+            match.save()
+        self.assertEstatisticasCorretas()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Empresa.objects.get().delete()
+        self.assertEstatisticasCorretas()
+        self.assertEqual(obter_estatisticas().total_vagas, 0)
+
+    def test_ajuste_somente_apos_o_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_populacao(total_candidatos=3, total_vagas=2)
+        atualizado_em = obter_estatisticas().atualizado_em
+
+        # Nada é gravado na linha compartilhada antes do commit, e o rollback descarta o ajuste
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                with transaction.atomic():
+                    Candidato.objects.first().delete()
+            self.assertFalse(any('core_estatisticasplataforma' in query['sql'] for query in queries))
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Candidato.objects.create(nome='Rollback', email='r@teste.com')
+                raise IntegrityError
+        self.assertEstatisticasCorretas()
+        self.assertGreater(obter_estatisticas().atualizado_em, atualizado_em)
+
+    def test_reconciliacao_corrige_divergencia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_populacao(total_candidatos=5, total_vagas=2)
+            ajustar_estatisticas(total_candidatos=10, vagas_abertas=-1)
+
+        divergencias = reconciliar_estatisticas()
+
+        self.assertEqual(set(divergencias), {'total_candidatos', 'vagas_abertas'})
+        self.assertEstatisticasCorretas()
+        self.assertEqual(reconciliar_estatisticas(), {})
+
+    def test_reconciliacao_preserva_ajustes_concorrentes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_populacao(total_candidatos=5, total_vagas=2)
+            ajustar_estatisticas(total_candidatos=10)
+
+        def contar_e_receber_ajuste():
+            # Ajuste de outra transação gravado depois da leitura da linha
+            corretos = calcular_estatisticas()
+            EstatisticasPlataforma.objects.update(total_vagas=F('total_vagas') + 1)
+            return corretos
+
+        with mock.patch('core.estatisticas.calcular_estatisticas', side_effect=contar_e_receber_ajuste):
+            self.assertEqual(set(reconciliar_estatisticas()), {'total_candidatos'})
+        estatisticas = obter_estatisticas()
+        self.assertEqual((estatisticas.total_candidatos, estatisticas.total_vagas), (5, 3))
+
+    def test_janela_do_on_commit_corrigida_na_proxima_reconciliacao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_populacao(total_candidatos=2, total_vagas=1)
+        # Commit feito antes da contagem, on_commit executado depois dela
+        with self.captureOnCommitCallbacks() as atrasados:
+            Candidato.objects.create(nome='Atrasado', email='atrasado@teste.com')
+        self.assertEqual(reconciliar_estatisticas(), {'total_candidatos': (2, 3)})
+        for callback in atrasados:
+            callback()
+
+        self.assertEqual(obter_estatisticas().total_candidatos, 4)
+        self.assertEqual(reconciliar_estatisticas(), {'total_candidatos': (4, 3)})
+        self.assertEstatisticasCorretas()
+
+
+class PaginacaoCursorTest(MatchingTestMixin, TestCase):
+    """Paginação keyset percorre todas as vagas sem repetir nem pular"""
+
+    def setUp(self):
+        cache.clear()
+        self.criar_populacao(total_candidatos=1, total_vagas=12)
+        # Empates em criado_em são desfeitos pelo id
+        Vaga.objects.filter(id__in=list(Vaga.objects.values_list('id', flat=True)[:6])).update(
+            criado_em=Vaga.objects.first().criado_em
+        )
+        self.user = User.objects.create_user('visitante', password='senha')
+        self.client.force_login(self.user)
+
+    def test_percorre_todas_as_paginas(self):
+        esperado = list(Vaga.objects.order_by('-criado_em', '-id').values_list('id', flat=True))
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = paginar_por_cursor(Vaga.objects.all(), cursor, tamanho=5)
+            vistos += [vaga.id for vaga in pagina]
+            if cursor is None:
+                break
+        self.assertEqual(vistos, esperado)
+
+    def test_api_com_cursor(self):
+        abertas = Vaga.objects.filter(status='aberta').count()
+        primeira = self.client.get(reverse('api_explorar_vagas')).json()
+        self.assertEqual(primeira['total'], abertas)
+
+        self.assertEqual(self.client.get(reverse('api_explorar_vagas'), {'cursor': 'invalido'}).status_code, 400)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api_explorar_vagas'), {'cursor': codificar_cursor([timezone.now(), 10**9])})
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+
+class BuscaVagasTest(MatchingTestMixin, TestCase):
+    """Busca textual ranqueada, sincronizada pelos signals"""
+
+    def setUp(self):
+        cache.clear()
+        self.criar_populacao(total_candidatos=1, total_vagas=0)
+        self.empresa = Empresa.objects.get()
+        self.user = User.objects.create_user('visitante', password='senha')
+        self.client.force_login(self.user)
+
+    def criar_vaga(self, titulo, habilidades='', descricao='Descrição'):
+        return Vaga.objects.create(
+            empresa=self.empresa, titulo=titulo, descricao=descricao, requisitos='Requisitos',
+            habilidades_necessarias=habilidades, nivel='pleno', tipo='remoto',
+        )
+
+    def test_busca_ranqueada_e_sincronizada(self):
+        titulo = self.criar_vaga('Desenvolvedor Python', habilidades='Python, Django')
+        descricao = self.criar_vaga('Analista de Dados', descricao='Uso eventual de python')
+        self.criar_vaga('Designer', habilidades='Figma')
+
+        ids = [vaga.id for vaga in buscar_vagas(Vaga.objects.all(), 'pyth').order_by('-relevancia', '-id')]
+        self.assertEqual(ids, [titulo.id, descricao.id])
+
+        descricao.descricao = 'Sem menção'
+        descricao.save()
+        titulo.delete()
+        self.assertFalse(buscar_vagas(Vaga.objects.all(), 'python').exists())
+        self.assertEqual(buscar_vagas(Vaga.objects.all(), 'designér').count(), 1)
+
+    def test_paginacao_por_relevancia(self):
+        for i in range(7):
+            self.criar_vaga(f'Vaga Python {i}', habilidades='Python' if i % 2 else '')
+        self.criar_vaga('Vaga Java', habilidades='Java')
+
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = paginar_por_cursor(
+                buscar_vagas(Vaga.objects.all(), 'python'), cursor, tamanho=2, ordenacao=('-relevancia', '-id')
+            )
+            vistos += [vaga.id for vaga in pagina]
+            if not cursor:
+                break
+
+        esperado = [v.id for v in buscar_vagas(Vaga.objects.all(), 'python').order_by('-relevancia', '-id')]
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(len(vistos), 7)
+
+        dados = self.client.get(reverse('api_explorar_vagas'), {'q': 'python'}).json()
+        self.assertEqual([vaga['id'] for vaga in dados['vagas']], esperado)
+
+
+class ContadorNaoLidasTest(MatchingTestMixin, TestCase):
+    """Contadores de não lidas mantidos pelos signals e stream SSE"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('destino', password='senha')
+        self.outro = User.objects.create_user('remetente', password='senha')
+
+    def assertContadorCorreto(self):
+        contador = obter_contador(self.user.id)
+        self.assertEqual(contador.notificacoes, Notificacao.objects.filter(usuario=self.user, lida=False).count())
+        self.assertEqual(contador.mensagens, Mensagem.objects.filter(destinatario=self.user, lida=False).count())
+
+    def test_criacao_leitura_e_remocao(self):
+        notificacao = Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Oi', mensagem='...')
+        Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Oi 2', mensagem='...')
+        mensagem = Mensagem.objects.create(remetente=self.outro, destinatario=self.user, assunto='A', conteudo='B')
+        # A mensagem também gera (pelo outbox) uma notificação para o destinatário
+        processar_todos_eventos()
+        self.assertContadorCorreto()
+        self.assertEqual(obter_contador(self.user.id).notificacoes, 3)
+
+        notificacao.lida = True
+        notificacao.save()
+        mensagem.delete()
+        self.assertContadorCorreto()
+        self.assertEqual(obter_contador(self.user.id).notificacoes, 2)
+
+        self.user.delete()
+        self.assertFalse(ContadorNaoLidas.objects.filter(usuario_id=self.user.id).exists())
+
+    def test_notificacoes_em_lote_dos_matches(self):
+        self.criar_populacao(total_candidatos=20, total_vagas=3)
+        Empresa.objects.update(user=self.user)
+        for vaga in Vaga.objects.all():
+            gerar_matches_para_vaga(vaga.id, score_minimo=40)
+        processar_todos_eventos()
+        self.assertTrue(Notificacao.objects.filter(usuario=self.user).exists())
+        self.assertContadorCorreto()
+
+    def test_stream_envia_novas_notificacoes(self):
+        antiga = Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Antiga', mensagem='...')
+        nova = Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Nova', mensagem='...')
+
+        async def consumir():
+            return ''.join([evento async for evento in _stream_notificacoes(self.user.id, antiga.id, 0, 0)])
+        eventos = async_to_sync(consumir)()
+
+        self.assertIn(f'id: {nova.id}\nevent: notificacao', eventos)
+        self.assertNotIn('"Antiga"', eventos)
+        self.assertIn('event: contadores\ndata: {"notificacoes": 2, "mensagens": 0}', eventos)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_notificacoes'))
+        self.assertEqual(response.json()['nao_lidas'], 2)
+
+    async def test_stream_asgi_envia_eventos_antes_de_terminar(self):
+        await Notificacao.objects.acreate(usuario=self.user, tipo='sistema', titulo='Primeira', mensagem='...')
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse('api_notificacoes_stream'), {'ultimo_id': 0})
+        self.assertTrue(response.is_async)
+        conteudo = response.streaming_content
+        recebido = ''
+        # A conexão fica aberta por SSE_DURACAO_MAXIMA: os eventos chegam sem esperar o fim
+        while 'event: contadores' not in recebido:
+            recebido += (await asyncio.wait_for(anext(conteudo), timeout=5)).decode()
+        await conteudo.aclose()
+        self.assertIn('"Primeira"', recebido)
+
+    def test_stream_wsgi_faz_uma_leitura_por_conexao(self):
+        Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Primeira', mensagem='...')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('api_notificacoes_stream'), {'ultimo_id': 0})
+        self.assertFalse(response.is_async)
+        eventos = b''.join(response.streaming_content).decode()
+        self.assertTrue(eventos.startswith(f'retry: {SSE_RETRY_WSGI_MS}\n'))
+        self.assertIn('"Primeira"', eventos)
+
+    def test_eventsource_so_nas_paginas_servidas_por_asgi(self):
+        self.client.force_login(self.user)
+        conteudo = self.client.get(reverse('conf')).content.decode()
+        self.assertNotIn('EventSource(', conteudo)
+        self.assertIn(f'fetch("{reverse("api_notificacoes")}")', conteudo)
+
+        self.async_client.force_login(self.user)
+        conteudo = async_to_sync(self.async_client.get)(reverse('conf')).content.decode()
+        self.assertIn(f'new EventSource("{reverse("api_notificacoes_stream")}")', conteudo)
+
+
+class ConversasTest(TestCase):
+    """Mensagens agrupadas em conversas, com resumo por participante mantido pelos signals"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('caixa', password='senha')
+        self.outro = User.objects.create_user('contato', password='senha')
+
+    def enviar(self, remetente, destinatario, assunto='Oi'):
+        return Mensagem.objects.create(remetente=remetente, destinatario=destinatario, assunto=assunto, conteudo='...')
+
+    def participante(self, usuario, conversa):
+        return ParticipanteConversa.objects.get(conversa=conversa, usuario=usuario)
+
+    def test_resumo_mantido_pelos_signals(self):
+        primeira = self.enviar(self.outro, self.user)
+        resposta = self.enviar(self.user, self.outro)
+        terceira = self.enviar(self.outro, self.user)
+
+        # As duas direções caem na mesma conversa
+        self.assertEqual(Conversa.objects.count(), 1)
+        conversa = primeira.conversa
+        self.assertEqual({primeira.conversa_id, resposta.conversa_id, terceira.conversa_id}, {conversa.id})
+        meu = self.participante(self.user, conversa)
+        self.assertEqual((meu.outro_usuario_id, meu.ultima_mensagem_id, meu.nao_lidas), (self.outro.id, terceira.id, 2))
+        self.assertEqual(self.participante(self.outro, conversa).nao_lidas, 1)
+
+        primeira.lida = True
+        primeira.save()
+        terceira.delete()
+        meu.refresh_from_db()
+        self.assertEqual((meu.ultima_mensagem_id, meu.nao_lidas), (resposta.id, 0))
+        self.assertEqual(self.participante(self.outro, conversa).ultima_mensagem_id, resposta.id)
+
+    def test_contador_e_conversa_com_o_mesmo_valor_original_de_lida(self):
+        mensagem = self.enviar(self.outro, self.user)
+        # Saves seguidos da mesma instância: cada um compara com o valor do save anterior
+        for lida, nao_lidas in ((True, 0), (True, 0), (False, 1), (True, 0)):
+            mensagem.lida = lida
+            mensagem.save()
+            self.assertEqual(self.participante(self.user, mensagem.conversa).nao_lidas, nao_lidas)
+            self.assertEqual(obter_contador(self.user.id).mensagens, nao_lidas)
+
+        self.enviar(self.outro, self.user).delete()
+        self.assertEqual(self.participante(self.user, mensagem.conversa).nao_lidas, 0)
+        self.assertEqual(obter_contador(self.user.id).mensagens, 0)
+
+    def test_conversas_separadas_por_match(self):
+        candidato = Candidato.objects.create(user=self.user, nome='C', email='c@x.com', habilidades='Python')
+        empresa = Empresa.objects.create(user=self.outro, nome='E', cnpj='00.000.000/0001-00', email='e@x.com')
+        vaga = Vaga.objects.create(empresa=empresa, titulo='Dev', descricao='...', requisitos='...',
+                                   habilidades_necessarias='Python')
+        match = Match.objects.create(candidato=candidato, vaga=vaga, score=80)
+
+        self.enviar(self.outro, self.user)
+        Mensagem.objects.create(remetente=self.outro, destinatario=self.user, match=match, assunto='Vaga', conteudo='...')
+
+        self.assertEqual(Conversa.objects.count(), 2)
+        self.assertEqual(Conversa.objects.filter(match=match).count(), 1)
+
+    def test_marcar_conversa_lida_ajusta_contador(self):
+        for indice in range(3):
+            self.enviar(self.outro, self.user, f'M{indice}')
+        participante = ParticipanteConversa.objects.get(usuario=self.user)
+        self.assertEqual(obter_contador(self.user.id).mensagens, 3)
+
+        self.assertEqual(marcar_conversa_lida(participante), 3)
+
+        self.assertFalse(Mensagem.objects.filter(destinatario=self.user, lida=False).exists())
+        self.assertEqual(obter_contador(self.user.id).mensagens, 0)
+        participante.refresh_from_db()
+        self.assertEqual(participante.nao_lidas, 0)
+
+    def test_caixa_de_entrada_por_cursor(self):
+        contatos = [User.objects.create_user(f'contato{indice}') for indice in range(5)]
+        for contato in contatos:
+            self.enviar(contato, self.user)
+        # Nova mensagem leva a conversa para o topo
+        self.enviar(self.user, contatos[0])
+
+        pagina, cursor = caixa_de_entrada(self.user.id, tamanho=3)
+        self.assertEqual([p.outro_usuario_id for p in pagina], [contatos[0].id, contatos[4].id, contatos[3].id])
+        pagina, cursor = caixa_de_entrada(self.user.id, cursor, tamanho=3)
+        self.assertEqual([p.outro_usuario_id for p in pagina], [contatos[2].id, contatos[1].id])
+        self.assertIsNone(cursor)
+
+    def test_caixa_de_entrada_com_consultas_constantes(self):
+        self.client.force_login(self.user)
+        for indice in range(3):
+            self.enviar(User.objects.create_user(f'c{indice}'), self.user)
+        # Primeira visita guarda o perfil na sessão
+        self.client.get(reverse('caixa_mensagens'))
+        with CaptureQueriesContext(connection) as poucas:
+            self.client.get(reverse('caixa_mensagens'))
+        for indice in range(3, 15):
+            self.enviar(User.objects.create_user(f'c{indice}'), self.user)
+        with CaptureQueriesContext(connection) as muitas:
+            response = self.client.get(reverse('caixa_mensagens'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(muitas), len(poucas))
+
+    def test_pagina_e_api_da_conversa(self):
+        mensagens = [self.enviar(self.outro, self.user, f'M{indice}') for indice in range(3)]
+        conversa_id = mensagens[0].conversa_id
+        intruso = User.objects.create_user('intruso', password='senha')
+        self.client.force_login(intruso)
+        self.assertEqual(self.client.get(reverse('conversa_mensagens', args=[conversa_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_mensagens_conversa', args=[conversa_id])).status_code, 404)
+
+        self.client.force_login(self.user)
+        url = reverse('api_mensagens_conversa', args=[conversa_id])
+        self.assertEqual(self.client.get(url, {'cursor': 'x'}).status_code, 400)
+        dados = self.client.get(url).json()
+        self.assertEqual([m['id'] for m in dados['mensagens']], [m.id for m in reversed(mensagens)])
+
+        response = self.client.get(reverse('conversa_mensagens', args=[conversa_id]))
+        self.assertEqual([m.id for m in response.context['mensagens']], [m.id for m in mensagens])
+        self.assertEqual(obter_contador(self.user.id).mensagens, 0)
+        self.assertEqual(self.client.get(reverse('api_conversas')).json()['conversas'][0]['nao_lidas'], 0)
+
+
+class OutboxNotificacoesTest(MatchingTestMixin, TestCase):
+    """Os signals só enfileiram eventos; processar_eventos gera as notificações em lote"""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=10, total_vagas=2)
+        self.empresa_user = User.objects.create_user('empresa')
+        Empresa.objects.update(user=self.empresa_user)
+        self.candidatos = list(Candidato.objects.all())
+        for candidato in self.candidatos:
+            candidato.user = User.objects.create_user(username=f'c{candidato.id}')
+            candidato.save()
+        self.vaga = Vaga.objects.first()
+
+    def test_signals_apenas_enfileiram(self):
+        with CaptureQueriesContext(connection) as queries:
+            candidatura = Candidatura.objects.create(candidato=self.candidatos[0], vaga=self.vaga)
+        self.assertFalse(Notificacao.objects.exists())
+        self.assertFalse(any('core_empresa' in query['sql'] for query in queries.captured_queries))
+
+        candidatura.status = 'aprovado'
+        candidatura.save()
+        Mensagem.objects.create(remetente=self.empresa_user, destinatario=self.candidatos[0].user,
+                                assunto='Olá', conteudo='...')
+        self.assertEqual(
+            list(EventoNotificacao.objects.order_by('id').values_list('tipo', flat=True)),
+            ['candidatura_criada', 'candidatura_atualizada', 'mensagem_criada'],
+        )
+
+        resultado = processar_eventos()
+        self.assertEqual((resultado['processados'], resultado['notificacoes']), (3, 3))
+        self.assertEqual(Notificacao.objects.filter(usuario=self.empresa_user).get().titulo, 'Nova Candidatura Recebida!')
+        self.assertEqual(
+            set(Notificacao.objects.filter(usuario=self.candidatos[0].user).values_list('tipo', flat=True)),
+            {'candidatura', 'mensagem'},
+        )
+        self.assertFalse(EventoNotificacao.objects.filter(processado_em__isnull=True).exists())
+        self.assertEqual(obter_contador(self.empresa_user.id).notificacoes, 1)
+
+    def test_queries_constantes_por_lote(self):
+        def processar(quantidade):
+            for candidato in self.candidatos[:quantidade]:
+                Candidatura.objects.create(candidato=candidato, vaga=self.vaga)
+            with CaptureQueriesContext(connection) as queries:
+                processar_eventos()
+            Candidatura.objects.all().delete()
+            return len(queries)
+
+        processar(1)  # cria o contador de não lidas da empresa
+        self.assertEqual(processar(2), processar(10))
+
+    def test_objeto_removido_e_falhas(self):
+        candidatura = Candidatura.objects.create(candidato=self.candidatos[0], vaga=self.vaga)
+        candidatura.delete()
+        resultado = processar_eventos()
+        self.assertEqual((resultado['processados'], resultado['notificacoes']), (1, 0))
+
+        Candidatura.objects.create(candidato=self.candidatos[1], vaga=self.vaga)
+        queryset, _ = MONTADORES['candidatura_criada']
+
+        def falhar(candidatura):
+            raise RuntimeError('falha simulada')
+
+        with self.assertLogs('core.outbox', 'ERROR'):
+            with mock.patch.dict(MONTADORES, {'candidatura_criada': (queryset, falhar)}):
+                for _ in range(MAXIMO_TENTATIVAS):
+                    self.assertEqual(processar_todos_eventos()['falhas'], 1)
+                self.assertEqual(processar_todos_eventos()['falhas'], 0)
+
+        evento = EventoNotificacao.objects.latest('id')
+        self.assertEqual(evento.tentativas, MAXIMO_TENTATIVAS)
+        self.assertIn('falha simulada', evento.erro)
+        self.assertIsNotNone(evento.processado_em)
+        self.assertFalse(Notificacao.objects.exists())
+
+
+class ImportacaoDadosTest(TestCase):
+    """Importação em lote: validação pelos formulários, upsert e dados derivados por lote"""
+
+    CABECALHO = 'nome,email,cidade,estado,habilidades,experiencia_anos,pretensao_salarial\n'
+
+    def importar(self, tipo, conteudo, formato='csv', **opcoes):
+        rejeitadas = []
+        importador = Importador(tipo, ao_rejeitar=lambda numero, erros, registro: rejeitadas.append((numero, erros)),
+                                **opcoes)
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importador.importar(ler_registros(io.StringIO(conteudo), formato))
+        return resultado, rejeitadas
+
+    def criar_empresa(self):
+        linha = {'nome': 'Parceira', 'cnpj': '11.111.111/0001-11', 'email': 'rh@parceira.com'}
+        return self.importar('empresas', json.dumps(linha) + '\n', 'jsonl')
+
+    def test_candidatos_com_upsert_por_email(self):
+        resultado, rejeitadas = self.importar('candidatos', self.CABECALHO + (
+            'Ana,ana@x.com,Recife,PE,"Python, SQL",3,5000\n'
+            'Bia,bia@x.com,,,Java,1,\n'
+            'Inválida,sem-email,,,,x,\n'
+        ), tamanho_lote=1)
+
+        self.assertEqual((resultado['criadas'], resultado['rejeitadas'], resultado['lotes']), (2, 1, 2))
+        self.assertEqual(rejeitadas[0][0], 4)
+        self.assertEqual(set(rejeitadas[0][1]), {'email', 'experiencia_anos'})
+        ana = Candidato.objects.get(email='ana@x.com')
+        self.assertEqual(ana.habilidades_normalizadas, 'python,sql')
+        self.assertEqual(
+            set(HabilidadeCandidato.objects.filter(candidato=ana).values_list('habilidade', flat=True)),
+            {'python', 'sql'},
+        )
+
+        resultado, _ = self.importar('candidatos', self.CABECALHO + 'Ana Souza,ana@x.com,Recife,PE,Go,3,5000\n')
+
+        self.assertEqual((resultado['criadas'], resultado['atualizadas']), (0, 1))
+        ana.refresh_from_db()
+        self.assertEqual((ana.nome, ana.habilidades_normalizadas), ('Ana Souza', 'go'))
+        self.assertEqual(list(HabilidadeCandidato.objects.filter(candidato=ana).values_list('habilidade', flat=True)),
+                         ['go'])
+        self.assertEqual(reconciliar_estatisticas(), {})
+
+    def test_vagas_indexadas_e_vinculadas_a_empresa(self):
+        self.criar_empresa()
+        linhas = [
+            {'titulo': 'Dev Django', 'descricao': 'API', 'requisitos': '...', 'habilidades_necessarias': 'Python, Django',
+             'nivel': 'pleno', 'tipo': 'remoto', 'empresa_cnpj': '11.111.111/0001-11'},
+            {'titulo': 'Órfã', 'descricao': '...', 'requisitos': '...', 'habilidades_necessarias': 'Go',
+             'nivel': 'pleno', 'tipo': 'remoto', 'empresa_cnpj': '99.999.999/0001-99'},
+        ]
+        conteudo = ''.join(json.dumps(linha) + '\n' for linha in linhas) + '{quebrada\n'
+
+        resultado, rejeitadas = self.importar('vagas', conteudo, 'jsonl')
+
+        self.assertEqual((resultado['criadas'], resultado['rejeitadas']), (1, 2))
+        self.assertEqual(sorted(numero for numero, _ in rejeitadas), [2, 3])
+        vaga = Vaga.objects.get()
+        self.assertEqual((vaga.empresa.cnpj, vaga.status), ('11.111.111/0001-11', 'aberta'))
+        self.assertEqual(HabilidadeVaga.objects.filter(vaga=vaga).count(), 2)
+        self.assertEqual(list(buscar_vagas(Vaga.objects.all(), 'django')), [vaga])
+        self.assertEqual(reconciliar_estatisticas(), {})
+
+    def test_matches_gerados_na_mesma_passada(self):
+        self.criar_empresa()
+        self.importar('vagas', json.dumps({
+            'titulo': 'Dev', 'descricao': '...', 'requisitos': '...', 'habilidades_necessarias': 'Python, SQL',
+            'nivel': 'pleno', 'tipo': 'remoto', 'empresa_cnpj': '11.111.111/0001-11',
+        }) + '\n', 'jsonl')
+
+        resultado, _ = self.importar('candidatos', self.CABECALHO + (
+            'Ana,ana@x.com,Recife,PE,"Python, SQL",5,\n'
+            'Bia,bia@x.com,Recife,PE,Cobol,0,\n'
+        ), gerar_matches=True, score_minimo=70)
+
+        self.assertEqual(resultado['matches'], 1)
+        self.assertEqual(list(Match.objects.values_list('candidato__email', flat=True)), ['ana@x.com'])
+        self.assertTrue(EventoNotificacao.objects.filter(tipo='match_criado').exists())
+
+    def test_consultas_por_lote_e_nao_por_linha(self):
+        def consultas(total):
+            conteudo = self.CABECALHO + ''.join(
+                f'C{indice},c{indice}@{total}.com,,,"Python, SQL",1,\n' for indice in range(total)
+            )
+            with CaptureQueriesContext(connection) as contexto:
+                self.importar('candidatos', conteudo, tamanho_lote=1000)
+            return len(contexto)
+
+        consultas(1)
+        # (o SQLite limita os parâmetros por INSERT; lotes pequenos cabem em um só)
+        self.assertEqual(consultas(5), consultas(20))
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as arquivo:
+            arquivo.write(self.CABECALHO + 'Ana,ana@x.com,,,Python,1,\n')
+        self.addCleanup(os.remove, arquivo.name)
+        saida = io.StringIO()
+
+        call_command('importar_dados', 'candidatos', arquivo.name, stdout=saida)
+
+        self.assertIn('1 criadas', saida.getvalue())
+        self.assertTrue(Candidato.objects.filter(email='ana@x.com').exists())
+
+
+class ExportacaoCandidaturasTest(MatchingTestMixin, TestCase):
+    """Exportação das candidaturas da empresa em streaming"""
+
+    def setUp(self):
+        self.criar_populacao(total_candidatos=30, total_vagas=3)
+        self.user = User.objects.create_user('rh', password='senha')
+        self.empresa = Empresa.objects.get()
+        self.empresa.user = self.user
+        self.empresa.save()
+        vagas = list(Vaga.objects.all())
+        for indice, candidato in enumerate(Candidato.objects.order_by('id')):
+            Candidatura.objects.create(candidato=candidato, vaga=vagas[indice % len(vagas)])
+        outra = Empresa.objects.create(nome='Outra', cnpj='22.222.222/0001-22', email='outra@teste.com')
+        vaga_outra = Vaga.objects.create(empresa=outra, titulo='Outra', descricao='...', requisitos='...',
+                                         habilidades_necessarias='Go', nivel='pleno', tipo='remoto')
+        Candidatura.objects.create(candidato=Candidato.objects.first(), vaga=vaga_outra)
+        self.client.force_login(self.user)
+
+    def baixar(self, **parametros):
+        response = self.client.get(reverse('exportar_candidaturas_empresa'), parametros)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_somente_da_empresa(self):
+        response, conteudo = self.baixar()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        linhas = list(csv.reader(io.StringIO(conteudo)))
+        self.assertEqual(linhas[0], [coluna for coluna, _ in COLUNAS_CANDIDATURAS])
+        self.assertEqual(len(linhas) - 1, 30)
+        self.assertEqual({linha[4] for linha in linhas[1:]}, set(Vaga.objects.filter(empresa=self.empresa)
+                                                                  .values_list('titulo', flat=True)))
+
+    def test_ndjson_com_filtro_por_vaga(self):
+        vaga = Vaga.objects.filter(empresa=self.empresa).first()
+        _, conteudo = self.baixar(formato='ndjson', vaga=vaga.id)
+
+        registros = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual(len(registros), Candidatura.objects.filter(vaga=vaga).count())
+        self.assertEqual({registro['vaga_id'] for registro in registros}, {vaga.id})
+        self.assertEqual(self.client.get(reverse('exportar_candidaturas_empresa'), {'formato': 'xls'}).status_code, 400)
+
+    def test_cabecalho_antes_da_consulta_e_blocos_do_banco(self):
+        partes = gerar_exportacao('csv', blocos_candidaturas(consulta_candidaturas(self.empresa.id), tamanho_bloco=10))
+        with CaptureQueriesContext(connection) as contexto:
+            cabecalho = next(partes)
+        self.assertEqual(len(contexto), 0)
+        self.assertTrue(cabecalho.startswith('candidatura_id,'))
+
+        with CaptureQueriesContext(connection) as contexto:
+            list(partes)
+        # Uma query por bloco de linhas (3 cheios e um vazio), sem consultas por candidatura
+        self.assertEqual(len(contexto), 4)
+
+    async def test_asgi_envia_cada_bloco_sem_juntar_a_exportacao(self):
+        await self.async_client.aforce_login(self.user)
+        with mock.patch('core.exportacao.TAMANHO_BLOCO', 10):
+            response = await self.async_client.get(reverse('exportar_candidaturas_empresa'))
+            self.assertTrue(response.is_async)
+            partes = [parte.decode() async for parte in response.streaming_content]
+        self.assertTrue(partes[0].startswith('candidatura_id,'))
+        self.assertEqual([parte.count('\n') for parte in partes[1:]], [10, 10, 10])
+
+    def test_celulas_que_viram_formula_sao_escapadas(self):
+        Candidato.objects.update(nome='=HYPERLINK("x")')
+        _, conteudo = self.baixar()
+        self.assertIn("'=HYPERLINK", conteudo)
+
+
+class BuscaAdministrativaTest(TestCase):
+    """Busca por prefixo em colunas normalizadas e paginação por cursor no painel administrativo"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('staff', password='senha', is_staff=True))
+        self.ana = Candidato.objects.create(nome='Ána  Souza', email='Ana.Souza@Teste.com')
+        self.andre = Candidato.objects.create(nome='André Lima', email='andre@teste.com')
+        Candidato.objects.create(nome='Bruno Ana', email='bruno@exemplo.com')
+        self.creative = Empresa.objects.create(nome='Creative Minds', cnpj='12.345.678/0001-99', email='c@teste.com')
+        Empresa.objects.create(nome='Crédito Fácil', cnpj='98.765.432/0001-11', email='f@teste.com')
+
+    def buscar(self, nome_url, busca, chave):
+        response = self.client.get(reverse(nome_url), {'busca': busca})
+        return sorted(objeto.nome for objeto in response.context[chave])
+
+    def test_colunas_normalizadas(self):
+        self.assertEqual(self.ana.nome_busca, 'ana souza')
+        self.assertEqual(self.ana.email_busca, 'ana.souza@teste.com')
+        self.assertEqual(self.creative.cnpj_busca, '12345678000199')
+
+    def test_prefixo_do_nome_ignora_acentos_e_caixa(self):
+        self.assertEqual(self.buscar('gerenciar_usuarios', 'AN', 'candidatos'), ['André Lima', 'Ána  Souza'])
+        self.assertEqual(self.buscar('gerenciar_usuarios', 'ana s', 'candidatos'), ['Ána  Souza'])
+        self.assertEqual(self.buscar('gerenciar_empresas', 'cre', 'empresas'), ['Creative Minds', 'Crédito Fácil'])
+
+    def test_email_e_cnpj_completos_usam_igualdade(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buscar('gerenciar_usuarios', 'ANA.SOUZA@teste.com', 'candidatos'), ['Ána  Souza'])
+        self.assertTrue(any('"core_candidato"."email_busca" = ' in query['sql'] for query in queries))
+        self.assertEqual(self.buscar('gerenciar_usuarios', 'andre@', 'candidatos'), ['André Lima'])
+        self.assertEqual(self.buscar('gerenciar_empresas', '12345678000199', 'empresas'), ['Creative Minds'])
+        self.assertEqual(self.buscar('gerenciar_empresas', '98.765', 'empresas'), ['Crédito Fácil'])
+
+    def test_update_fields_propaga_colunas_de_busca(self):
+        self.andre.nome = 'Ândrea Lima'
+        self.andre.save(update_fields=['nome'])
+        self.andre.refresh_from_db()
+        self.assertEqual(self.andre.nome_busca, 'andrea lima')
+
+    def test_paginas_por_cursor(self):
+        candidatos = [Candidato(nome=f'Zeca {indice:03d}', email=f'zeca{indice}@teste.com') for indice in range(60)]
+        for candidato in candidatos:
+            candidato.atualizar_campos_busca()
+        Candidato.objects.bulk_create(candidatos)
+
+        response = self.client.get(reverse('gerenciar_usuarios'), {'busca': 'zeca'})
+        self.assertEqual(response.context['total'], 60)
+        primeira = [candidato.nome for candidato in response.context['candidatos']]
+        self.assertEqual(primeira[0], 'Zeca 000')
+        self.assertIsNotNone(response.context['proxima_url'])
+
+        response = self.client.get(reverse('gerenciar_usuarios') + response.context['proxima_url'])
+        segunda = [candidato.nome for candidato in response.context['candidatos']]
+        self.assertEqual(primeira + segunda, sorted(candidato.nome for candidato in candidatos))
+        self.assertIsNone(response.context['proxima_url'])
+
+        # Cursor inválido volta para a primeira página
+        response = self.client.get(reverse('gerenciar_usuarios'), {'busca': 'zeca', 'cursor': 'x'})
+        self.assertEqual(response.context['candidatos'][0].nome, 'Zeca 000')
+
+    def test_total_invalidado_junto_com_a_listagem(self):
+        self.assertEqual(self.client.get(reverse('gerenciar_usuarios')).context['total'], 3)
+        self.assertEqual(self.client.get(reverse('gerenciar_empresas')).context['total'], 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('gerenciar_usuarios'))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Candidato.objects.create(nome='Carla', email='carla@teste.com')
+            self.creative.delete()
+        self.assertEqual(self.client.get(reverse('gerenciar_usuarios')).context['total'], 4)
+        self.assertEqual(self.client.get(reverse('gerenciar_empresas')).context['total'], 1)
+
+
+class CacheListagensTest(MatchingTestMixin, TestCase):
+    """Listagens de vagas em cache, invalidadas por versão após save/delete de Vaga ou Empresa"""
+
+    def setUp(self):
+        cache.clear()
+        estatisticas_cache.limpar()
+        self.criar_populacao(total_candidatos=1, total_vagas=6)
+        self.client.force_login(User.objects.create_user('visitante', password='senha'))
+
+    def listar(self, **parametros):
+        return self.client.get(reverse('api_explorar_vagas'), parametros).json()
+
+    def test_segunda_requisicao_nao_consulta_vagas(self):
+        self.listar(tipo='remoto')
+        with CaptureQueriesContext(connection) as queries:
+            self.listar(tipo='remoto')
+        # Página, total e ETag vêm da versão do grupo; a tabela de vagas não é consultada
+        self.assertFalse(any('core_vaga' in query['sql'] for query in queries))
+
+        resumo = estatisticas_cache.resumo()
+        self.assertEqual(resumo['explorar_vagas'], {'acertos': 1, 'falhas': 1, 'taxa_acerto': 0.5})
+
+    def test_save_e_delete_invalidam_apos_commit(self):
+        antes = self.listar()
+        vaga = Vaga.objects.get(id=antes['vagas'][0]['id'])
+        vaga.titulo = 'Título novo'
+        with self.captureOnCommitCallbacks(execute=True):
+            vaga.save()
+        self.assertEqual(self.listar()['vagas'][0]['titulo'], 'Título novo')
+
+        empresa = Empresa.objects.get()
+        empresa.nome = 'Empresa Renomeada'
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa.save()
+        self.assertEqual(self.listar()['vagas'][0]['empresa'], 'Empresa Renomeada')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vaga.delete()
+        self.assertEqual(self.listar()['total'], antes['total'] - 1)
+
+    def test_versao_compartilhada_pelo_banco(self):
+        antes = self.listar()
+        # Outro processo altera a vaga: a versão do banco muda, o cache deste processo não
+        Vaga.objects.filter(id=antes['vagas'][0]['id']).update(titulo='Título de outro processo')
+        VersaoCache.objects.filter(pk=GRUPO_VAGAS).update(versao=F('versao') + 1)
+        self.assertEqual(self.listar()['vagas'][0]['titulo'], 'Título de outro processo')
+
+        VersaoCache.objects.all().delete()
+        cache.clear()
+        self.assertGreater(versao_cache(GRUPO_VAGAS), 0)
+
+    def test_landing_em_cache_para_visitantes(self):
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('landing')), 'TalentMatch')
+        self.client.get(reverse('landing'))
+        self.assertEqual(estatisticas_cache.resumo()['landing']['acertos'], 1)
+
+
+class GetCondicionalTest(MatchingTestMixin, TestCase):
+    """ETag/Last-Modified das APIs JSON: 304 sem montar a resposta enquanto os dados não mudam"""
+
+    def setUp(self):
+        cache.clear()
+        self.criar_populacao(total_candidatos=5, total_vagas=4)
+        self.user = User.objects.create_user('ana', password='senha')
+        self.outro = User.objects.create_user('bia', password='senha')
+        self.client.force_login(self.user)
+
+    def revalidar(self, url, etag, **parametros):
+        return self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag)
+
+    def test_304_sem_executar_a_view(self):
+        url = reverse('api_notificacoes')
+        Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Oi', mensagem='...')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            nao_modificada = self.revalidar(url, response['ETag'])
+        self.assertEqual(nao_modificada.status_code, 304)
+        self.assertEqual(nao_modificada.content, b'')
+        self.assertEqual(nao_modificada['ETag'], response['ETag'])
+        self.assertFalse(any('core_notificacao' in query['sql'] and 'LIMIT' in query['sql'] for query in queries))
+
+    def test_leitura_e_novos_dados_mudam_a_etag(self):
+        url = reverse('api_notificacoes')
+        notificacao = Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Oi', mensagem='...')
+        etag = self.client.get(url)['ETag']
+
+        notificacao.lida = True
+        notificacao.save()
+        response = self.revalidar(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['nao_lidas'], 0)
+
+        etag = response['ETag']
+        Notificacao.objects.create(usuario=self.user, tipo='sistema', titulo='Nova', mensagem='...')
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_etag_por_usuario_e_querystring(self):
+        url = reverse('api_explorar_vagas')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidar(url, etag).status_code, 304)
+        self.assertEqual(self.revalidar(url, etag, tipo='remoto').status_code, 200)
+
+        self.client.force_login(self.outro)
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_vaga_alterada_muda_a_etag(self):
+        url = reverse('api_explorar_vagas')
+        etag = self.client.get(url)['ETag']
+        vaga = Vaga.objects.first()
+        vaga.titulo = 'Outro título'
+        with self.captureOnCommitCallbacks(execute=True):
+            vaga.save()
+        self.assertEqual(self.revalidar(url, etag).status_code, 200)
+
+    def test_view_que_grava_matches_ja_envia_a_versao_final(self):
+        url = reverse('api_matches_candidato', args=[Candidato.objects.first().id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidar(url, etag).status_code, 304)
+
+    def test_versao_dos_matches_sem_agregar_a_outra_tabela(self):
+        candidato = Candidato.objects.first()
+        vaga = Vaga.objects.first()
+        url_candidato = reverse('api_matches_candidato', args=[candidato.id])
+        url_vaga = reverse('api_matches_vaga', args=[vaga.id])
+        etag_candidato = self.client.get(url_candidato)['ETag']
+        etag_vaga = self.client.get(url_vaga)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.revalidar(url_candidato, etag_candidato).status_code, 304)
+        self.assertFalse(any('"core_vaga"' in query['sql'] for query in queries))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.revalidar(url_vaga, etag_vaga).status_code, 304)
+        self.assertFalse(any('FROM "core_candidato"' in query['sql'] for query in queries))
+
+        # Vaga ou candidato de fora da resposta alterados: a versão do grupo muda a ETag
+        outra_vaga = Vaga.objects.exclude(id=vaga.id).first()
+        outra_vaga.titulo = 'Outro título'
+        with self.captureOnCommitCallbacks(execute=True):
+            outra_vaga.save()
+        self.assertEqual(self.revalidar(url_candidato, etag_candidato).status_code, 200)
+
+        outro_candidato = Candidato.objects.exclude(id=candidato.id).first()
+        outro_candidato.cidade = 'Outra cidade'
+        with self.captureOnCommitCallbacks(execute=True):
+            outro_candidato.save()
+        self.assertEqual(self.revalidar(url_vaga, etag_vaga).status_code, 200)
+
+    def test_candidatos_importados_mudam_a_etag_dos_matches_da_vaga(self):
+        vaga = Vaga.objects.create(
+            empresa=Empresa.objects.get(), titulo='Rust', descricao='...', requisitos='...',
+            habilidades_necessarias='Rust, Wasm', nivel='pleno', tipo='remoto', cidade='Natal', estado='RN',
+        )
+        url = reverse('api_matches_vaga', args=[vaga.id])
+        response = self.client.get(url)
+
+        linha = {'nome': 'Rita', 'email': 'rita@x.com', 'cidade': 'Natal', 'estado': 'RN',
+                 'habilidades': 'rust, wasm', 'experiencia_anos': 5}
+        with self.captureOnCommitCallbacks(execute=True):
+            Importador('candidatos').importar(ler_registros(io.StringIO(json.dumps(linha) + '\n'), 'jsonl'))
+
+        atualizada = self.revalidar(url, response['ETag'])
+        self.assertEqual(atualizada.status_code, 200)
+        self.assertEqual(atualizada.json()['total_matches'], response.json()['total_matches'] + 1)
+
+    def test_respostas_de_erro_sem_etag(self):
+        response = self.client.get(reverse('api_matches_vaga', args=[10**9]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+        mensagem = Mensagem.objects.create(remetente=self.outro, destinatario=self.user, assunto='Oi', conteudo='...')
+        url = reverse('api_mensagens_conversa', args=[mensagem.conversa_id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidar(url, etag).status_code, 304)
+
+        User.objects.create_user('intruso', password='senha')
+        self.client.login(username='intruso', password='senha')
+        self.assertEqual(self.revalidar(url, etag).status_code, 404)
+
+
+class ChatIATest(TestCase):
+    """Chat IA async contra o servidor stub local (sem rede)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = criar_servidor_stub()
+        threading.Thread(target=cls.stub.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stub.latencia_inicial, self.stub.intervalo, self.stub.tokens = 0.1, 0.01, 10
+        configuracao = override_settings(CHAT_IA={**settings.CHAT_IA, 'BASE_URL': self.stub.base_url})
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        ambiente = mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'stub'})
+        ambiente.start()
+        self.addCleanup(ambiente.stop)
+        self.user = User.objects.create_user('chat', password='senha')
+
+    def _fechando_cliente(teste):
+        """Fecha o cliente compartilhado antes de o event loop do teste terminar"""
+        @functools.wraps(teste)
+        async def executar(self):
+            try:
+                await teste(self)
+            finally:
+                await fechar_cliente()
+        return executar
+
+    async def _stream(self, pergunta='oi', usuario_id=None):
+        respostas = responder_pergunta(obter_cliente('stub'), None, pergunta, usuario_id)
+        return _stream_chat_ia(await anext(respostas), respostas)
+
+    @_fechando_cliente
+    async def test_stream_sse_e_json(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('api_chat_ia')
+        corpo = json.dumps({'mensagem': 'Olá'})
+
+        response = await self.async_client.post(url, corpo, content_type='application/json',
+                                                headers={'Accept': 'text/event-stream'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = b''.join([pedaco async for pedaco in response.streaming_content]).decode()
+        self.assertEqual(eventos.count('event: texto'), 10)
+        self.assertIn('Sobre \\"Ol\\u00e1\\"', eventos)
+        self.assertRegex(eventos, r'event: fim\ndata: \{"tokens_usados": \d+, "cache": false\}\n\n$')
+
+        # Mesma pergunta (com outra grafia) e mesmo perfil: resposta do cache, sem chamar o modelo
+        requisicoes = self.stub.requisicoes
+        dados = (await self.async_client.post(url, json.dumps({'mensagem': ' OLA!! '}),
+                                              content_type='application/json')).json()
+        self.assertTrue(dados['sucesso'])
+        self.assertTrue(dados['cache'])
+        self.assertTrue(dados['resposta'].startswith('Sobre "Olá": resposta1 '))
+        self.assertEqual(self.stub.requisicoes, requisicoes)
+
+    def test_sse_completo_sob_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('api_chat_ia'), json.dumps({'mensagem': 'Olá'}),
+                                    content_type='application/json', headers={'Accept': 'text/event-stream'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = response.content.decode()
+        self.assertEqual(eventos.count('event: texto'), 10)
+        self.assertRegex(eventos, r'event: fim\ndata: \{"tokens_usados": \d+, "cache": false\}\n\n$')
+
+    def test_perfil_resolvido_por_obter_perfil(self):
+        candidato = Candidato.objects.create(user=self.user, nome='Ana', email='ana@chat.com', habilidades='Python')
+        self.client.force_login(self.user)
+        with mock.patch('core.views.responder_pergunta', wraps=responder_pergunta) as responder:
+            response = self.client.post(reverse('api_chat_ia'), json.dumps({'mensagem': 'Olá'}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(responder.call_args.args[1], candidato)
+        self.assertTrue(self.client.session[CHAVE_SESSAO]['candidato'])
+
+    def test_cache_lru_com_ttl_e_chave_por_perfil(self):
+        cache_respostas = CacheRespostas(tamanho=2, ttl=60)
+        cache_respostas.guardar('a', 'A')
+        cache_respostas.guardar('b', 'B')
+        self.assertEqual(cache_respostas.obter('a'), 'A')
+        cache_respostas.guardar('c', 'C')  # descarta 'b', o menos usado
+        self.assertIsNone(cache_respostas.obter('b'))
+
+        with mock.patch('core.chat_ia.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache_respostas.obter('a'))
+        self.assertEqual(
+            {chave: cache_respostas.estatisticas()[chave] for chave in ('acertos', 'falhas', 'expiradas', 'descartadas', 'itens')},
+            {'acertos': 1, 'falhas': 2, 'expiradas': 1, 'descartadas': 1, 'itens': 1},
+        )
+
+        candidato = Candidato(nome='Ana', habilidades='Python', experiencia_anos=2)
+        outro_nome = Candidato(nome='Bia', habilidades='Python', experiencia_anos=2)
+        outro_perfil = Candidato(nome='Ana', habilidades='Python', experiencia_anos=5)
+        chave = chave_resposta('Como me preparar para a entrevista?', candidato)
+        self.assertEqual(chave, chave_resposta('como me PREPARAR para a entrevista', outro_nome))
+        self.assertNotEqual(chave, chave_resposta('como me preparar para a entrevista', outro_perfil))
+
+    @_fechando_cliente
+    async def test_orcamento_de_tokens_responde_429(self):
+        agendador = {**settings.CHAT_IA['AGENDADOR'], 'TOKENS_POR_USUARIO': 20}
+        with override_settings(CHAT_IA={**settings.CHAT_IA, 'BASE_URL': self.stub.base_url, 'AGENDADOR': agendador}):
+            await self.async_client.aforce_login(self.user)
+            url = reverse('api_chat_ia')
+
+            def perguntar(mensagem):
+                return self.async_client.post(url, json.dumps({'mensagem': mensagem}), content_type='application/json')
+
+            self.assertEqual((await perguntar('primeira')).status_code, 200)
+            response = await perguntar('segunda')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.json()['motivo'], 'tokens_usuario')
+            self.assertGreater(int(response['Retry-After']), 0)
+            # Respostas do cache não gastam tokens nem passam pelo agendador
+            self.assertTrue((await perguntar('Primeira!')).json()['cache'])
+            self.assertEqual(obter_agendador().estatisticas()['recusadas'], {'tokens_usuario': 1})
+
+    @_fechando_cliente
+    async def test_respostas_concorrentes_com_cliente_compartilhado(self):
+        self.assertIs(obter_cliente('stub'), obter_cliente('stub'))
+
+        async def conversar():
+            return [valor async for tipo, valor in transmitir_resposta(obter_cliente('stub'), montar_mensagens(None, 'oi'))]
+
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*(conversar() for _ in range(10)))
+        duracao = time.perf_counter() - inicio
+
+        self.assertTrue(all(len(resposta) == 11 for resposta in respostas))
+        # Em série seriam ~10 x 0.2s; em paralelo, perto de uma resposta só
+        self.assertLess(duracao, 1.0)
+
+    @_fechando_cliente
+    async def test_timeout_e_cancelamento(self):
+        self.stub.intervalo = 0.05
+        with override_settings(CHAT_IA={**settings.CHAT_IA, 'BASE_URL': self.stub.base_url, 'TIMEOUT_TOTAL': 0.2}):
+            eventos = [evento async for evento in await self._stream()]
+        self.assertIn('event: erro', eventos[-1])
+
+        interrompidas = self.stub.interrompidas
+        recebidos = asyncio.Event()
+
+        async def consumir():
+            async for _ in await self._stream():
+                recebidos.set()
+
+        tarefa = asyncio.ensure_future(consumir())
+        await recebidos.wait()
+        tarefa.cancel()  # o que o handler ASGI faz quando o navegador desconecta
+        with self.assertRaises(asyncio.CancelledError), self.assertLogs('core.views', 'INFO'):
+            await tarefa
+        for _ in range(50):
+            if self.stub.interrompidas > interrompidas:
+                break
+            await asyncio.sleep(0.02)
+        self.assertEqual(self.stub.interrompidas, interrompidas + 1)
+
+
+class AgendadorChatTest(SimpleTestCase):
+    """Vagas simultâneas, fila com espera máxima e orçamento de tokens do chat IA"""
+
+    async def test_limites_de_concorrencia_e_fila(self):
+        agendador = AgendadorChat({
+            'SIMULTANEAS': 2, 'SIMULTANEAS_POR_USUARIO': 1, 'FILA_MAXIMA': 2, 'ESPERA_MAXIMA': 0.2,
+        })
+        liberar = {rotulo: asyncio.Event() for rotulo in ('u1', 'u1 de novo', 'u2', 'u3', 'u4')}
+        ordem = []
+
+        async def chamar(usuario_id, rotulo):
+            async with agendador.reservar(usuario_id):
+                ordem.append(rotulo)
+                await liberar[rotulo].wait()
+
+        primeira = asyncio.ensure_future(chamar(1, 'u1'))
+        await asyncio.sleep(0)
+        repetida = asyncio.ensure_future(chamar(1, 'u1 de novo'))   # limite por usuário: fila
+        outro = asyncio.ensure_future(chamar(2, 'u2'))              # ocupa a última vaga global
+        terceiro = asyncio.ensure_future(chamar(3, 'u3'))           # fila
+        await asyncio.sleep(0.01)
+        self.assertEqual(agendador.estatisticas()['na_fila'], 2)
+        with self.assertRaises(LimiteChatExcedido) as contexto:
+            await chamar(4, 'u4')
+        self.assertEqual(contexto.exception.motivo, 'fila_cheia')
+
+        # A vaga liberada por u1 vai para a repetição de u1 (primeira da fila que pode executar)
+        liberar['u1'].set()
+        await primeira
+        await asyncio.sleep(0.01)
+        self.assertEqual(ordem, ['u1', 'u2', 'u1 de novo'])
+
+        with self.assertRaises(LimiteChatExcedido) as contexto:
+            await terceiro
+        self.assertEqual(contexto.exception.motivo, 'espera')
+        liberar['u1 de novo'].set()
+        liberar['u2'].set()
+        await asyncio.gather(repetida, outro)
+
+        estatisticas = agendador.estatisticas()
+        self.assertEqual((estatisticas['em_execucao'], estatisticas['na_fila'], estatisticas['fila_maxima']), (0, 0, 2))
+        self.assertEqual(estatisticas['recusadas'], {'fila_cheia': 1, 'espera': 1})
+        self.assertEqual(estatisticas['admitidas'], 3)
+        self.assertEqual(estatisticas['espera_ms']['total'], 3)
+
+    async def test_orcamento_em_janela_deslizante(self):
+        agendador = AgendadorChat({'TOKENS_POR_USUARIO': 100, 'TOKENS_GLOBAIS': 150, 'JANELA_TOKENS': 60})
+        agendador.registrar_tokens(1, 60)
+        agendador.registrar_tokens(1, 40)
+        with self.assertRaises(LimiteChatExcedido) as contexto:
+            async with agendador.reservar(1):
+                pass
+        self.assertEqual(contexto.exception.motivo, 'tokens_usuario')
+        self.assertAlmostEqual(contexto.exception.tentar_em, 60, delta=1)
+
+        agendador.registrar_tokens(2, 50)
+        with self.assertRaises(LimiteChatExcedido) as contexto:
+            async with agendador.reservar(3):
+                pass
+        self.assertEqual(contexto.exception.motivo, 'tokens_globais')
+
+        with mock.patch('core.agendador_chat.time.monotonic', return_value=time.monotonic() + 61):
+            async with agendador.reservar(1):
+                pass
+            self.assertEqual(agendador.estatisticas()['tokens_na_janela'], 0)
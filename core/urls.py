@@ -28,6 +28,7 @@ urlpatterns = [
 
     # Mensagens / Chat
     path('mensagens/', views.caixa_mensagens, name='caixa_mensagens'),
+    path('mensagens/conversas/<int:conversa_id>/', views.conversa_mensagens, name='conversa_mensagens'),
     path('chat_ia/', views.chat_ia, name='chat_ia'),
 
     # Cursos
@@ -60,6 +61,9 @@ urlpatterns = [
     path('relatorios/', views.relatorios, name='relatorios'),
     path('config_admin/', views.config_admin, name='config_admin'),
     
+# API de Vagas
+    path('api/vagas/', views.api_explorar_vagas, name='api_explorar_vagas'),
+    
 # API de Matching
     path('api/matches/candidato/<int:candidato_id>/', views.api_gerar_matches_candidato, name='api_matches_candidato'),
     path('api/matches/vaga/<int:vaga_id>/', views.api_gerar_matches_vaga, name='api_matches_vaga'),
@@ -71,10 +75,13 @@ urlpatterns = [
     
 # API de Notificações
     path('api/notificacoes/', views.api_notificacoes, name='api_notificacoes'),
+    path('api/notificacoes/stream/', views.api_notificacoes_stream, name='api_notificacoes_stream'),
     path('api/notificacoes/<int:id>/ler/', views.api_marcar_notificacao_lida, name='api_marcar_notificacao_lida'),
     
 # API de Mensagens
     path('api/mensagens/enviar/', views.api_enviar_mensagem, name='api_enviar_mensagem'),
+    path('api/mensagens/conversas/', views.api_conversas, name='api_conversas'),
+    path('api/mensagens/conversas/<int:conversa_id>/', views.api_mensagens_conversa, name='api_mensagens_conversa'),
     path('api/mensagens/<int:id>/marcar-lida/', views.api_marcar_mensagem_lida, name='api_marcar_mensagem_lida'),
     
 # API de Candidaturas
@@ -82,4 +89,8 @@ urlpatterns = [
     path('api/candidaturas/<int:candidatura_id>/atualizar/', views.api_atualizar_candidatura, name='api_atualizar_candidatura'),
     path('minhas-candidaturas/', views.listar_candidaturas_candidato, name='listar_candidaturas'),
     path('empresa/candidaturas/', views.listar_candidaturas_empresa, name='listar_candidaturas_empresa'),
+    path('empresa/candidaturas/exportar/', views.exportar_candidaturas_empresa, name='exportar_candidaturas_empresa'),
+    
+# API de Instrumentação
+    path('api/instrumentacao/', views.api_instrumentacao, name='api_instrumentacao'),
 ]
@@ -1,19 +1,63 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.db import IntegrityError
-from .models import Candidato, Empresa, Vaga, Match, Candidatura, Curso, ProgressoCurso, Notificacao, Mensagem
-from .matching import gerar_matches_para_candidato, gerar_matches_para_vaga, calcular_compatibilidade
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection
+from django.db.models import Count, Max, Q, Sum
+from .models import (
+    Candidato, Empresa, Vaga, Match, Candidatura, Curso, ProgressoCurso, Notificacao, Mensagem, ContadorNaoLidas,
+    ParticipanteConversa,
+)
+from .matching import (
+    gerar_matches_para_vaga, gerar_top_matches_para_candidato, gerar_top_matches_para_vaga,
+    pontuar,
+)
+from .middleware import metricas
+from .perfis import obter_perfil, perfil_do_usuario
+from .estatisticas import obter_estatisticas
+from .paginacao import paginar_por_cursor
+from .cache_listagens import GRUPO_CANDIDATOS, GRUPO_VAGAS, em_cache, estatisticas as estatisticas_cache, versao
+from .condicional import agregar, combinar, get_condicional
+from .busca import buscar_vagas, filtro_prefixo, normalizar_busca, normalizar_email, somente_digitos, termos_busca
+from .contadores import obter_contador
+from .conversas import caixa_de_entrada, marcar_conversa_lida, mensagens_da_conversa
+from .exportacao import (
+    FORMATOS_EXPORTACAO, ablocos_candidaturas, agerar_exportacao, blocos_candidaturas, consulta_candidaturas,
+    gerar_exportacao,
+)
 from .forms import CandidatoPerfilForm, EmpresaPerfilForm, VagaForm
+from .agendador_chat import LimiteChatExcedido, obter_agendador
+from .chat_ia import fechar_cliente, obter_cache_respostas, obter_cliente, responder_pergunta
 from datetime import datetime
+from urllib.parse import urlencode
+import asyncio
+import logging
+import math
 import os
 import json
-from openai import OpenAI
+import re
+import time
+
+
+# Stream de notificações (ASGI): intervalo entre leituras do contador, heartbeat e duração
+# máxima de cada conexão (em segundos); o cliente reconecta após SSE_RETRY_MS
+SSE_INTERVALO = 2
+SSE_HEARTBEAT = 15
+SSE_DURACAO_MAXIMA = 300
+SSE_RETRY_MS = 3000
+# Sob WSGI cada conexão faz uma só leitura: reconectar logo seria polling escondido
+SSE_RETRY_WSGI_MS = 60000
+
+logger = logging.getLogger('core.views')
 
 
 # ===============================
@@ -25,13 +69,11 @@ def _redirect_authenticated_user(user):
     if user.is_superuser or user.is_staff:
         return redirect('dashboard_admin')
     
-    try:
-        if hasattr(user, 'candidato'):
-            return redirect('dashboard_candidato')
-        elif hasattr(user, 'empresa'):
-            return redirect('dashboard_empresa')
-    except:
-        pass
+    perfil = perfil_do_usuario(user)
+    if perfil.is_candidato():
+        return redirect('dashboard_candidato')
+    elif perfil.is_empresa():
+        return redirect('dashboard_empresa')
     
     return redirect('dashboard_candidato')
 
@@ -45,8 +87,11 @@ def base(request):
     return render(request, 'base.html')
 
 def landing_page(request):
-    """Página inicial pública (landing page)."""
-    return render(request, 'landing.html')
+    """Página inicial pública (landing page); para visitantes, o HTML renderizado vem do cache."""
+    if request.user.is_authenticated:
+        return render(request, 'landing.html')
+    html = em_cache('landing', {}, lambda: render_to_string('landing.html', request=request), grupo=None)
+    return HttpResponse(html)
 
 
 # ===============================
@@ -56,14 +101,16 @@ def landing_page(request):
 @login_required(login_url='login')
 def dashboard_candidato(request):
     """Dashboard principal do candidato."""
-    try:
-        candidato = request.user.candidato
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil de candidato não encontrado.')
         return redirect('login')
     
     matches = Match.objects.filter(candidato=candidato).select_related('vaga', 'vaga__empresa').order_by('-score')[:5]
-    vagas_recentes = Vaga.objects.filter(status='aberta').order_by('-criado_em')[:10]
+    vagas_recentes = em_cache(
+        'vagas_recentes', {},
+        lambda: list(Vaga.objects.filter(status='aberta').select_related('empresa').order_by('-criado_em')[:10]),
+    )
     
     context = {
         'candidato': candidato,
@@ -75,9 +122,8 @@ def dashboard_candidato(request):
 @login_required(login_url='login')
 def perfil_candidato(request):
     """Página de perfil do candidato (visualização)."""
-    try:
-        candidato = request.user.candidato
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil não encontrado.')
         return redirect('dashboard_candidato')
     
@@ -87,9 +133,8 @@ def perfil_candidato(request):
 @login_required(login_url='login')
 def editar_perfil_candidato(request):
     """Edição completa de perfil do candidato com formulário estruturado."""
-    try:
-        candidato = request.user.candidato
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil de candidato não encontrado.')
         return redirect('dashboard_candidato')
     
@@ -123,102 +168,198 @@ def analise(request):
 
 @login_required(login_url='login')
 def caixa_mensagens(request):
-    """Caixa de mensagens funcional."""
-    mensagens_recebidas = Mensagem.objects.filter(
-        destinatario=request.user
-    ).select_related('remetente').order_by('-criado_em')
-    
-    mensagens_enviadas = Mensagem.objects.filter(
-        remetente=request.user
-    ).select_related('destinatario').order_by('-criado_em')
+    """Caixa de mensagens: conversas do usuário, da mais recente para a mais antiga, por cursor."""
+    try:
+        conversas, proximo_cursor = caixa_de_entrada(request.user.id, request.GET.get('cursor'))
+    except ValueError:
+        conversas, proximo_cursor = caixa_de_entrada(request.user.id)
     
     context = {
-        'mensagens_recebidas': mensagens_recebidas[:20],
-        'mensagens_enviadas': mensagens_enviadas[:20],
-        'nao_lidas': mensagens_recebidas.filter(lida=False).count(),
+        'conversas': conversas,
+        'proxima_url': '?' + urlencode({'cursor': proximo_cursor}) if proximo_cursor else None,
+        'nao_lidas': obter_contador(request.user.id).mensagens,
     }
     return render(request, 'candidate/mensagens.html', context)
 
+@login_required(login_url='login')
+def conversa_mensagens(request, conversa_id):
+    """Mensagens de uma conversa (as mais recentes primeiro; ?cursor= carrega as anteriores)."""
+    participante = get_object_or_404(
+        ParticipanteConversa.objects.select_related('outro_usuario', 'conversa__match__vaga'),
+        conversa_id=conversa_id, usuario=request.user,
+    )
+    try:
+        mensagens, proximo_cursor = mensagens_da_conversa(conversa_id, request.GET.get('cursor'))
+    except ValueError:
+        mensagens, proximo_cursor = mensagens_da_conversa(conversa_id)
+    marcar_conversa_lida(participante)
+    
+    context = {
+        'participante': participante,
+        # Página buscada da mais recente para a mais antiga; exibida em ordem cronológica
+        'mensagens': mensagens[::-1],
+        'anteriores_url': '?' + urlencode({'cursor': proximo_cursor}) if proximo_cursor else None,
+    }
+    return render(request, 'candidate/conversa.html', context)
+
 @login_required(login_url='login')
 def chat_ia(request):
     """Chat com IA usando OpenAI."""
-    try:
-        candidato = request.user.candidato
-        context = {'candidato': candidato}
-        return render(request, 'candidate/chat_ia.html', context)
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         return render(request, 'candidate/chat_ia.html')
+    context = {'candidato': candidato}
+    return render(request, 'candidate/chat_ia.html', context)
 
 
 # ----- 💼 Vagas -----
 
+def _filtrar_vagas(request):
+    """Vagas abertas com os filtros da querystring; retorna (queryset, filtros)"""
+    vagas = Vaga.objects.filter(status='aberta').select_related('empresa')
+    
+    filtros = {
+        'q': request.GET.get('q', '').strip(),
+        'cidade': request.GET.get('cidade', ''),
+        'tipo': request.GET.get('tipo', ''),
+        'nivel': request.GET.get('nivel', ''),
+    }
+    
+    if filtros['q']:
+        vagas = buscar_vagas(vagas, filtros['q'])
+    if filtros['cidade']:
+        vagas = vagas.filter(cidade__icontains=filtros['cidade'])
+    if filtros['tipo']:
+        vagas = vagas.filter(tipo=filtros['tipo'])
+    if filtros['nivel']:
+        vagas = vagas.filter(nivel=filtros['nivel'])
+    
+    return vagas, filtros
+
+def _ordenacao_vagas(filtros):
+    """Com busca textual, as mais relevantes primeiro; senão, as mais recentes"""
+    if termos_busca(filtros['q']):
+        return ('-relevancia', '-id')
+    return ('-criado_em', '-id')
+
+def _pagina_vagas(vagas, filtros, cursor=None):
+    """
+    (página, próximo cursor) das vagas filtradas, em cache por filtros e cursor até a
+    próxima alteração de vaga ou empresa; cursor inválido levanta ValueError
+    """
+    return em_cache(
+        'explorar_vagas', {**filtros, 'cursor': cursor or ''},
+        lambda: paginar_por_cursor(vagas, cursor, ordenacao=_ordenacao_vagas(filtros)),
+    )
+
+def _total_vagas(vagas, filtros):
+    return em_cache('explorar_vagas:total', filtros, vagas.count)
+
 @login_required(login_url='login')
 def explorar_vagas(request):
-    """Página de exploração de vagas com filtragem."""
-    vagas = Vaga.objects.filter(status='aberta').select_related('empresa').order_by('-criado_em')
+    """Página de exploração de vagas com filtragem e paginação por cursor."""
+    vagas, filtros = _filtrar_vagas(request)
     
-    cidade = request.GET.get('cidade', '')
-    tipo = request.GET.get('tipo', '')
-    nivel = request.GET.get('nivel', '')
+    try:
+        pagina, proximo_cursor = _pagina_vagas(vagas, filtros, request.GET.get('cursor'))
+    except ValueError:
+        pagina, proximo_cursor = _pagina_vagas(vagas, filtros)
     
-    if cidade:
-        vagas = vagas.filter(cidade__icontains=cidade)
-    if tipo:
-        vagas = vagas.filter(tipo=tipo)
-    if nivel:
-        vagas = vagas.filter(nivel=nivel)
+    proxima_url = None
+    if proximo_cursor:
+        proxima_url = '?' + urlencode({**{k: v for k, v in filtros.items() if v}, 'cursor': proximo_cursor})
     
     context = {
-        'vagas': vagas[:50],
-        'total': vagas.count(),
-        'filtros': {
-            'cidade': cidade,
-            'tipo': tipo,
-            'nivel': nivel,
-        }
+        'vagas': pagina,
+        'total': _total_vagas(vagas, filtros),
+        'proxima_url': proxima_url,
+        'filtros': filtros,
     }
     return render(request, 'candidate/explorar_vagas.html', context)
 
+def _versao_explorar_vagas(request):
+    """
+    Versão do grupo de vagas com os filtros normalizados e o cursor: a mesma chave do cache
+    da página, sem consultar a tabela de vagas
+    """
+    _, filtros = _filtrar_vagas(request)
+    return None, [versao(GRUPO_VAGAS), filtros, request.GET.get('cursor', '')]
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+@get_condicional(_versao_explorar_vagas)
+def api_explorar_vagas(request):
+    """
+    API: Vagas abertas com os mesmos filtros de explorar_vagas, paginadas por cursor
+    GET /api/vagas/?q=&cidade=&tipo=&nivel=&cursor=
+    """
+    vagas, filtros = _filtrar_vagas(request)
+    
+    try:
+        pagina, proximo_cursor = _pagina_vagas(vagas, filtros, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    return JsonResponse({
+        'total': _total_vagas(vagas, filtros),
+        'proximo_cursor': proximo_cursor,
+        'vagas': [
+            {
+                'id': vaga.id,
+                'titulo': vaga.titulo,
+                'empresa': vaga.empresa.nome,
+                'cidade': vaga.cidade,
+                'estado': vaga.estado,
+                'tipo': vaga.tipo,
+                'nivel': vaga.nivel,
+                'salario_min': float(vaga.salario_min) if vaga.salario_min else None,
+                'salario_max': float(vaga.salario_max) if vaga.salario_max else None,
+                'criado_em': vaga.criado_em.isoformat(),
+            }
+            for vaga in pagina
+        ],
+    })
+
 @login_required(login_url='login')
 def candidaturas_vagas(request):
     """Página que lista candidaturas/matches do candidato."""
-    try:
-        candidato = request.user.candidato
-        matches = Match.objects.filter(
-            candidato=candidato,
-            candidato_interessado=True
-        ).select_related('vaga', 'vaga__empresa').order_by('-criado_em')
-        
-        context = {
-            'matches': matches,
-            'total': matches.count(),
-        }
-        return render(request, 'candidate/candidaturas_vagas.html', context)
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil de candidato não encontrado.')
         return redirect('login')
+    
+    matches = Match.objects.filter(
+        candidato=candidato,
+        candidato_interessado=True
+    ).select_related('vaga', 'vaga__empresa').order_by('-criado_em')
+    
+    context = {
+        'matches': matches,
+        'total': matches.count(),
+    }
+    return render(request, 'candidate/candidaturas_vagas.html', context)
 
 @login_required(login_url='login')
 def detalhe_vaga(request, id):
     """Detalhes de uma vaga com opção de candidatura."""
     vaga = get_object_or_404(Vaga, id=id)
     
-    try:
-        candidato = request.user.candidato
-        match = Match.objects.filter(candidato=candidato, vaga=vaga).first()
-        
-        if not match:
-            score = calcular_compatibilidade(candidato, vaga)
-            match = Match(candidato=candidato, vaga=vaga, score=score)
-        
-        context = {
-            'vaga': vaga,
-            'match': match,
-            'compatibilidade': match.score if match else 0,
-        }
-        return render(request, 'candidate/detalhe_vaga.html', context)
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         return render(request, 'candidate/detalhe_vaga.html', {'vaga': vaga})
+    
+    match = Match.objects.filter(candidato=candidato, vaga=vaga).first()
+    
+    if not match:
+        score = pontuar(candidato, vaga)
+        match = Match(candidato=candidato, vaga=vaga, score=score)
+    
+    context = {
+        'vaga': vaga,
+        'match': match,
+        'compatibilidade': match.score if match else 0,
+    }
+    return render(request, 'candidate/detalhe_vaga.html', context)
 
 
 # ----- 🎓 Cursos -----
@@ -226,47 +367,46 @@ def detalhe_vaga(request, id):
 @login_required(login_url='login')
 def cursos(request):
     """Lista de cursos disponíveis com recomendações."""
-    try:
-        candidato = request.user.candidato
-        cursos_disponiveis = Curso.objects.all().order_by('-criado_em')
-        cursos_em_andamento = ProgressoCurso.objects.filter(
-            candidato=candidato,
-            concluido=False
-        ).select_related('curso')
-        
-        context = {
-            'cursos': cursos_disponiveis,
-            'cursos_em_andamento': cursos_em_andamento,
-            'candidato': candidato,
-        }
-        return render(request, 'candidate/cursos.html', context)
-    except:
-        cursos_disponiveis = Curso.objects.all().order_by('-criado_em')
+    candidato = obter_perfil(request).candidato
+    cursos_disponiveis = Curso.objects.all().order_by('-criado_em')
+    if not candidato:
         return render(request, 'candidate/cursos.html', {'cursos': cursos_disponiveis})
+    
+    cursos_em_andamento = ProgressoCurso.objects.filter(
+        candidato=candidato,
+        concluido=False
+    ).select_related('curso')
+    
+    context = {
+        'cursos': cursos_disponiveis,
+        'cursos_em_andamento': cursos_em_andamento,
+        'candidato': candidato,
+    }
+    return render(request, 'candidate/cursos.html', context)
 
 @login_required(login_url='login')
 def progre_cursos(request):
     """Progresso em cursos realizados."""
-    try:
-        candidato = request.user.candidato
-        progressos = ProgressoCurso.objects.filter(
-            candidato=candidato
-        ).select_related('curso').order_by('-iniciado_em')
-        
-        concluidos = progressos.filter(concluido=True)
-        em_andamento = progressos.filter(concluido=False)
-        
-        context = {
-            'progressos': progressos,
-            'concluidos': concluidos,
-            'em_andamento': em_andamento,
-            'total_cursos': progressos.count(),
-            'total_concluidos': concluidos.count(),
-        }
-        return render(request, 'candidate/progre_cursos.html', context)
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil de candidato não encontrado.')
         return redirect('login')
+    
+    progressos = ProgressoCurso.objects.filter(
+        candidato=candidato
+    ).select_related('curso').order_by('-iniciado_em')
+    
+    concluidos = progressos.filter(concluido=True)
+    em_andamento = progressos.filter(concluido=False)
+    
+    context = {
+        'progressos': progressos,
+        'concluidos': concluidos,
+        'em_andamento': em_andamento,
+        'total_cursos': progressos.count(),
+        'total_concluidos': concluidos.count(),
+    }
+    return render(request, 'candidate/progre_cursos.html', context)
 
 
 # ----- ⚙️ Configurações -----
@@ -283,16 +423,15 @@ def conf(request):
 @login_required(login_url='login')
 def dashboard_empresa(request):
     """Dashboard funcional da empresa."""
-    try:
-        empresa = request.user.empresa
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Perfil de empresa não encontrado.')
         return redirect('login')
     
     vagas = Vaga.objects.filter(empresa=empresa).order_by('-criado_em')
     vagas_abertas = vagas.filter(status='aberta')
     total_candidatos = Match.objects.filter(vaga__empresa=empresa).count()
-    mensagens_nao_lidas = Mensagem.objects.filter(destinatario=request.user, lida=False).count()
+    mensagens_nao_lidas = obter_contador(request.user.id).mensagens
     
     context = {
         'empresa': empresa,
@@ -308,9 +447,7 @@ def dashboard_empresa(request):
 @login_required(login_url='login')
 def perfil_empresa(request):
     """Página de perfil da empresa (visualização)."""
-    from core.models import Empresa
-    
-    empresa = Empresa.objects.filter(user=request.user).first()
+    empresa = obter_perfil(request).empresa
     if not empresa:
         messages.error(request, 'Perfil de empresa não encontrado.')
         return redirect('login')
@@ -329,9 +466,8 @@ def perfil_empresa(request):
 @login_required(login_url='login')
 def editar_perfil_empresa(request):
     """Edição completa de perfil da empresa com formulário estruturado."""
-    try:
-        empresa = request.user.empresa
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Perfil de empresa não encontrado.')
         return redirect('dashboard_empresa')
     
@@ -425,9 +561,8 @@ def cadastro_empresa(request):
 @login_required(login_url='login')
 def cadastrar_vaga(request):
     """Formulário funcional para cadastrar uma nova vaga."""
-    try:
-        empresa = request.user.empresa
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Apenas empresas podem cadastrar vagas.')
         return redirect('login')
     
@@ -460,14 +595,13 @@ def editar_vaga(request, id):
     """Edição de vaga existente."""
     vaga = get_object_or_404(Vaga, id=id)
     
-    try:
-        empresa = request.user.empresa
-        if vaga.empresa != empresa:
-            messages.error(request, 'Você não tem permissão para editar esta vaga.')
-            return redirect('dashboard_empresa')
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Apenas empresas podem editar vagas.')
         return redirect('login')
+    if vaga.empresa_id != empresa.id:
+        messages.error(request, 'Você não tem permissão para editar esta vaga.')
+        return redirect('dashboard_empresa')
     
     if request.method == "POST":
         form = VagaForm(request.POST, instance=vaga)
@@ -493,14 +627,13 @@ def deletar_vaga(request, id):
     """Deletar uma vaga (apenas empresas donas da vaga)."""
     vaga = get_object_or_404(Vaga, id=id)
     
-    try:
-        empresa = request.user.empresa
-        if vaga.empresa != empresa:
-            messages.error(request, 'Você não tem permissão para deletar esta vaga.')
-            return redirect('dashboard_empresa')
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Apenas empresas podem deletar vagas.')
         return redirect('login')
+    if vaga.empresa_id != empresa.id:
+        messages.error(request, 'Você não tem permissão para deletar esta vaga.')
+        return redirect('dashboard_empresa')
     
     if request.method == "POST":
         titulo = vaga.titulo
@@ -522,68 +655,113 @@ def dashboard_admin(request):
         messages.error(request, 'Acesso restrito a administradores.')
         return redirect('landing')
     
-    total_candidatos = Candidato.objects.count()
-    total_empresas = Empresa.objects.count()
-    total_vagas = Vaga.objects.count()
-    vagas_abertas = Vaga.objects.filter(status='aberta').count()
-    total_matches = Match.objects.count()
-    matches_ativos = Match.objects.filter(status='pendente').count()
+    # Contadores pré-calculados: uma query, independente do tamanho das tabelas
+    estatisticas = obter_estatisticas()
     
     candidatos_recentes = Candidato.objects.order_by('-criado_em')[:5]
     empresas_recentes = Empresa.objects.order_by('-criado_em')[:5]
     vagas_recentes = Vaga.objects.select_related('empresa').order_by('-criado_em')[:5]
     
     context = {
-        'total_candidatos': total_candidatos,
-        'total_empresas': total_empresas,
-        'total_vagas': total_vagas,
-        'vagas_abertas': vagas_abertas,
-        'total_matches': total_matches,
-        'matches_ativos': matches_ativos,
+        'total_candidatos': estatisticas.total_candidatos,
+        'total_empresas': estatisticas.total_empresas,
+        'total_vagas': estatisticas.total_vagas,
+        'vagas_abertas': estatisticas.vagas_abertas,
+        'total_matches': estatisticas.total_matches,
+        'matches_ativos': estatisticas.matches_ativos,
         'candidatos_recentes': candidatos_recentes,
         'empresas_recentes': empresas_recentes,
         'vagas_recentes': vagas_recentes,
     }
     return render(request, 'admin_panel/dashboard_admin.html', context)
 
+def _buscar_candidatos(busca):
+    """
+    Busca administrativa de candidatos: (queryset, ordenacao)
+    - email completo: igualdade em email_busca
+    - texto com @: prefixo do email; demais textos: prefixo do nome normalizado
+    Cada caso filtra e ordena pela mesma coluna indexada, então a paginação por
+    cursor percorre o índice sem ordenar o resultado.
+    """
+    candidatos = Candidato.objects.all()
+    if '@' in busca:
+        email = normalizar_email(busca)
+        try:
+            validate_email(email)
+        except ValidationError:
+            return candidatos.filter(filtro_prefixo('email_busca', email)), ('email_busca', 'id')
+        return candidatos.filter(email_busca=email), ('email_busca', 'id')
+    
+    nome = normalizar_busca(busca)
+    if nome:
+        return candidatos.filter(filtro_prefixo('nome_busca', nome)), ('nome_busca', 'id')
+    return candidatos, ('-criado_em', '-id')
+
+
+def _buscar_empresas(busca):
+    """
+    Busca administrativa de empresas: (queryset, ordenacao)
+    - CNPJ completo (14 dígitos, com ou sem pontuação): igualdade em cnpj_busca
+    - só dígitos e pontuação: prefixo do CNPJ; demais textos: prefixo do nome normalizado
+    """
+    empresas = Empresa.objects.all()
+    digitos = somente_digitos(busca)
+    if digitos and not re.search(r'[^\d\s./-]', busca):
+        if len(digitos) == 14:
+            return empresas.filter(cnpj_busca=digitos), ('cnpj_busca', 'id')
+        return empresas.filter(filtro_prefixo('cnpj_busca', digitos)), ('cnpj_busca', 'id')
+    
+    nome = normalizar_busca(busca)
+    if nome:
+        return empresas.filter(filtro_prefixo('nome_busca', nome)), ('nome_busca', 'id')
+    return empresas, ('-criado_em', '-id')
+
+
+def _listagem_administrativa(request, prefixo, buscar, grupo):
+    """
+    Página da listagem (por cursor), total em cache e URL da próxima página
+    O total fica na versão do grupo do modelo listado e é invalidado junto com ela
+    """
+    busca = request.GET.get('busca', '').strip()
+    queryset, ordenacao = buscar(busca)
+    try:
+        pagina, proximo_cursor = paginar_por_cursor(queryset, request.GET.get('cursor'), ordenacao=ordenacao)
+    except ValueError:
+        pagina, proximo_cursor = paginar_por_cursor(queryset, ordenacao=ordenacao)
+    
+    proxima_url = None
+    if proximo_cursor:
+        proxima_url = '?' + urlencode({**({'busca': busca} if busca else {}), 'cursor': proximo_cursor})
+    return {
+        'total': em_cache(f'{prefixo}:total', {'busca': busca}, queryset.count, grupo=grupo),
+        'busca': busca,
+        'proxima_url': proxima_url,
+        'primeira_pagina': not request.GET.get('cursor'),
+    }, pagina
+
+
 @login_required(login_url='login')
 def gerenciar_usuarios(request):
-    """Página de gerenciamento de usuários (candidatos) com filtros."""
+    """Página de gerenciamento de usuários (candidatos) com busca por prefixo e paginação por cursor."""
     if not request.user.is_staff:
         messages.error(request, 'Acesso restrito a administradores.')
         return redirect('landing')
     
-    candidatos = Candidato.objects.all().select_related('user').order_by('-criado_em')
-    
-    busca = request.GET.get('busca', '')
-    if busca:
-        candidatos = candidatos.filter(nome__icontains=busca) | candidatos.filter(email__icontains=busca)
-    
-    context = {
-        'candidatos': candidatos[:100],
-        'total': candidatos.count(),
-        'busca': busca,
-    }
+    context, candidatos = _listagem_administrativa(
+        request, 'gerenciar_usuarios', _buscar_candidatos, GRUPO_CANDIDATOS
+    )
+    context['candidatos'] = candidatos
     return render(request, 'admin_panel/gerenciar_usuarios.html', context)
 
 @login_required(login_url='login')
 def gerenciar_empresas(request):
-    """Página de gerenciamento de empresas com filtros."""
+    """Página de gerenciamento de empresas com busca por prefixo e paginação por cursor."""
     if not request.user.is_staff:
         messages.error(request, 'Acesso restrito a administradores.')
         return redirect('landing')
     
-    empresas = Empresa.objects.all().select_related('user').order_by('-criado_em')
-    
-    busca = request.GET.get('busca', '')
-    if busca:
-        empresas = empresas.filter(nome__icontains=busca) | empresas.filter(cnpj__icontains=busca)
-    
-    context = {
-        'empresas': empresas[:100],
-        'total': empresas.count(),
-        'busca': busca,
-    }
+    context, empresas = _listagem_administrativa(request, 'gerenciar_empresas', _buscar_empresas, GRUPO_VAGAS)
+    context['empresas'] = empresas
     return render(request, 'admin_panel/gerenciar_empresas.html', context)
 
 @login_required(login_url='login')
@@ -599,10 +777,15 @@ def gerenciar_vagas(request):
     if status_filtro:
         vagas = vagas.filter(status=status_filtro)
     
+    busca = request.GET.get('q', '').strip()
+    if termos_busca(busca):
+        vagas = buscar_vagas(vagas, busca).order_by('-relevancia', '-id')
+    
     context = {
         'vagas': vagas[:100],
         'total': vagas.count(),
         'status_filtro': status_filtro,
+        'busca': busca,
     }
     return render(request, 'admin_panel/gerenciar_vagas.html', context)
 
@@ -672,14 +855,13 @@ def cancelar_candidatura(request, id):
     """Candidato cancela sua própria candidatura."""
     candidatura = get_object_or_404(Candidatura, id=id)
     
-    try:
-        candidato = request.user.candidato
-        if candidatura.candidato != candidato:
-            messages.error(request, 'Você não tem permissão para cancelar esta candidatura.')
-            return redirect('listar_candidaturas')
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Apenas candidatos podem cancelar candidaturas.')
         return redirect('login')
+    if candidatura.candidato_id != candidato.id:
+        messages.error(request, 'Você não tem permissão para cancelar esta candidatura.')
+        return redirect('listar_candidaturas')
     
     if request.method == "POST":
         vaga_titulo = candidatura.vaga.titulo
@@ -818,7 +1000,22 @@ def cadastro(request):
 # 🎯 API DE MATCHING
 # ===============================
 
+def _versao_matches_candidato(request, candidato_id):
+    """
+    Candidato, versão do grupo de vagas (qualquer vaga ou empresa alterada) e matches já
+    gravados do candidato: nenhuma agregação percorre a tabela de vagas
+    """
+    alterado_em = Candidato.objects.filter(id=candidato_id).values_list('atualizado_em', flat=True).first()
+    if alterado_em is None:
+        return None
+    return combinar(
+        (alterado_em, [alterado_em, versao(GRUPO_VAGAS)]),
+        agregar(Match.objects.filter(candidato_id=candidato_id), 'atualizado_em'),
+    )
+
+
 @require_http_methods(["GET"])
+@get_condicional(_versao_matches_candidato, atualiza_dados=True)
 def api_gerar_matches_candidato(request, candidato_id):
     """
     API: Gera matches para um candidato específico
@@ -826,7 +1023,8 @@ def api_gerar_matches_candidato(request, candidato_id):
     """
     try:
         candidato = Candidato.objects.get(id=candidato_id)
-        matches = gerar_matches_para_candidato(candidato_id, score_minimo=40)
+        # Top 10 matches, sem gravar os pares abaixo do top
+        matches, total_matches = gerar_top_matches_para_candidato(candidato_id, k=10, score_minimo=40)
         
         data = {
             'candidato': {
@@ -834,7 +1032,7 @@ def api_gerar_matches_candidato(request, candidato_id):
                 'nome': candidato.nome,
                 'email': candidato.email
             },
-            'total_matches': len(matches),
+            'total_matches': total_matches,
             'matches': [
                 {
                     'id': match.id,
@@ -849,7 +1047,7 @@ def api_gerar_matches_candidato(request, candidato_id):
                     'score': match.score,
                     'status': match.status,
                 }
-                for match in matches[:10]  # Top 10 matches
+                for match in matches
             ]
         }
         return JsonResponse(data)
@@ -857,7 +1055,19 @@ def api_gerar_matches_candidato(request, candidato_id):
         return JsonResponse({'error': 'Candidato não encontrado'}, status=404)
 
 
+def _versao_matches_vaga(request, vaga_id):
+    """Vaga (com a empresa), versão do grupo de candidatos e matches já gravados da vaga"""
+    vaga = Vaga.objects.filter(id=vaga_id).values('atualizado_em', 'empresa__atualizado_em').first()
+    if vaga is None:
+        return None
+    return combinar(
+        (max(vaga.values()), [*vaga.values(), versao(GRUPO_CANDIDATOS)]),
+        agregar(Match.objects.filter(vaga_id=vaga_id), 'atualizado_em'),
+    )
+
+
 @require_http_methods(["GET"])
+@get_condicional(_versao_matches_vaga, atualiza_dados=True)
 def api_gerar_matches_vaga(request, vaga_id):
     """
     API: Gera matches para uma vaga específica
@@ -865,7 +1075,8 @@ def api_gerar_matches_vaga(request, vaga_id):
     """
     try:
         vaga = Vaga.objects.get(id=vaga_id)
-        matches = gerar_matches_para_vaga(vaga_id, score_minimo=40)
+        # Top 10 matches, sem gravar os pares abaixo do top
+        matches, total_matches = gerar_top_matches_para_vaga(vaga_id, k=10, score_minimo=40)
         
         data = {
             'vaga': {
@@ -873,7 +1084,7 @@ def api_gerar_matches_vaga(request, vaga_id):
                 'titulo': vaga.titulo,
                 'empresa': vaga.empresa.nome,
             },
-            'total_matches': len(matches),
+            'total_matches': total_matches,
             'matches': [
                 {
                     'id': match.id,
@@ -886,7 +1097,7 @@ def api_gerar_matches_vaga(request, vaga_id):
                     'score': match.score,
                     'status': match.status,
                 }
-                for match in matches[:10]  # Top 10 matches
+                for match in matches
             ]
         }
         return JsonResponse(data)
@@ -913,7 +1124,7 @@ def api_aplicar_vaga(request, vaga_id):
             candidato=candidato,
             vaga=vaga,
             defaults={
-                'score': calcular_compatibilidade(candidato, vaga),
+                'score': pontuar(candidato, vaga),
                 'candidato_interessado': True
             }
         )
@@ -933,7 +1144,19 @@ def api_aplicar_vaga(request, vaga_id):
         return JsonResponse({'error': str(e)}, status=404)
 
 
+def _versao_meus_matches(request):
+    candidato_id = request.session.get('candidato_id')
+    if not candidato_id:
+        return None
+    return combinar(
+        (None, candidato_id),
+        agregar(Match.objects.filter(candidato_id=candidato_id),
+                'atualizado_em', 'vaga__atualizado_em', 'vaga__empresa__atualizado_em'),
+    )
+
+
 @require_http_methods(["GET"])
+@get_condicional(_versao_meus_matches)
 def api_meus_matches(request):
     """
     API: Retorna matches do candidato logado
@@ -973,98 +1196,266 @@ def api_meus_matches(request):
 # 🤖 API DO CHAT COM IA
 # ===============================
 
+def _evento_chat_ia(tipo, valor):
+    return _evento_sse(tipo, {'texto': valor} if tipo == 'texto' else valor)
+
+
+async def _stream_chat_ia(primeiro, respostas):
+    """Eventos SSE da resposta: "texto" a cada trecho, "fim" com os tokens ou "erro" """
+    try:
+        yield _evento_chat_ia(*primeiro)
+        async for tipo, valor in respostas:
+            yield _evento_chat_ia(tipo, valor)
+    except asyncio.CancelledError:
+        # Cliente desconectou: a conexão com a API já foi fechada pelo stream
+        logger.info('Chat IA cancelado pelo cliente')
+        raise
+    except TimeoutError:
+        yield _evento_sse('erro', {'error': 'Tempo limite da resposta excedido'})
+    except Exception as e:
+        yield _evento_sse('erro', {'error': str(e)})
+    finally:
+        # Devolve a vaga do agendador mesmo se o stream for abandonado no meio
+        await respostas.aclose()
+
+
 @require_http_methods(["POST"])
 @login_required(login_url='login')
-def api_chat_ia(request):
+async def api_chat_ia(request):
     """
-    API: Chat com IA usando OpenAI
+    API: Chat com IA usando OpenAI (view async, servida pelo ASGI)
     POST /api/chat/ia/
     Body: {"mensagem": "texto da mensagem"}
+    Com "Accept: text/event-stream" a resposta chega em SSE conforme é gerada;
+    sem ele, a resposta completa vem em JSON. Perguntas repetidas para o mesmo
+    perfil vêm do cache, sem chamar o modelo ("cache": true).
+    Acima dos limites de concorrência ou de tokens do usuário responde 429.
+    Sob WSGI a view roda em um event loop próprio, encerrado ao fim da requisição: o SSE
+    é montado inteiro dentro dela (mesmos eventos, enviados de uma vez) e o cliente
+    OpenAI daquele loop é fechado antes de responder.
     """
+    if _servido_por_asgi(request):
+        return await _responder_chat_ia(request, transmitir=True)
+    try:
+        return await _responder_chat_ia(request, transmitir=False)
+    finally:
+        await fechar_cliente()
+
+
+async def _responder_chat_ia(request, transmitir):
+    """Corpo de api_chat_ia; transmitir=False junta os eventos SSE antes de responder"""
     try:
         data = json.loads(request.body)
-        mensagem_usuario = data.get('mensagem', '').strip()
-        
-        if not mensagem_usuario:
-            return JsonResponse({'error': 'Mensagem vazia'}, status=400)
-        
-        try:
-            candidato = request.user.candidato
-            perfil_contexto = f"""
-Você é um assistente de carreira inteligente do TalentMatch.
-Candidato: {candidato.nome}
-Habilidades: {candidato.habilidades}
-Experiência: {candidato.experiencia_anos} anos
-Área de interesse: {candidato.area_interesse}
-Escolaridade: {candidato.escolaridade}
-"""
-        except:
-            perfil_contexto = "Você é um assistente de carreira inteligente do TalentMatch."
-        
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
-            return JsonResponse({'error': 'API key não configurada'}, status=500)
-        
-        client = OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": perfil_contexto + "\nAjude o candidato com orientação de carreira, dicas para entrevistas, sugestões de habilidades para desenvolver e análise de compatibilidade com vagas. Seja amigável, profissional e objetivo."},
-                {"role": "user", "content": mensagem_usuario}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        resposta_ia = response.choices[0].message.content
-        
-        return JsonResponse({
-            'sucesso': True,
-            'resposta': resposta_ia,
-            'tokens_usados': response.usage.total_tokens
-        })
-        
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    mensagem_usuario = data.get('mensagem', '').strip()
+    if not mensagem_usuario:
+        return JsonResponse({'error': 'Mensagem vazia'}, status=400)
+    
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        return JsonResponse({'error': 'API key não configurada'}, status=500)
+    
+    user = await request.auser()
+    candidato = await sync_to_async(lambda: obter_perfil(request).candidato)()
+    respostas = responder_pergunta(obter_cliente(api_key), candidato, mensagem_usuario, usuario_id=user.id)
+    
+    # O primeiro trecho vem antes da resposta HTTP: espera na fila e recusas
+    # do agendador acontecem aqui e viram 429 também no modo streaming
+    try:
+        primeiro = await anext(respostas)
+    except LimiteChatExcedido as erro:
+        response = JsonResponse({'error': str(erro), 'motivo': erro.motivo}, status=429)
+        if erro.tentar_em:
+            response['Retry-After'] = str(math.ceil(erro.tentar_em))
+        return response
+    except TimeoutError:
+        return JsonResponse({'error': 'Tempo limite da resposta excedido'}, status=504)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        eventos = _stream_chat_ia(primeiro, respostas)
+        if transmitir:
+            response = StreamingHttpResponse(eventos, content_type='text/event-stream')
+        else:
+            response = HttpResponse(''.join([evento async for evento in eventos]), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    itens = [primeiro]
+    try:
+        itens += [item async for item in respostas]
+    except TimeoutError:
+        return JsonResponse({'error': 'Tempo limite da resposta excedido'}, status=504)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+    
+    return JsonResponse({
+        'sucesso': True,
+        'resposta': ''.join(valor for tipo, valor in itens if tipo == 'texto'),
+        **next((valor for tipo, valor in itens if tipo == 'fim'), {})
+    })
 
 
 # ===============================
 # 🔔 API DE NOTIFICAÇÕES
 # ===============================
 
+def _versao_notificacoes(request):
+    """Notificações do usuário; leituras mudam só a versão do contador de não lidas"""
+    return combinar(
+        agregar(Notificacao.objects.filter(usuario=request.user), 'criado_em'),
+        agregar(ContadorNaoLidas.objects.filter(usuario=request.user), 'atualizado_em', versao=Max('versao')),
+    )
+
 @require_http_methods(["GET"])
 @login_required(login_url='login')
+@get_condicional(_versao_notificacoes)
 def api_notificacoes(request):
     """
     API: Retorna notificações do usuário
     GET /api/notificacoes/
     """
-    notificacoes = Notificacao.objects.filter(
+    notificacoes = list(Notificacao.objects.filter(
         usuario=request.user
-    ).order_by('-criado_em')[:20]
+    ).order_by('-criado_em')[:20])
     
     data = {
-        'total': notificacoes.count(),
-        'nao_lidas': notificacoes.filter(lida=False).count(),
-        'notificacoes': [
-            {
-                'id': n.id,
-                'tipo': n.tipo,
-                'titulo': n.titulo,
-                'mensagem': n.mensagem,
-                'lida': n.lida,
-                'url': n.url,
-                'criado_em': n.criado_em.isoformat(),
-            }
-            for n in notificacoes
-        ]
+        'total': len(notificacoes),
+        'nao_lidas': obter_contador(request.user.id).notificacoes,
+        'notificacoes': [_serializar_notificacao(n) for n in notificacoes]
     }
     return JsonResponse(data)
 
 
+def _serializar_notificacao(notificacao):
+    return {
+        'id': notificacao.id,
+        'tipo': notificacao.tipo,
+        'titulo': notificacao.titulo,
+        'mensagem': notificacao.mensagem,
+        'lida': notificacao.lida,
+        'url': notificacao.url,
+        'criado_em': notificacao.criado_em.isoformat(),
+    }
+
+
+def _evento_sse(evento, dados, id=None):
+    linhas = [f'id: {id}'] if id is not None else []
+    linhas += [f'event: {evento}', f'data: {json.dumps(dados)}']
+    return '\n'.join(linhas) + '\n\n'
+
+
+def _ler_eventos_notificacoes(usuario_id, ultimo_id, versao):
+    """
+    Uma leitura do stream: (eventos, último id enviado, versão do contador). Lê só a linha
+    do contador (busca por chave); notificações novas são buscadas apenas quando a versão muda.
+    """
+    contador = ContadorNaoLidas.objects.filter(usuario_id=usuario_id).values(
+        'versao', 'notificacoes', 'mensagens'
+    ).first() or {'versao': 0, 'notificacoes': 0, 'mensagens': 0}
+    if contador['versao'] == versao:
+        return [], ultimo_id, versao
+    
+    eventos = []
+    for notificacao in Notificacao.objects.filter(usuario_id=usuario_id, id__gt=ultimo_id).order_by('id')[:50]:
+        ultimo_id = notificacao.id
+        eventos.append(_evento_sse('notificacao', _serializar_notificacao(notificacao), id=notificacao.id))
+    eventos.append(_evento_sse('contadores', {
+        'notificacoes': contador['notificacoes'],
+        'mensagens': contador['mensagens'],
+    }))
+    return eventos, ultimo_id, contador['versao']
+
+
+def _ler_eventos_notificacoes_e_fechar(usuario_id, ultimo_id, versao):
+    """Leitura do stream ASGI que fecha a conexão com o banco ao final (fora de transação)"""
+    try:
+        return _ler_eventos_notificacoes(usuario_id, ultimo_id, versao)
+    finally:
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def _stream_notificacoes(usuario_id, ultimo_id, intervalo=SSE_INTERVALO, duracao=SSE_DURACAO_MAXIMA):
+    """
+    Eventos SSE do usuário sob ASGI: cada leitura roda em sync_to_async e a espera entre
+    elas é um asyncio.sleep. Cada cliente conectado mantém, por até SSE_DURACAO_MAXIMA, a
+    thread do executor thread-sensitive da sua requisição (parada entre as leituras). A
+    conexão com o banco é fechada após cada leitura: nenhuma fica presa por cliente, ao
+    custo de abrir uma conexão a cada SSE_INTERVALO por cliente.
+    """
+    yield f'retry: {SSE_RETRY_MS}\n\n'
+    ler = sync_to_async(_ler_eventos_notificacoes_e_fechar)
+    versao = None
+    inicio = ultimo_envio = time.monotonic()
+    
+    while True:
+        eventos, ultimo_id, versao = await ler(usuario_id, ultimo_id, versao)
+        agora = time.monotonic()
+        
+        if eventos:
+            for evento in eventos:
+                yield evento
+            ultimo_envio = agora
+        elif agora - ultimo_envio >= SSE_HEARTBEAT:
+            # Comentário SSE: mantém a conexão aberta em proxies
+            yield ': ping\n\n'
+            ultimo_envio = agora
+        
+        if agora - inicio >= duracao:
+            # O EventSource reconecta sozinho, retomando pelo Last-Event-ID
+            return
+        await asyncio.sleep(intervalo)
+
+
+def _stream_notificacoes_wsgi(usuario_id, ultimo_id):
+    """
+    Sob WSGI, uma única leitura por conexão: manter o stream aberto prenderia uma thread do
+    worker. As páginas nem abrem o EventSource nesse caso (consultam /api/notificacoes/);
+    um cliente que conecte mesmo assim só reconecta após SSE_RETRY_WSGI_MS.
+    """
+    yield f'retry: {SSE_RETRY_WSGI_MS}\n\n'
+    yield from _ler_eventos_notificacoes(usuario_id, ultimo_id, None)[0]
+
+
+def _servido_por_asgi(request):
+    """
+    Sob ASGI o Django consome um iterador síncrono de StreamingHttpResponse inteiro antes
+    do primeiro byte (e sob WSGI, um assíncrono); as views em streaming escolhem o do servidor
+    """
+    return isinstance(request, ASGIRequest)
+
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+def api_notificacoes_stream(request):
+    """
+    API: Stream (Server-Sent Events) de novas notificações e contadores de não lidas
+    GET /api/notificacoes/stream/
+    Eventos: "notificacao" (com id) e "contadores"
+    """
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_id')
+    try:
+        ultimo_id = int(ultimo_id)
+    except (TypeError, ValueError):
+        # Primeira conexão: só o que chegar daqui em diante
+        ultimo_id = Notificacao.objects.filter(usuario=request.user).aggregate(maior=Max('id'))['maior'] or 0
+    obter_contador(request.user.id)
+    
+    if _servido_por_asgi(request):
+        eventos = _stream_notificacoes(request.user.id, ultimo_id)
+    else:
+        eventos = _stream_notificacoes_wsgi(request.user.id, ultimo_id)
+    response = StreamingHttpResponse(eventos, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @require_http_methods(["POST"])
 @login_required(login_url='login')
 def api_marcar_notificacao_lida(request, id):
@@ -1132,6 +1523,86 @@ def api_enviar_mensagem(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _versao_conversas(request):
+    return agregar(
+        ParticipanteConversa.objects.filter(usuario=request.user), 'ultima_mensagem_em', nao_lidas=Sum('nao_lidas')
+    )
+
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+@get_condicional(_versao_conversas)
+def api_conversas(request):
+    """
+    API: Conversas do usuário com a última mensagem e as não lidas, paginadas por cursor
+    GET /api/mensagens/conversas/?cursor=
+    """
+    try:
+        conversas, proximo_cursor = caixa_de_entrada(request.user.id, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    return JsonResponse({
+        'proximo_cursor': proximo_cursor,
+        'conversas': [
+            {
+                'id': participante.conversa_id,
+                'com': participante.outro_usuario.get_full_name() or participante.outro_usuario.username,
+                'match_id': participante.conversa.match_id,
+                'nao_lidas': participante.nao_lidas,
+                'ultima_mensagem': participante.ultima_mensagem and {
+                    'id': participante.ultima_mensagem.id,
+                    'assunto': participante.ultima_mensagem.assunto,
+                    'remetente_id': participante.ultima_mensagem.remetente_id,
+                    'criado_em': participante.ultima_mensagem.criado_em.isoformat(),
+                },
+            }
+            for participante in conversas
+        ],
+    })
+
+
+def _versao_mensagens_conversa(request, conversa_id):
+    """Mensagens da conversa; None se o usuário não participa dela (a view responde 404)"""
+    versao = agregar(
+        Mensagem.objects.filter(conversa_id=conversa_id, conversa__participantes__usuario=request.user),
+        'criado_em', nao_lidas=Count('pk', filter=Q(lida=False)),
+    )
+    return versao if versao[1]['total'] else None
+
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+@get_condicional(_versao_mensagens_conversa)
+def api_mensagens_conversa(request, conversa_id):
+    """
+    API: Mensagens de uma conversa, da mais recente para a mais antiga, paginadas por cursor
+    GET /api/mensagens/conversas/<conversa_id>/?cursor=
+    """
+    if not ParticipanteConversa.objects.filter(conversa_id=conversa_id, usuario=request.user).exists():
+        return JsonResponse({'error': 'Conversa não encontrada'}, status=404)
+    try:
+        mensagens, proximo_cursor = mensagens_da_conversa(conversa_id, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    
+    return JsonResponse({
+        'proximo_cursor': proximo_cursor,
+        'mensagens': [
+            {
+                'id': mensagem.id,
+                'remetente_id': mensagem.remetente_id,
+                'remetente': mensagem.remetente.username,
+                'assunto': mensagem.assunto,
+                'conteudo': mensagem.conteudo,
+                'lida': mensagem.lida,
+                'criado_em': mensagem.criado_em.isoformat(),
+            }
+            for mensagem in mensagens
+        ],
+    })
+
+
 @require_http_methods(["POST"])
 @login_required(login_url='login')
 def api_marcar_mensagem_lida(request, id):
@@ -1155,9 +1626,8 @@ def api_candidatar_vaga(request, vaga_id):
     API: Candidata-se a uma vaga
     POST /api/vagas/<vaga_id>/candidatar/
     """
-    try:
-        candidato = request.user.candidato
-    except AttributeError:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         return JsonResponse({'error': 'Você precisa ser um candidato para se candidatar'}, status=403)
     
     try:
@@ -1180,7 +1650,7 @@ def api_candidatar_vaga(request, vaga_id):
     try:
         match = Match.objects.filter(candidato=candidato, vaga=vaga).first()
         if not match:
-            score = calcular_compatibilidade(candidato, vaga)
+            score = pontuar(candidato, vaga)
             match = Match.objects.create(candidato=candidato, vaga=vaga, score=score)
         
         candidatura = Candidatura.objects.create(
@@ -1207,9 +1677,8 @@ def api_atualizar_candidatura(request, candidatura_id):
     API: Atualiza status de uma candidatura (empresa)
     POST /api/candidaturas/<candidatura_id>/atualizar/
     """
-    try:
-        empresa = request.user.empresa
-    except AttributeError:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         return JsonResponse({'error': 'Acesso negado: você precisa ser uma empresa'}, status=403)
     
     try:
@@ -1252,34 +1721,85 @@ def api_atualizar_candidatura(request, candidatura_id):
 @login_required(login_url='login')
 def listar_candidaturas_candidato(request):
     """Lista todas as candidaturas do candidato"""
-    try:
-        candidato = request.user.candidato
-        candidaturas = Candidatura.objects.filter(
-            candidato=candidato
-        ).select_related('vaga', 'vaga__empresa', 'match').order_by('-criado_em')
-        
-        context = {
-            'candidaturas': candidaturas,
-        }
-        return render(request, 'candidate/candidaturas_vagas.html', context)
-    except:
+    candidato = obter_perfil(request).candidato
+    if not candidato:
         messages.error(request, 'Perfil de candidato não encontrado.')
         return redirect('home')
+    
+    candidaturas = Candidatura.objects.filter(
+        candidato=candidato
+    ).select_related('vaga', 'vaga__empresa', 'match').order_by('-criado_em')
+    
+    context = {
+        'candidaturas': candidaturas,
+    }
+    return render(request, 'candidate/candidaturas_vagas.html', context)
 
 
 @login_required(login_url='login')
 def listar_candidaturas_empresa(request):
     """Lista todas as candidaturas para vagas da empresa"""
-    try:
-        empresa = request.user.empresa
-        candidaturas = Candidatura.objects.filter(
-            vaga__empresa=empresa
-        ).select_related('candidato', 'vaga', 'match').order_by('-criado_em')
-        
-        context = {
-            'candidaturas': candidaturas,
-        }
-        return render(request, 'gerenciar_candidaturas.html', context)
-    except:
+    empresa = obter_perfil(request).empresa
+    if not empresa:
         messages.error(request, 'Perfil de empresa não encontrado.')
-        return redirect('home')
\ No newline at end of file
+        return redirect('home')
+    
+    candidaturas = Candidatura.objects.filter(
+        vaga__empresa=empresa
+    ).select_related('candidato', 'vaga', 'match').order_by('-criado_em')
+    
+    context = {
+        'candidaturas': candidaturas,
+    }
+    return render(request, 'gerenciar_candidaturas.html', context)
+
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+def exportar_candidaturas_empresa(request):
+    """
+    Exporta as candidaturas das vagas da empresa em streaming (memória constante)
+    GET /empresa/candidaturas/exportar/?formato=csv|ndjson&vaga=<id>&status=
+    """
+    empresa = obter_perfil(request).empresa
+    if not empresa:
+        return JsonResponse({'error': 'Perfil de empresa não encontrado'}, status=403)
+    
+    formato = request.GET.get('formato', 'csv')
+    vaga_id = request.GET.get('vaga') or None
+    if formato not in FORMATOS_EXPORTACAO:
+        return JsonResponse({'error': 'Formato inválido'}, status=400)
+    if vaga_id is not None and not vaga_id.isdigit():
+        return JsonResponse({'error': 'Vaga inválida'}, status=400)
+    
+    consulta = consulta_candidaturas(empresa.id, vaga_id, request.GET.get('status') or None)
+    if _servido_por_asgi(request):
+        conteudo = agerar_exportacao(formato, ablocos_candidaturas(consulta))
+    else:
+        conteudo = gerar_exportacao(formato, blocos_candidaturas(consulta))
+    response = StreamingHttpResponse(conteudo, content_type=FORMATOS_EXPORTACAO[formato])
+    response['Content-Disposition'] = f'attachment; filename="candidaturas.{formato}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ===============================
+# 📈 INSTRUMENTAÇÃO
+# ===============================
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+def api_instrumentacao(request):
+    """
+    API: Histogramas de queries, tempo de banco e tempo total por URL e
+    cache e fila do chat IA e acertos do cache das listagens (somente staff)
+    GET /api/instrumentacao/
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Acesso restrito a administradores'}, status=403)
+    return JsonResponse({
+        'urls': metricas.resumo(),
+        'cache_chat_ia': obter_cache_respostas().estatisticas(),
+        'agendador_chat_ia': obter_agendador().estatisticas(),
+        'cache_listagens': estatisticas_cache.resumo(),
+    })
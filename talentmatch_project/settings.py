@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentacaoMiddleware',  # Primeiro, para medir todo o ciclo da requisição
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +56,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.user_type',
+                'core.context_processors.servidor',
             ],
         },
     },
@@ -76,6 +78,31 @@ else:
         }
     }
 
+# Cache (versões de perfil, totais e listagens de vagas em core/cache_listagens.py)
+# No LocMemCache cada processo tem o seu cache; as versões que invalidam listagens e ETags
+# ficam no banco (VersaoCache) e valem para todos. Com mais de um processo, REDIS_URL
+# (pacote redis) evita que cada um calcule de novo as mesmas páginas
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'talentmatch',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'talentmatch',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# Segundos que uma listagem de vagas fica em cache mesmo sem alterações (invalidadas antes
+# disso por save/delete de Vaga ou Empresa)
+CACHE_LISTAGENS_TTL = 300
+
 # Internacionalização
 LANGUAGE_CODE = 'pt-br'
 TIME_ZONE = 'America/Sao_Paulo'
@@ -101,3 +128,47 @@ MATCHING_WEIGHTS = {
     'salario': 15,
 }
 
+# Orçamentos por requisição da instrumentação (core.middleware); acima deles a requisição é logada
+INSTRUMENTACAO_ORCAMENTOS = {
+    'queries': 50,
+    'db_ms': 250,
+    'total_ms': 1000,
+}
+# Sobrescritas por nome de URL, ex.: {'dashboard_admin': {'queries': 20}}
+INSTRUMENTACAO_ORCAMENTOS_POR_URL = {}
+
+# Chat com IA (api_chat_ia). OPENAI_BASE_URL aponta para outro servidor compatível,
+# como o stub local: python manage.py servidor_llm_stub
+CHAT_IA = {
+    'MODELO': 'gpt-4o-mini',
+    'BASE_URL': os.environ.get('OPENAI_BASE_URL'),
+    'MAX_TOKENS': 500,
+    'TEMPERATURA': 0.7,
+    'TIMEOUT': 20,        # segundos para conectar e entre dois trechos da resposta
+    'TIMEOUT_TOTAL': 60,  # segundos para a resposta inteira
+    'MAX_RETRIES': 1,
+    'CACHE_TAMANHO': 1000,  # respostas guardadas por processo (LRU)
+    'CACHE_TTL': 3600,      # segundos até uma resposta guardada expirar
+    # Agendador das chamadas ao modelo (core/agendador_chat.py); limites por processo:
+    # com N workers, os efetivos por usuário e globais são N vezes maiores
+    'AGENDADOR': {
+        'SIMULTANEAS': 20,              # chamadas em andamento no processo
+        'SIMULTANEAS_POR_USUARIO': 2,
+        'FILA_MAXIMA': 100,             # chamadas aguardando vaga
+        'ESPERA_MAXIMA': 10,            # segundos na fila antes de responder 429
+        'JANELA_TOKENS': 3600,          # segundos da janela deslizante dos orçamentos
+        'TOKENS_POR_USUARIO': 20000,
+        'TOKENS_GLOBAIS': None,         # None = sem limite global
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}